@@ -1,46 +1,62 @@
 """
 Generate a kubeconfig for a ServiceAccount without pre-running shell scripts.
 
+All cluster access goes through the Python Kubernetes client, so a run loads
+the admin kubeconfig once and reuses one pooled connection for every request.
+
 Examples:
     python create-kubeconfig.py my-service-account \
         --namespace kube-system \
         --cluster-name my-cluster \
         --api-server https://10.0.0.1:6443
+
+    # Batch mode: one "name" or "namespace/name" per line
+    python create-kubeconfig.py --from-file service-accounts.txt --workers 32
+
+    # Batch mode: every ServiceAccount matching a label selector
+    python create-kubeconfig.py --selector team=payments --namespace payments
+
+    # Several clusters at once: one merged kubeconfig with a context per cluster
+    python create-kubeconfig.py my-service-account --context prod-a --context prod-b
 """
 
 import argparse
 import base64
-import json
 import os
-import subprocess
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
+import kubernetes
 import yaml
+from kubernetes.client.rest import ApiException
 
 DEFAULT_OUTPUT_DIR = Path(__file__).resolve().parent / "output-kubeconfig"
+DEFAULT_WORKERS = 16
 
-
-class CommandError(RuntimeError):
-    """Raised when a subprocess command fails."""
+ClusterInfo = Tuple[str, str, str, bool]
 
 
-def run(cmd: list, *, input_data: Optional[str] = None) -> str:
-    """Run a command and return stdout or raise CommandError on failure."""
-    result = subprocess.run(
-        cmd,
-        input=input_data,
-        text=True,
-        capture_output=True,
-    )
-    if result.returncode != 0:
-        stderr = result.stderr.strip()
-        stdout = result.stdout.strip()
-        details = stderr or stdout or "no output"
-        raise CommandError(f"Command {' '.join(cmd)} failed: {details}")
-    return result.stdout
+def create_api_client(
+    data: Optional[Dict],
+    context: Optional[str],
+    pool_size: int,
+) -> kubernetes.client.ApiClient:
+    """Build one ApiClient per cluster whose connection pool is shared by all workers."""
+    configuration = kubernetes.client.Configuration()
+    if data is not None:
+        kubernetes.config.load_kube_config_from_dict(
+            data,
+            context=context,
+            client_configuration=configuration,
+            persist_config=False,
+        )
+    else:
+        kubernetes.config.load_incluster_config(client_configuration=configuration)
+    configuration.connection_pool_maxsize = pool_size
+    return kubernetes.client.ApiClient(configuration)
 
 
 def extract_cluster_metadata(
@@ -50,7 +66,7 @@ def extract_cluster_metadata(
     context: Optional[str],
     cluster_name: Optional[str],
     api_server: Optional[str],
-) -> Tuple[str, str, str, bool]:
+) -> ClusterInfo:
     """Extract cluster_name, api_server, ca_data, insecure flag from config dict."""
     current_context = context or data.get("current-context")
     if not current_context:
@@ -97,41 +113,92 @@ def extract_cluster_metadata(
     return resolved_cluster_name, resolved_api_server, ca_data or "", insecure
 
 
-def load_kubeconfig_from_file(
-    path: Path,
-    context: Optional[str],
-    cluster_name: Optional[str],
-    api_server: Optional[str],
-) -> Tuple[str, str, str, bool]:
-    """Read cluster metadata from a kubeconfig file."""
-    data = yaml.safe_load(path.read_text(encoding="utf-8"))
-    return extract_cluster_metadata(
-        data,
-        source_path=path,
-        context=context,
-        cluster_name=cluster_name,
-        api_server=api_server,
-    )
+# Fields that may hold paths relative to the kubeconfig file they came from
+PATH_FIELDS = {
+    "clusters": ("cluster", ("certificate-authority",)),
+    "users": ("user", ("client-certificate", "client-key", "tokenFile")),
+}
 
 
-def load_kubeconfig_from_kubectl(
-    context: Optional[str],
-    cluster_name: Optional[str],
-    api_server: Optional[str],
-) -> Tuple[str, str, str, bool]:
-    """Read cluster metadata via `kubectl config view`."""
-    output = run(["kubectl", "config", "view", "--raw", "-o", "json"])
-    data = json.loads(output)
-    return extract_cluster_metadata(
-        data,
-        source_path=None,
-        context=context,
-        cluster_name=cluster_name,
-        api_server=api_server,
+def _absolutize(key: str, item: Dict, source_path: Path) -> None:
+    """Resolve relative file references against the kubeconfig that defined them."""
+    block_name, fields = PATH_FIELDS.get(key, (None, ()))
+    block = item.get(block_name) or {}
+    for field in fields:
+        value = block.get(field)
+        if value and not Path(value).is_absolute():
+            block[field] = str((source_path.parent / value).resolve())
+
+
+def load_merged_kubeconfig(paths: List[Path]) -> Dict:
+    """
+    Merge kubeconfig files the way kubectl does:
+    the first file to define a name or current-context wins.
+    """
+    merged: Dict = {"apiVersion": "v1", "kind": "Config", "clusters": [], "contexts": [], "users": []}
+    seen = {key: set() for key in ("clusters", "contexts", "users")}
+    for path in paths:
+        if not path.exists():
+            continue
+        data = yaml.safe_load(path.read_text(encoding="utf-8")) or {}
+        if not merged.get("current-context"):
+            merged["current-context"] = data.get("current-context")
+        for key in seen:
+            for item in data.get(key) or []:
+                if item["name"] in seen[key]:
+                    continue
+                seen[key].add(item["name"])
+                _absolutize(key, item, path)
+                merged[key].append(item)
+    if not merged["contexts"]:
+        raise ValueError(f"No usable kubeconfig found in {', '.join(map(str, paths))}.")
+    return merged
+
+
+def load_kubeconfig_data(path: Optional[Path]) -> Optional[Dict]:
+    """
+    Load the admin kubeconfig once per run: --kubeconfig if given, otherwise
+    $KUBECONFIG / ~/.kube/config (same view as `kubectl config view --raw`),
+    falling back to well-known files. Returns None when running in-cluster without one.
+    """
+    if path:
+        return load_merged_kubeconfig([path])
+    default = os.environ.get("KUBECONFIG") or "~/.kube/config"
+    try:
+        return load_merged_kubeconfig([Path(p).expanduser() for p in default.split(os.pathsep) if p])
+    except ValueError:
+        pass
+    fallback_path = preferred_kubeconfig_path()
+    if fallback_path:
+        return load_merged_kubeconfig([fallback_path])
+    return None
+
+
+def wait_for_token(
+    core: kubernetes.client.CoreV1Api,
+    secret_name: str,
+    namespace: str,
+    wait_seconds: int,
+) -> Dict:
+    """Watch the Secret until the token controller fills in its data."""
+    watcher = kubernetes.watch.Watch()
+    for event in watcher.stream(
+        core.list_namespaced_secret,
+        namespace,
+        field_selector=f"metadata.name={secret_name}",
+        timeout_seconds=wait_seconds,
+    ):
+        data = event["raw_object"].get("data") or {}
+        if event["type"] != "DELETED" and data.get("token"):
+            watcher.stop()
+            return event["raw_object"]
+    raise RuntimeError(
+        f"Timed out waiting for token in secret '{secret_name}' within {wait_seconds}s."
     )
 
 
 def find_or_create_token_secret(
+    core: kubernetes.client.CoreV1Api,
     sa_name: str,
     namespace: str,
     secret_name: Optional[str],
@@ -142,25 +209,21 @@ def find_or_create_token_secret(
 
     Returns the secret name and its JSON manifest.
     """
+    serialize = core.api_client.sanitize_for_serialization
+
     if secret_name:
-        secret_data = json.loads(
-            run(["kubectl", "get", "secret", secret_name, "-n", namespace, "-o", "json"])
-        )
-        return secret_name, secret_data
+        secret = core.read_namespaced_secret(secret_name, namespace)
+        return secret_name, serialize(secret)
 
-    sa_data = json.loads(
-        run(["kubectl", "get", "sa", sa_name, "-n", namespace, "-o", "json"])
-    )
+    sa = core.read_namespaced_service_account(sa_name, namespace)
 
-    for ref in sa_data.get("secrets") or []:
-        name = ref.get("name")
+    for ref in sa.secrets or []:
+        name = ref.name
         if not name:
             continue
         try:
-            secret_data = json.loads(
-                run(["kubectl", "get", "secret", name, "-n", namespace, "-o", "json"])
-            )
-        except CommandError:
+            secret_data = serialize(core.read_namespaced_secret(name, namespace))
+        except ApiException:
             continue
         if secret_data.get("type") != "kubernetes.io/service-account-token":
             continue
@@ -183,47 +246,20 @@ def find_or_create_token_secret(
         "type": "kubernetes.io/service-account-token",
     }
 
-    run(
-        ["kubectl", "apply", "-f", "-"],
-        input_data=yaml.safe_dump(manifest, sort_keys=False),
-    )
-
-    if sa_data.get("secrets"):
-        patch = json.dumps(
-            [{"op": "add", "path": "/secrets/-", "value": {"name": secret_name}}]
-        )
-    else:
-        patch = json.dumps(
-            [{"op": "add", "path": "/secrets", "value": [{"name": secret_name}]}]
-        )
-
-    run(
-        [
-            "kubectl",
-            "patch",
-            "sa",
-            sa_name,
-            "-n",
-            namespace,
-            "--type=json",
-            "-p",
-            patch,
-        ]
-    )
-
-    deadline = time.time() + wait_seconds
-    while time.time() < deadline:
-        secret_data = json.loads(
-            run(["kubectl", "get", "secret", secret_name, "-n", namespace, "-o", "json"])
-        )
-        token = secret_data.get("data", {}).get("token")
-        if token:
-            return secret_name, secret_data
-        time.sleep(1)
+    try:
+        core.create_namespaced_secret(namespace, manifest)
+    except ApiException as exc:
+        if exc.status != 409:
+            raise
+
+    if not any(ref.name == secret_name for ref in sa.secrets or []):
+        if sa.secrets:
+            patch = [{"op": "add", "path": "/secrets/-", "value": {"name": secret_name}}]
+        else:
+            patch = [{"op": "add", "path": "/secrets", "value": [{"name": secret_name}]}]
+        core.patch_namespaced_service_account(sa_name, namespace, patch)
 
-    raise RuntimeError(
-        f"Timed out waiting for token in secret '{secret_name}' within {wait_seconds}s."
-    )
+    return secret_name, wait_for_token(core, secret_name, namespace, wait_seconds)
 
 
 def build_kubeconfig(
@@ -263,6 +299,81 @@ def build_kubeconfig(
     }
 
 
+def merge_kubeconfigs(kubeconfigs: List[Dict]) -> Dict:
+    """Combine single-cluster kubeconfigs into one file with a context per cluster."""
+    merged = {
+        "apiVersion": "v1",
+        "kind": "Config",
+        "clusters": [],
+        "contexts": [],
+        "current-context": kubeconfigs[0]["current-context"],
+        "users": [],
+    }
+    seen = {"clusters": set(), "contexts": set(), "users": set()}
+
+    def add(section: str, entry: Dict) -> None:
+        # Several kube contexts may resolve to the same cluster name; the first entry wins
+        if entry["name"] not in seen[section]:
+            seen[section].add(entry["name"])
+            merged[section].append(entry)
+
+    for kubeconfig in kubeconfigs:
+        context = kubeconfig["contexts"][0]
+        user = dict(kubeconfig["users"][0])
+        # Same ServiceAccount name on every cluster, but each cluster issues its own token
+        user["name"] = context["name"]
+        for cluster in kubeconfig["clusters"]:
+            add("clusters", cluster)
+        add("contexts", {"name": context["name"], "context": {**context["context"], "user": user["name"]}})
+        add("users", user)
+    return merged
+
+
+def generate_kubeconfig(
+    core: kubernetes.client.CoreV1Api,
+    sa_name: str,
+    namespace: str,
+    cluster_info: Optional[ClusterInfo],
+    secret_name: Optional[str],
+    wait_seconds: int,
+) -> Tuple[Dict, str]:
+    """Produce the kubeconfig for one ServiceAccount; returns it with the Secret it came from."""
+    secret_name, secret_data = find_or_create_token_secret(
+        core,
+        sa_name,
+        namespace,
+        secret_name,
+        wait_seconds=wait_seconds,
+    )
+
+    token_b64 = secret_data.get("data", {}).get("token")
+    if not token_b64:
+        raise RuntimeError("Secret data does not contain a token even after waiting.")
+    token = base64.b64decode(token_b64.encode("utf-8")).decode("utf-8")
+
+    cluster_name, api_server, ca_data, insecure_skip_tls = cluster_info
+
+    if not ca_data and not insecure_skip_tls:
+        ca_data = secret_data.get("data", {}).get("ca.crt")
+        if not ca_data:
+            raise RuntimeError(
+                "Unable to determine certificate-authority-data. "
+                "Provide a kubeconfig with embedded CA data or enable "
+                "--cluster-name/--api-server with a valid kubeconfig."
+            )
+
+    kubeconfig = build_kubeconfig(
+        sa_name,
+        namespace,
+        cluster_name,
+        api_server,
+        ca_data,
+        token,
+        insecure_skip_tls,
+    )
+    return kubeconfig, secret_name
+
+
 def preferred_kubeconfig_path() -> Optional[Path]:
     """Select a reasonable kubeconfig file if available."""
     env_path = os.environ.get("KUBECONFIG")
@@ -277,14 +388,79 @@ def preferred_kubeconfig_path() -> Optional[Path]:
     return None
 
 
+def resolve_cluster_info(
+    args: argparse.Namespace,
+    data: Optional[Dict],
+    context: Optional[str],
+) -> Optional[ClusterInfo]:
+    """Resolve one cluster's metadata from the already loaded kubeconfig."""
+    if data is not None:
+        try:
+            return extract_cluster_metadata(
+                data,
+                source_path=None,
+                context=context,
+                cluster_name=args.cluster_name,
+                api_server=args.api_server,
+            )
+        except Exception as exc:
+            print(f"[WARN] Failed to read cluster metadata for context '{context}': {exc}", file=sys.stderr)
+
+    if args.cluster_name and args.api_server:
+        return args.cluster_name, args.api_server, "", False
+    return None
+
+
+def collect_targets(args: argparse.Namespace, core: kubernetes.client.CoreV1Api) -> List[Tuple[str, str]]:
+    """Return (namespace, name) pairs from the positional argument, --from-file and --selector."""
+    targets = []
+    if args.service_account:
+        targets.append((args.namespace, args.service_account))
+    if args.from_file:
+        for line in args.from_file.read_text(encoding="utf-8").splitlines():
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            namespace, _, name = line.rpartition("/")
+            targets.append((namespace or args.namespace, name))
+    if args.selector:
+        if args.all_namespaces:
+            result = core.list_service_account_for_all_namespaces(label_selector=args.selector)
+        else:
+            result = core.list_namespaced_service_account(args.namespace, label_selector=args.selector)
+        targets.extend((item.metadata.namespace, item.metadata.name) for item in result.items)
+    # Keep order, drop duplicates
+    return list(dict.fromkeys(targets))
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Generate kubeconfig for a ServiceAccount.")
-    parser.add_argument("service_account", help="ServiceAccount name.")
+    parser.add_argument("service_account", nargs="?", help="ServiceAccount name.")
     parser.add_argument(
         "--namespace",
         default="kube-system",
         help="Namespace of the ServiceAccount (default: kube-system).",
     )
+    parser.add_argument(
+        "--from-file",
+        type=lambda p: Path(p).expanduser().resolve(),
+        help="Batch mode: file with one 'name' or 'namespace/name' per line.",
+    )
+    parser.add_argument(
+        "--selector",
+        help="Batch mode: label selector for ServiceAccounts in --namespace.",
+    )
+    parser.add_argument(
+        "--all-namespaces",
+        action="store_true",
+        help="With --selector, search ServiceAccounts in all namespaces.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Concurrent ServiceAccounts in batch mode (default: {DEFAULT_WORKERS}).",
+    )
     parser.add_argument(
         "--cluster-name",
         help="Override cluster name for the generated kubeconfig.",
@@ -300,7 +476,11 @@ def parse_args() -> argparse.Namespace:
     )
     parser.add_argument(
         "--context",
-        help="Context name to read from kubeconfig (defaults to current-context).",
+        action="append",
+        help=(
+            "Context name to read from kubeconfig (defaults to current-context). "
+            "Repeat to generate against several clusters and merge the results."
+        ),
     )
     parser.add_argument(
         "--secret-name",
@@ -318,119 +498,134 @@ def parse_args() -> argparse.Namespace:
         default=30,
         help="Seconds to wait for the token controller to populate data (default: 30).",
     )
-    return parser.parse_args()
+    args = parser.parse_args()
+    if not (args.service_account or args.from_file or args.selector):
+        parser.error("specify a ServiceAccount, --from-file or --selector")
+    if args.secret_name and (args.from_file or args.selector):
+        parser.error("--secret-name only applies to a single ServiceAccount")
+    if args.context and len(args.context) > 1 and (args.cluster_name or args.api_server or args.secret_name):
+        parser.error("--cluster-name, --api-server and --secret-name only apply to a single context")
+    return args
 
 
 def main() -> int:
     args = parse_args()
+    started = time.monotonic()
+    contexts = list(dict.fromkeys(args.context or [None]))
+    multi_cluster = len(contexts) > 1
 
+    # Cluster metadata is resolved from one in-memory kubeconfig for every context
     try:
-        secret_name, secret_data = find_or_create_token_secret(
-            args.service_account,
-            args.namespace,
-            args.secret_name,
-            wait_seconds=args.wait_seconds,
-        )
+        data = load_kubeconfig_data(args.kubeconfig)
     except Exception as exc:
-        print(f"[ERROR] Unable to obtain ServiceAccount token: {exc}", file=sys.stderr)
-        return 1
-
-    token_b64 = secret_data.get("data", {}).get("token")
-    if not token_b64:
-        print(
-            "[ERROR] Secret data does not contain a token even after waiting.",
-            file=sys.stderr,
-        )
-        return 1
-    token = base64.b64decode(token_b64.encode("utf-8")).decode("utf-8")
-
-    ca_from_secret = secret_data.get("data", {}).get("ca.crt")
-
-    cluster_info: Optional[Tuple[str, str, str, bool]] = None
-
-    # Prefer explicit kubeconfig path
-    if args.kubeconfig:
-        try:
-            cluster_info = load_kubeconfig_from_file(
-                args.kubeconfig,
-                args.context,
-                args.cluster_name,
-                args.api_server,
-            )
-        except Exception as exc:
-            print(f"[WARN] Failed to read provided kubeconfig: {exc}", file=sys.stderr)
-            cluster_info = None
-
-    # Attempt kubectl discovery
-    if cluster_info is None:
-        try:
-            cluster_info = load_kubeconfig_from_kubectl(
-                args.context,
-                args.cluster_name,
-                args.api_server,
-            )
-        except Exception:
-            cluster_info = None
-
-    # Fallback to well-known file if cluster info still missing
-    if cluster_info is None:
-        fallback_path = preferred_kubeconfig_path()
-        if fallback_path:
-            try:
-                cluster_info = load_kubeconfig_from_file(
-                    fallback_path,
-                    args.context,
-                    args.cluster_name,
-                    args.api_server,
-                )
-            except Exception:
-                cluster_info = None
+        print(f"[WARN] Failed to read kubeconfig: {exc}", file=sys.stderr)
+        data = None
 
-    if cluster_info is None:
-        if not (args.cluster_name and args.api_server):
+    clusters = {}
+    for context in contexts:
+        cluster_info = resolve_cluster_info(args, data, context)
+        if cluster_info is None:
             print(
                 "[ERROR] Cluster metadata is unavailable. Provide --cluster-name and "
                 "--api-server or a usable --kubeconfig.",
                 file=sys.stderr,
             )
             return 1
-        cluster_info = (args.cluster_name, args.api_server, "", False)
+        try:
+            api_client = create_api_client(data, context, max(1, args.workers))
+            core = kubernetes.client.CoreV1Api(api_client)
+            targets = collect_targets(args, core)
+        except Exception as exc:
+            print(f"[ERROR] Unable to reach the cluster for context '{context}': {exc}", file=sys.stderr)
+            return 1
+        clusters[context] = (cluster_info, core, targets)
+
+    jobs = [
+        (context, namespace, name)
+        for context, (_, _, targets) in clusters.items()
+        for namespace, name in targets
+    ]
+    if not jobs:
+        print("[ERROR] No ServiceAccounts matched.", file=sys.stderr)
+        return 1
 
-    cluster_name, api_server, ca_data, insecure_skip_tls = cluster_info
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+    service_accounts = list(dict.fromkeys((namespace, name) for _, namespace, name in jobs))
+    batch = len(service_accounts) > 1 or bool(args.from_file or args.selector)
+    results: Dict[Tuple[str, str], Dict[Optional[str], Tuple[Dict, str]]] = {sa: {} for sa in service_accounts}
+    failures = 0
+
+    # Every (cluster, ServiceAccount) pair runs in one pool; each cluster keeps its own connection pool
+    with ThreadPoolExecutor(max_workers=max(1, min(args.workers * len(contexts), len(jobs)))) as executor:
+        futures = {
+            executor.submit(
+                generate_kubeconfig,
+                clusters[context][1],
+                name,
+                namespace,
+                clusters[context][0],
+                args.secret_name,
+                args.wait_seconds,
+            ): (context, namespace, name)
+            for context, namespace, name in jobs
+        }
+        for future in as_completed(futures):
+            context, namespace, name = futures[future]
+            try:
+                kubeconfig, secret_name = future.result()
+            except Exception as exc:
+                failures += 1
+                where = f" on context '{context}'" if multi_cluster else ""
+                print(
+                    f"[ERROR] Unable to obtain ServiceAccount token for {namespace}/{name}{where}: {exc}",
+                    file=sys.stderr,
+                )
+                continue
+            results[(namespace, name)][context] = (kubeconfig, secret_name)
 
-    if not ca_data and not insecure_skip_tls:
-        if ca_from_secret:
-            ca_data = ca_from_secret
+    written = 0
+    output_paths: Dict[Path, Tuple[str, str]] = {}
+    for (namespace, name), by_context in results.items():
+        if not by_context:
+            continue
+        if multi_cluster:
+            # Keep the command-line order of contexts in the merged file
+            kubeconfig = merge_kubeconfigs([by_context[c][0] for c in contexts if c in by_context])
+            stem = name
         else:
+            kubeconfig = by_context[contexts[0]][0]
+            stem = kubeconfig["current-context"]
+        # Batch runs may hold the same ServiceAccount name in several namespaces;
+        # "_" never appears in Kubernetes names, so the prefix stays unambiguous
+        output_path = args.output_dir / (f"{namespace}_{stem}.yaml" if batch else f"{stem}.yaml")
+        if output_path in output_paths:
+            failures += 1
+            other = "/".join(output_paths[output_path])
             print(
-                "[ERROR] Unable to determine certificate-authority-data. "
-                "Provide a kubeconfig with embedded CA data or enable "
-                "--cluster-name/--api-server with a valid kubeconfig.",
+                f"[ERROR] Output path {output_path} for {namespace}/{name} is already used by {other}; skipped.",
                 file=sys.stderr,
             )
-            return 1
-
-    kubeconfig = build_kubeconfig(
-        args.service_account,
-        args.namespace,
-        cluster_name,
-        api_server,
-        ca_data,
-        token,
-        insecure_skip_tls,
-    )
-
-    yaml_str = yaml.safe_dump(kubeconfig, sort_keys=False)
-    print("---")
-    print(yaml_str)
-
-    args.output_dir.mkdir(parents=True, exist_ok=True)
-    output_path = args.output_dir / f"{kubeconfig['current-context']}.yaml"
-    output_path.write_text(yaml_str, encoding="utf-8")
-    print(f"[INFO] Wrote kubeconfig to {output_path}")
-    print(f"[INFO] Token sourced from Secret '{secret_name}' in namespace '{args.namespace}'.")
-
-    return 0
+            continue
+        output_paths[output_path] = (namespace, name)
+
+        yaml_str = yaml.safe_dump(kubeconfig, sort_keys=False)
+        if not batch:
+            print("---")
+            print(yaml_str)
+        output_path.write_text(yaml_str, encoding="utf-8")
+        written += 1
+        print(f"[INFO] Wrote kubeconfig to {output_path}")
+        if not batch:
+            for context, (_, secret_name) in by_context.items():
+                where = f" (context '{context}')" if multi_cluster else ""
+                print(f"[INFO] Token sourced from Secret '{secret_name}' in namespace '{namespace}'{where}.")
+
+    if batch or multi_cluster:
+        print(
+            f"[INFO] Generated {written}/{len(service_accounts)} kubeconfigs across "
+            f"{len(contexts)} cluster(s) in {time.monotonic() - started:.1f}s."
+        )
+    return 1 if failures else 0
 
 
 if __name__ == "__main__":
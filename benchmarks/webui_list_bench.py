@@ -0,0 +1,102 @@
+"""
+Web UI 用户列表响应基准
+
+构造 N 个接近真实的 LensUser（含 managedFields、kopf 状态），比较：
+- 原始方式：完整对象 + FastAPI jsonable_encoder + 标准库 JSONResponse
+- 当前方式：字段投影 + ORJSONResponse（未安装 orjson 时为标准库 JSONResponse）
+输出响应字节数与序列化耗时。
+
+用法：python benchmarks/webui_list_bench.py [--users 5000] [--rounds 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "image"))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from webui_projection import LENSUSER_FIELDS, FastJSONResponse, Projection  # noqa: E402
+
+
+def make_user(i):
+    namespace = "kube-system"
+    name = f"user-{i:05d}"
+    roles = [{"name": random.choice(["view", "edit", "admin"]), "namespace": f"team-{j:03d}"}
+             for j in random.sample(range(200), random.randint(3, 20))]
+    timestamp = "2024-05-01T08:00:00Z"
+    return {
+        "apiVersion": "osip.cc/v1",
+        "kind": "LensUser",
+        "metadata": {
+            "name": name,
+            "namespace": namespace,
+            "uid": f"6f1c2b3a-0000-4000-8000-{i:012d}",
+            "resourceVersion": str(100000 + i),
+            "generation": 3,
+            "creationTimestamp": timestamp,
+            "finalizers": ["kopf.zalando.org/KopfFinalizerMarker"],
+            "annotations": {"usermanager.osip.cc/handoff": timestamp},
+            "managedFields": [
+                {"manager": "webui", "operation": "Update", "apiVersion": "osip.cc/v1", "time": timestamp,
+                 "fieldsType": "FieldsV1", "fieldsV1": {"f:spec": {".": {}, "f:roles": {}}}},
+                {"manager": "kopf", "operation": "Update", "apiVersion": "osip.cc/v1", "time": timestamp,
+                 "fieldsType": "FieldsV1",
+                 "fieldsV1": {"f:metadata": {"f:finalizers": {".": {}, "v:\"kopf.zalando.org/KopfFinalizerMarker\"": {}}},
+                              "f:status": {".": {}, "f:conditions": {}, "f:create_lu": {}, "f:kopf": {}}}},
+            ],
+        },
+        "spec": {"roles": roles},
+        "status": {
+            "create_lu": {"sa-name": name},
+            "kopf": {"last-handled-configuration": str({"spec": {"roles": roles}}), "progress": {}},
+            "conditions": [
+                {"type": t, "status": "True", "reason": "Reconciled", "message": "", "lastTransitionTime": timestamp}
+                for t in ("Ready", "RoleBindingsReady", "TokenReady")
+            ],
+        },
+    }
+
+
+def measure(label, fn, rounds):
+    best, size = None, 0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        body = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        size = len(body)
+    print(f"{label:<40} {size / 1024:>10.1f} KiB {best * 1000:>10.1f} ms")
+    return size, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(0)
+    users = [make_user(i) for i in range(args.users)]
+    projection = Projection(LENSUSER_FIELDS)
+
+    print(f"{args.users} LensUsers, best of {args.rounds} rounds; fast encoder: {FastJSONResponse.__name__}")
+    raw_size, raw_time = measure(
+        "full objects + jsonable_encoder + json",
+        lambda: JSONResponse({"success": True, "data": jsonable_encoder(users)}).body,
+        args.rounds,
+    )
+    slim_size, slim_time = measure(
+        "projection + fast encoder",
+        lambda: FastJSONResponse({"success": True, "data": [projection.apply(u) for u in users]}).body,
+        args.rounds,
+    )
+    print(f"bytes saved: {(1 - slim_size / raw_size) * 100:.1f}%, "
+          f"serialization speedup: {raw_time / slim_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,16 @@
-﻿const { createApp, ref, reactive, computed, onMounted } = Vue;
+﻿const { createApp, ref, reactive, computed, watch, shallowRef, onMounted } = Vue;
 
 const API_BASE = '/api';
+// 列表每页条数、搜索防抖时间、权限列最多展示的标签数
+const PAGE_SIZE = 500;
+const SEARCH_DEBOUNCE_MS = 300;
+const MAX_ROLE_TAGS = 3;
+// 用户列表所在命名空间（与 /api/lensusers 的默认值一致）
+const USER_NAMESPACE = 'kube-system';
+// 事件流断线后的重连间隔上限（毫秒）
+const EVENTS_MAX_RETRY_MS = 30000;
+// 获取 kubeconfig 时尚未生成则由服务端等待的最长时间（秒），无需前端重试
+const KUBECONFIG_WAIT_SECONDS = 30;
 
 const app = createApp({
     setup() {
@@ -14,8 +24,7 @@ const app = createApp({
         const savedMenu = typeof localStorage !== 'undefined' ? localStorage.getItem(STORAGE_ACTIVE_MENU_KEY) : null;
         const activeMenu = ref(savedMenu || 'users');
         
-        // 数据
-        const users = ref([]);
+        // 数据（clusterRoles 为用户对话框下拉框使用的完整角色列表）
         const clusterRoles = ref([]);
         const namespaces = ref([]);
         
@@ -53,6 +62,8 @@ const app = createApp({
         // Kubeconfig 预览对话框
         const kubeconfigPreviewVisible = ref(false);
         const kubeconfigContent = ref('');
+        // TokenRequest 模式下令牌的过期时间，下载后的令牌不会自动轮换
+        const kubeconfigExpiration = ref('');
         const currentDownloadUser = ref(null);
         
         // 计算属性
@@ -88,6 +99,326 @@ const app = createApp({
             return response.json();
         };
         
+        // ==================== 增量加载列表 ====================
+        
+        // 与后端 search_terms 一致：按空白拆分、不区分大小写，需包含全部搜索词
+        const searchTerms = (text) => (text || '').toLowerCase().split(/\s+/).filter(Boolean);
+        
+        // 新搜索词的结果必然是旧搜索词结果的子集（每个旧词都包含在某个新词中）
+        const narrows = (oldTerms, newTerms) => oldTerms.every(o => newTerms.some(n => n.includes(o)));
+        
+        /**
+         * 按页从后端增量加载的列表，配合虚拟滚动表格使用。
+         * - 滚动到底部时加载下一页
+         * - 搜索先在已加载的行上本地过滤，防抖后再请求后端过滤结果；
+         *   已加载的是完整结果且新搜索词只会缩小范围时不再请求后端
+         * - 行数组整体替换（shallowRef），不对上万行做深层响应式
+         * textOf: 行的可搜索文本；idOf: 行的唯一标识；sortKeyOf: 与后端一致的排序键
+         */
+        const createPagedList = (url, { textOf, idOf, sortKeyOf }) => {
+            const rows = shallowRef([]);
+            const state = reactive({
+                total: 0,       // 后端按 query 过滤后的总数
+                query: '',      // rows 对应的后端搜索词
+                search: '',     // 输入框内容
+                filter: '',     // 防抖后的搜索词，用于本地过滤
+                loading: false
+            });
+            // 行的搜索文本缓存，过滤时不重复拼接
+            const texts = new WeakMap();
+            const rowText = (row) => {
+                let text = texts.get(row);
+                if (text === undefined) {
+                    text = textOf(row).toLowerCase();
+                    texts.set(row, text);
+                }
+                return text;
+            };
+            const withKey = (row) => {
+                row.rowKey = idOf(row);
+                return row;
+            };
+            
+            const complete = computed(() => rows.value.length >= state.total);
+            const visibleRows = computed(() => {
+                const terms = searchTerms(state.filter);
+                if (terms.length === 0 || state.filter === state.query) {
+                    return rows.value;
+                }
+                return rows.value.filter(row => {
+                    const text = rowText(row);
+                    return terms.every(term => text.includes(term));
+                });
+            });
+            // 本地结果完整时显示本地过滤数，否则显示后端总数
+            const count = computed(() => complete.value ? visibleRows.value.length : state.total);
+            
+            let generation = 0;
+            const fetchPage = async (reset) => {
+                const query = reset ? state.filter : state.query;
+                const offset = reset ? 0 : rows.value.length;
+                const current = ++generation;
+                state.loading = true;
+                try {
+                    const params = new URLSearchParams({ offset, limit: PAGE_SIZE });
+                    if (query) {
+                        params.set('search', query);
+                    }
+                    const data = await apiRequest(`${url}${url.includes('?') ? '&' : '?'}${params}`);
+                    // 期间发起了新的请求（如搜索词变化），丢弃过期结果
+                    if (current !== generation) {
+                        return;
+                    }
+                    const page = (data.data || []).map(withKey);
+                    rows.value = reset ? page : rows.value.concat(page);
+                    state.total = data.total;
+                    state.query = query;
+                } catch (error) {
+                    if (current === generation) {
+                        ElementPlus.ElMessage.error(error.message || '加载列表失败');
+                    }
+                } finally {
+                    if (current === generation) {
+                        state.loading = false;
+                    }
+                }
+            };
+            
+            const reload = () => fetchPage(true);
+            const loadMore = () => {
+                if (!state.loading && !complete.value) {
+                    fetchPage(false);
+                }
+            };
+            
+            let timer = null;
+            watch(() => state.search, (value) => {
+                clearTimeout(timer);
+                timer = setTimeout(() => {
+                    const previous = searchTerms(state.query);
+                    state.filter = value.trim();
+                    if (!(complete.value && narrows(previous, searchTerms(state.filter)))) {
+                        reload();
+                    }
+                }, SEARCH_DEBOUNCE_MS);
+            });
+            
+            // 本地插入或替换一行（创建、更新后无需重新加载整个列表）
+            const upsert = (row) => {
+                withKey(row);
+                const terms = searchTerms(state.query);
+                const text = rowText(row);
+                const index = rows.value.findIndex(r => r.rowKey === row.rowKey);
+                if (index > -1) {
+                    const next = rows.value.slice();
+                    next[index] = row;
+                    rows.value = next;
+                    return;
+                }
+                if (!terms.every(term => text.includes(term))) {
+                    return;
+                }
+                state.total += 1;
+                const key = sortKeyOf(row);
+                let position = rows.value.findIndex(r => sortKeyOf(r) > key);
+                if (position === -1) {
+                    // 排在已加载的行之后，未加载完时留给后续分页
+                    if (!complete.value) {
+                        return;
+                    }
+                    position = rows.value.length;
+                }
+                const next = rows.value.slice();
+                next.splice(position, 0, row);
+                rows.value = next;
+            };
+            
+            const remove = (id) => {
+                const next = rows.value.filter(r => r.rowKey !== id);
+                if (next.length !== rows.value.length) {
+                    rows.value = next;
+                    state.total -= 1;
+                }
+            };
+            
+            return reactive({
+                rows: visibleRows,
+                count,
+                state,
+                reload,
+                loadMore,
+                upsert,
+                remove
+            });
+        };
+        
+        const userId = (user) => `${user.metadata.namespace}/${user.metadata.name}`;
+        const userList = createPagedList(`${API_BASE}/lensusers`, {
+            textOf: (user) => [
+                user.metadata.name,
+                ...((user.spec && user.spec.roles) || []).map(role => `${role.name} ${role.namespace}`)
+            ].join(' '),
+            idOf: userId,
+            sortKeyOf: (user) => user.metadata.name
+        });
+        const roleList = createPagedList(`${API_BASE}/clusterroles`, {
+            textOf: (role) => `${role.name} ${(role.labels && role.labels.description) || ''}`,
+            idOf: (role) => role.name,
+            // 与后端一致：系统内置角色排在最后
+            sortKeyOf: (role) => `${role.managed ? 0 : 1}${role.name}`
+        });
+        
+        // 虚拟滚动表格的列定义，单元格内容见 index.html 中的 #cell 插槽
+        const userColumns = [
+            { key: 'name', title: '用户名', width: 200 },
+            { key: 'namespace', title: '命名空间', width: 150 },
+            { key: 'status', title: '状态', width: 100, align: 'center' },
+            { key: 'roles', title: '权限', width: 300, flexGrow: 1 },
+            { key: 'actions', title: '操作', width: 360, align: 'center' }
+        ];
+        const roleColumns = [
+            { key: 'name', title: '角色名称', width: 200 },
+            { key: 'description', title: '描述', width: 250, flexGrow: 1 },
+            { key: 'rules', title: '权限规则数', width: 120, align: 'center' },
+            { key: 'actions', title: '操作', width: 260, align: 'center' }
+        ];
+        
+        // ==================== 事件推送 ====================
+        
+        // 本页面创建、等待 kubeconfig 生成的用户（namespace/name）
+        const pendingKubeconfigs = new Set();
+        let eventController = null;
+        
+        // 事件流断开期间可能漏掉事件，重新加载当前列表
+        const resyncLists = () => {
+            if (activeMenu.value === 'roles') {
+                roleList.reload();
+            } else {
+                userList.reload();
+            }
+            clusterRoles.value = [];
+        };
+        
+        // 下拉框的完整角色列表已加载时同步更新
+        const applyClusterRole = (type, role) => {
+            if (clusterRoles.value.length === 0) {
+                return;
+            }
+            const next = clusterRoles.value.filter(r => r.name !== role.name);
+            if (type !== 'DELETED') {
+                next.push(role);
+            }
+            clusterRoles.value = next;
+        };
+        
+        const applyEvent = (kind, data) => {
+            const { type, object } = data;
+            if (kind === 'lensuser') {
+                if (object.metadata.namespace !== USER_NAMESPACE) {
+                    return;
+                }
+                if (type === 'DELETED') {
+                    userList.remove(userId(object));
+                } else {
+                    userList.upsert(object);
+                }
+            } else if (kind === 'clusterrole') {
+                if (type === 'DELETED') {
+                    roleList.remove(object.name);
+                } else {
+                    roleList.upsert(object);
+                }
+                applyClusterRole(type, object);
+            } else if (kind === 'luconfig' && type === 'ADDED') {
+                const id = userId(object);
+                if (pendingKubeconfigs.delete(id)) {
+                    ElementPlus.ElMessage.success(`用户 ${object.metadata.name} 的 Kubeconfig 已生成`);
+                }
+            }
+        };
+        
+        // 解析一条 SSE 消息（以空行分隔），忽略注释（心跳）与 retry 字段
+        const dispatchMessage = (block) => {
+            let kind = 'message';
+            const data = [];
+            for (const line of block.split('\n')) {
+                if (line.startsWith('event:')) {
+                    kind = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    data.push(line.slice(5).trim());
+                }
+            }
+            if (kind === 'resync') {
+                resyncLists();
+            } else if (data.length > 0) {
+                applyEvent(kind, JSON.parse(data.join('\n')));
+            }
+        };
+        
+        // 用 fetch 读取 /api/events（EventSource 无法携带 Authorization 头），断线后指数退避重连
+        const connectEvents = async () => {
+            if (eventController) {
+                return;
+            }
+            const controller = new AbortController();
+            eventController = controller;
+            let delay = 1000;
+            let connected = false;
+            while (eventController === controller) {
+                try {
+                    const response = await fetch(`${API_BASE}/events`, {
+                        headers: { Authorization: `Bearer ${token.value}` },
+                        signal: controller.signal
+                    });
+                    if (response.status === 401) {
+                        handleLogout();
+                        return;
+                    }
+                    if (!response.ok) {
+                        throw new Error(`事件流连接失败: ${response.status}`);
+                    }
+                    if (connected) {
+                        resyncLists();
+                    }
+                    connected = true;
+                    delay = 1000;
+                    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+                    let buffer = '';
+                    while (true) {
+                        const { value, done } = await reader.read();
+                        if (done) {
+                            break;
+                        }
+                        buffer += value;
+                        let index;
+                        while ((index = buffer.indexOf('\n\n')) > -1) {
+                            dispatchMessage(buffer.slice(0, index));
+                            buffer = buffer.slice(index + 2);
+                        }
+                    }
+                } catch (error) {
+                    if (controller.signal.aborted) {
+                        return;
+                    }
+                    console.warn('事件流断开，稍后重连', error);
+                }
+                await new Promise(resolve => setTimeout(resolve, delay));
+                delay = Math.min(delay * 2, EVENTS_MAX_RETRY_MS);
+            }
+        };
+        
+        const disconnectEvents = () => {
+            if (eventController) {
+                eventController.abort();
+                eventController = null;
+            }
+        };
+        
+        // 权限列只展示前几个标签，其余汇总到提示中，保证固定行高
+        const roleSummary = (roles) => (roles || []).slice(MAX_ROLE_TAGS)
+            .map(role => `${role.name} @ ${role.namespace}`)
+            .join(', ');
+        
         // 登录
         const handleLogin = async () => {
             if (!loginForm.username || !loginForm.password) {
@@ -110,7 +441,8 @@ const app = createApp({
                 localStorage.setItem(STORAGE_ACTIVE_MENU_KEY, activeMenu.value);
                 
                 ElementPlus.ElMessage.success('登录成功');
-                await Promise.all([loadUsers(), loadClusterRoles(), loadNamespaces()]);
+                connectEvents();
+                await Promise.all([userList.reload(), loadClusterRoles(), loadNamespaces()]);
             } catch (error) {
                 ElementPlus.ElMessage.error(error.message || '登录失败');
             } finally {
@@ -120,6 +452,7 @@ const app = createApp({
         
         // 登出
         const handleLogout = () => {
+            disconnectEvents();
             isLoggedIn.value = false;
             token.value = '';
             username.value = '';
@@ -134,9 +467,9 @@ const app = createApp({
             activeMenu.value = index;
             localStorage.setItem(STORAGE_ACTIVE_MENU_KEY, index);
             if (index === 'users') {
-                await loadUsers();
+                await userList.reload();
             } else if (index === 'roles') {
-                await loadClusterRoles();
+                await roleList.reload();
             }
         };
         
@@ -149,21 +482,6 @@ const app = createApp({
         
         // ==================== 用户管理 ====================
         
-        const loadUsers = async () => {
-            loading.value = true;
-            try {
-                const data = await apiRequest(`${API_BASE}/lensusers`);
-                users.value = data.data || [];
-                console.log('用户列表数据:', users.value);
-                console.log('第一个用户:', users.value[0]);
-            } catch (error) {
-                ElementPlus.ElMessage.error(error.message || '加载用户列表失败');
-                users.value = [];
-            } finally {
-                loading.value = false;
-            }
-        };
-        
         const showCreateUserDialog = async () => {
             isEditMode.value = false;
             userDialogTitle.value = '创建用户';
@@ -214,22 +532,25 @@ const app = createApp({
             
             loading.value = true;
             try {
+                let result;
                 if (isEditMode.value) {
-                    await apiRequest(`${API_BASE}/lensusers/${userForm.name}?namespace=${userForm.namespace}`, {
+                    result = await apiRequest(`${API_BASE}/lensusers/${userForm.name}?namespace=${userForm.namespace}`, {
                         method: 'PUT',
                         body: JSON.stringify({ roles: userForm.roles })
                     });
                     ElementPlus.ElMessage.success('用户更新成功');
                 } else {
-                    await apiRequest(`${API_BASE}/lensusers`, {
+                    result = await apiRequest(`${API_BASE}/lensusers`, {
                         method: 'POST',
                         body: JSON.stringify(userForm)
                     });
                     ElementPlus.ElMessage.success('用户创建成功');
+                    pendingKubeconfigs.add(`${userForm.namespace}/${userForm.name}`);
                 }
                 
                 userDialogVisible.value = false;
-                await loadUsers();
+                // 用接口返回的对象更新当前行，不重新加载整个列表
+                userList.upsert(result.data);
             } catch (error) {
                 ElementPlus.ElMessage.error(error.message || '保存用户失败');
             } finally {
@@ -254,16 +575,8 @@ const app = createApp({
                     method: 'DELETE'
                 });
                 ElementPlus.ElMessage.success('用户删除成功');
-                // 立即从列表中移除
-                const index = users.value.findIndex(u => 
-                    u.metadata.name === user.metadata.name && 
-                    u.metadata.namespace === user.metadata.namespace
-                );
-                if (index > -1) {
-                    users.value.splice(index, 1);
-                }
-                // 重新加载确保同步
-                await loadUsers();
+                // 直接从列表中移除，不重新加载整个列表
+                userList.remove(userId(user));
             } catch (error) {
                 if (error !== 'cancel') {
                     ElementPlus.ElMessage.error(error.message || '删除用户失败');
@@ -273,19 +586,44 @@ const app = createApp({
             }
         };
         
+        // 用户就绪状态，直接取自列表返回的 status.conditions
+        const userReadiness = (user) => {
+            const conditions = (user.status && user.status.conditions) || [];
+            const ready = conditions.find(c => c.type === 'Ready');
+            if (!ready) {
+                return { type: 'info', text: '未知', message: '' };
+            }
+            if (ready.status === 'True') {
+                return { type: 'success', text: '就绪', message: '' };
+            }
+            if (ready.reason === 'Failed') {
+                return { type: 'danger', text: '失败', message: ready.message };
+            }
+            if (ready.reason === 'Retrying') {
+                return { type: 'warning', text: '重试中', message: ready.message };
+            }
+            return { type: 'info', text: '处理中', message: '' };
+        };
+        
         const previewKubeconfig = async (user) => {
+            loading.value = true;
             try {
-                const data = await apiRequest(`${API_BASE}/lensusers/${user.metadata.name}/kubeconfig?namespace=${user.metadata.namespace}`);
+                const data = await apiRequest(`${API_BASE}/lensusers/${user.metadata.name}/kubeconfig?namespace=${user.metadata.namespace}&wait=${KUBECONFIG_WAIT_SECONDS}`);
                 const config = data.data;
                 
                 kubeconfigContent.value = jsyaml.dump(config, { indent: 2 });
+                kubeconfigExpiration.value = formatExpiration(data.expirationTimestamp);
                 currentDownloadUser.value = user;
                 kubeconfigPreviewVisible.value = true;
             } catch (error) {
                 ElementPlus.ElMessage.error(error.message || '获取 Kubeconfig 失败');
+            } finally {
+                loading.value = false;
             }
         };
         
+        const formatExpiration = (timestamp) => timestamp ? new Date(timestamp).toLocaleString() : '';
+        
         const downloadKubeconfig = () => {
             if (!kubeconfigContent.value) {
                 ElementPlus.ElMessage.error('配置内容为空');
@@ -317,7 +655,7 @@ const app = createApp({
         const downloadKubeconfigDirect = async (user) => {
             try {
                 loading.value = true;
-                const data = await apiRequest(`${API_BASE}/lensusers/${user.metadata.name}/kubeconfig?namespace=${user.metadata.namespace}`);
+                const data = await apiRequest(`${API_BASE}/lensusers/${user.metadata.name}/kubeconfig?namespace=${user.metadata.namespace}&wait=${KUBECONFIG_WAIT_SECONDS}`);
                 const config = data.data;
                 
                 // 转换为 YAML 格式
@@ -338,7 +676,12 @@ const app = createApp({
                 a.click();
                 URL.revokeObjectURL(url);
                 
-                ElementPlus.ElMessage.success(`配置文件已下载为: ${filename}`);
+                const expiration = formatExpiration(data.expirationTimestamp);
+                if (expiration) {
+                    ElementPlus.ElMessage.warning(`配置文件已下载为: ${filename}，其中的令牌将于 ${expiration} 过期`);
+                } else {
+                    ElementPlus.ElMessage.success(`配置文件已下载为: ${filename}`);
+                }
             } catch (error) {
                 ElementPlus.ElMessage.error(error.message || '下载 Kubeconfig 失败');
             } finally {
@@ -428,6 +771,29 @@ const app = createApp({
             loading.value = true;
             try {
                 if (isEditRoleMode.value) {
+                    // 先预览变更影响范围，确认后再提交
+                    const preview = await apiRequest(`${API_BASE}/clusterroles/${roleForm.name}/preview`, {
+                        method: 'POST',
+                        body: JSON.stringify({
+                            description: roleForm.description,
+                            rules: roleForm.rules
+                        })
+                    });
+                    const impact = preview.data;
+                    const scope = impact.clusterWide
+                        ? '所有命名空间（存在 ClusterRoleBinding）'
+                        : `${impact.namespaces.length} 个命名空间`;
+                    const groups = impact.groups.length ? `，另有用户组 ${impact.groups.join('、')} 被授予该角色` : '';
+                    await ElementPlus.ElMessageBox.confirm(
+                        `新增 ${impact.added.length} 项权限，移除 ${impact.removed.length} 项权限；` +
+                        `将影响 ${impact.lensusers.length} 个用户、${scope}${groups}。确定更新吗？`,
+                        '变更影响',
+                        {
+                            confirmButtonText: '确定',
+                            cancelButtonText: '取消',
+                            type: 'warning'
+                        }
+                    );
                     await apiRequest(`${API_BASE}/clusterroles/${roleForm.name}`, {
                         method: 'PUT',
                         body: JSON.stringify({
@@ -445,9 +811,13 @@ const app = createApp({
                 }
                 
                 roleDialogVisible.value = false;
-                await loadClusterRoles();
+                // 下拉框的完整角色列表在下次打开用户对话框时重新加载
+                clusterRoles.value = [];
+                await roleList.reload();
             } catch (error) {
-                ElementPlus.ElMessage.error(error.message || '保存角色失败');
+                if (error !== 'cancel') {
+                    ElementPlus.ElMessage.error(error.message || '保存角色失败');
+                }
             } finally {
                 loading.value = false;
             }
@@ -470,7 +840,8 @@ const app = createApp({
                     method: 'DELETE'
                 });
                 ElementPlus.ElMessage.success('角色删除成功');
-                await loadClusterRoles();
+                clusterRoles.value = [];
+                await roleList.reload();
             } catch (error) {
                 if (error !== 'cancel') {
                     ElementPlus.ElMessage.error(error.message || '删除角色失败');
@@ -517,11 +888,12 @@ const app = createApp({
                 const initialLoads = [loadNamespaces()];
                 // 根据当前菜单加载对应数据，其余懒加载
                 if (activeMenu.value === 'roles') {
-                    initialLoads.push(loadClusterRoles());
+                    initialLoads.push(roleList.reload());
                 } else {
-                    initialLoads.push(loadUsers());
+                    initialLoads.push(userList.reload());
                 }
                 Promise.all(initialLoads);
+                connectEvents();
             }
         });
         
@@ -532,7 +904,11 @@ const app = createApp({
             loading,
             loginLoading,
             activeMenu,
-            users,
+            userList,
+            roleList,
+            userColumns,
+            roleColumns,
+            MAX_ROLE_TAGS,
             clusterRoles,
             namespaces,
             loginForm,
@@ -548,6 +924,7 @@ const app = createApp({
             viewingRole,
             kubeconfigPreviewVisible,
             kubeconfigContent,
+            kubeconfigExpiration,
             currentDownloadUser,
             pageTitle,
             handleLogin,
@@ -558,6 +935,8 @@ const app = createApp({
             editUser,
             saveUser,
             deleteUser,
+            userReadiness,
+            roleSummary,
             previewKubeconfig,
             downloadKubeconfig,
             downloadKubeconfigDirect,
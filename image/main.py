@@ -1,16 +1,147 @@
 import base64
+import json
 import os
 import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import kopf
 import kubernetes
 import yaml
 from kubernetes.client.rest import ApiException
 
+from operator_bindings import AggregatedBindings
+from operator_cache import ObjectCache, handoff, is_pending
+from operator_debounce import Debouncer
+from operator_gc import OrphanSweeper, OwnerLabels
+from operator_leader import LeaderElector
+from operator_ratelimit import api_client, limiter
+from operator_retry import Retrier, is_conflict, is_not_found
+from operator_sharding import ShardMembership
+from operator_status import set_conditions
+from operator_storage import CompactDiffBaseStorage, CompactProgressStorage
+from operator_verify import ResumeVerifier
+
 # 获取 CRD 组名配置
 CRD_GROUP = os.getenv('CRD_GROUP', 'osip.cc')
 CRD_VERSION = os.getenv('CRD_VERSION', 'v1')
 
+# 集合形式的标签选择器条件，如 "env in (a,b)"、"tier notin (x)"
+SET_BASED_REQUIREMENT = re.compile(r'[()]|\s(in|notin)\s')
+
+
+def parse_label_selector(selector):
+    """
+    将 "a=b,c!=d,e,!f" 形式的标签选择器转换为 kopf 的 labels 过滤条件。
+    kopf 不支持集合形式（in / notin），遇到时直接报错，避免只按部分条件过滤
+    """
+    if SET_BASED_REQUIREMENT.search(selector):
+        raise ValueError(f"Set-based label requirements (in / notin) are not supported: {selector!r}")
+    labels = {}
+    for term in (t.strip() for t in selector.split(',')):
+        if not term:
+            continue
+        if '!=' in term:
+            key, value = (s.strip() for s in term.split('!=', 1))
+            labels[key] = _not_equal(value)
+        elif '=' in term:
+            key, value = (s.strip() for s in term.replace('==', '=').split('=', 1))
+            labels[key] = value
+        elif term.startswith('!'):
+            labels[term[1:].strip()] = kopf.ABSENT
+        else:
+            labels[term] = kopf.PRESENT
+    return labels
+
+
+def _not_equal(expected):
+    return lambda actual, **_: actual != expected
+
+
+# 监听范围：命名空间列表由 start.py 传给 kopf（--namespace），为空表示所有命名空间；
+# 标签选择器作用于所有 LensUser handler，不匹配的对象不会被缓存和处理
+WATCH_NAMESPACES = [ns.strip() for ns in os.getenv('WATCH_NAMESPACES', '').split(',') if ns.strip()]
+LENSUSER_LABELS = parse_label_selector(os.getenv('WATCH_LABEL_SELECTOR', '')) or None
+
+# 凭据模式：secret（默认，长期 Token Secret）或 tokenrequest（由 Web UI 按需签发短期令牌）
+CREDENTIAL_MODE = os.getenv('CREDENTIAL_MODE', 'secret')
+CREDENTIAL_MODE_ANNOTATION = f"usermanager.{CRD_GROUP}/credential-mode"
+SA_CA_PATH = '/var/run/secrets/kubernetes.io/serviceaccount/ca.crt'
+
+# 多副本模式：peering（默认，kopf 对等选主，仅一个副本工作）、
+# leader（Lease 选主，备用副本热备）或 shard（所有副本按一致性哈希分片并行工作）
+OPERATOR_HA_MODE = os.getenv('OPERATOR_HA_MODE', 'peering')
+HANDOFF_ANNOTATION = f"usermanager.{CRD_GROUP}/handoff"
+# 备用副本使用的 finalizer，备用副本不会添加它，也就不会移除主副本的 finalizer
+STANDBY_FINALIZER = f"usermanager.{CRD_GROUP}/standby"
+
+# RoleBinding 模式：per-user（默认，每个用户每个命名空间一个 RoleBinding）
+# 或 aggregated（每个 (namespace, ClusterRole) 一个 RoleBinding，subjects 中列出所有用户）
+ROLEBINDING_MODE = os.getenv('ROLEBINDING_MODE', 'per-user')
+aggregated_bindings = AggregatedBindings(
+    CRD_GROUP,
+    window_seconds=float(os.getenv('ROLEBINDING_BATCH_WINDOW', '0.1')),
+) if ROLEBINDING_MODE == 'aggregated' else None
+
+# 重启后批量校验：共享一份集群快照，只重新处理与快照不一致的 LensUser
+resume_verifier = ResumeVerifier(
+    CRD_GROUP, CRD_VERSION, CREDENTIAL_MODE, CREDENTIAL_MODE_ANNOTATION,
+    binding_name=aggregated_bindings.binding_name if aggregated_bindings is not None else None,
+    ttl_seconds=float(os.getenv('RESUME_SNAPSHOT_TTL', '60')),
+    # 带通配符的命名空间无法按命名空间 list，退回全集群 list
+    namespaces=WATCH_NAMESPACES if not any(c in ns for ns in WATCH_NAMESPACES for c in '*?[!') else None,
+)
+
+# spec.roles 在窗口内持续变化时推迟 update_lu，合并为一次处理；最长推迟 max_delay 秒。
+# 默认关闭（窗口为 0），限制见 operator_debounce
+roles_debouncer = Debouncer(
+    window_seconds=float(os.getenv('ROLES_DEBOUNCE_WINDOW', '0')),
+    max_delay_seconds=float(os.getenv('ROLES_DEBOUNCE_MAX_DELAY', '30')),
+)
+
+# 删除用户时并发清理各命名空间资源的线程数
+DELETE_WORKERS = int(os.getenv('DELETE_WORKERS', '16'))
+
+# 受管对象上的所属用户标签，以及按标签定期回收孤儿对象的后台线程（间隔为 0 表示不回收）
+owner_labels = OwnerLabels(CRD_GROUP)
+GC_SWEEP_INTERVAL = float(os.getenv('GC_SWEEP_INTERVAL', '600'))
+orphan_sweeper = OrphanSweeper(
+    CRD_GROUP, CRD_VERSION,
+    interval_seconds=GC_SWEEP_INTERVAL,
+    is_active=lambda: _sweeper_active(),
+    owns=(lambda name, namespace: membership.owns(name, namespace)) if OPERATOR_HA_MODE == 'shard' else None,
+)
+
+lensuser_cache = ObjectCache()
+membership = ShardMembership(
+    CRD_GROUP,
+    shard_by=os.getenv('SHARD_BY', 'user'),
+    heartbeat_seconds=float(os.getenv('SHARD_HEARTBEAT_SECONDS', '5')),
+    lease_duration_seconds=int(os.getenv('SHARD_LEASE_DURATION_SECONDS', '15')),
+) if OPERATOR_HA_MODE == 'shard' else None
+elector = LeaderElector(
+    'kube-user-manage-leader',
+    lease_duration_seconds=float(os.getenv('LEADER_LEASE_DURATION_SECONDS', '2')),
+    renew_seconds=float(os.getenv('LEADER_RENEW_SECONDS', '0.5')),
+) if OPERATOR_HA_MODE == 'leader' else None
+# 对等模式下 kopf 不对外暴露副本是否处于暂停状态，孤儿回收另用一个 Lease 选出唯一执行的副本
+gc_elector = LeaderElector(
+    'kube-user-manage-gc',
+    lease_duration_seconds=30,
+    renew_seconds=10,
+) if OPERATOR_HA_MODE == 'peering' and GC_SWEEP_INTERVAL > 0 else None
+
+
+def _sweeper_active():
+    """只有一个副本回收：热备模式为主副本，对等模式为持有回收 Lease 的副本；分片模式各副本只回收自己的对象"""
+    if elector is not None:
+        return elector.is_leader
+    if gc_elector is not None:
+        return gc_elector.is_leader
+    return True
+
 '''
 启动的时候，自动应用CRD
 '''
@@ -18,13 +149,37 @@ CRD_VERSION = os.getenv('CRD_VERSION', 'v1')
 
 @kopf.on.startup()
 def apply_crd(logger, settings, **kwargs):
-    settings.peering.name = "kube-user-manage"
-    settings.peering.priority = random.randint(0, 32767)
     settings.watching.client_timeout = 60
     settings.watching.server_timeout = 60
-    configuration = kubernetes.config.load_incluster_config()
+    # diffbase 与进度只存放在 status 中，且 diffbase 只保留 spec，减小每个 LensUser 的体积；
+    # 不由本副本负责的对象（分片不属于自己、或处于备用状态）不写入 kopf 状态，
+    # 避免覆盖负责副本推迟或重试中的处理
+    settings.persistence.diffbase_storage = CompactDiffBaseStorage(gate=_responsible_for_body)
+    settings.persistence.progress_storage = CompactProgressStorage(gate=_responsible_for_body)
+    kubernetes.config.load_incluster_config()
+    if membership is not None:
+        # 分片模式下所有副本同时工作，不参与 kopf 的对等选主，且各自使用独立的 finalizer
+        settings.peering.standalone = True
+        settings.persistence.finalizer = membership.finalizer
+        membership.on_change = lambda old, new: _take_over_shard(old, new, settings, logger)
+        membership.start(logger)
+    elif elector is not None:
+        # 热备模式下所有副本都保持 watch 与缓存，只有主副本执行 handler 并写入 kopf 状态
+        settings.peering.standalone = True
+        leader_finalizer = settings.persistence.finalizer
+        settings.persistence.finalizer = STANDBY_FINALIZER
+        elector.on_started_leading = lambda: _take_over_leadership(leader_finalizer, settings, logger)
+        elector.on_stopped_leading = lambda: setattr(settings.persistence, 'finalizer', STANDBY_FINALIZER)
+        elector.start(logger)
+    else:
+        settings.peering.name = "kube-user-manage"
+        settings.peering.priority = random.randint(0, 32767)
+        if gc_elector is not None:
+            gc_elector.start(logger)
+    orphan_sweeper.start(logger)
     crds = ['template/crd.yaml', 'template/lu-config-crd.yaml']
-    api = kubernetes.client.ApiextensionsV1Api(configuration)
+    api = kubernetes.client.ApiextensionsV1Api(api_client())
+    retry = Retrier(logger)
     
     logger.info(f"Using CRD Group: {CRD_GROUP}, Version: {CRD_VERSION}")
     
@@ -36,25 +191,137 @@ def apply_crd(logger, settings, **kwargs):
         data = yaml.safe_load(text)
 
         try:
-            api.read_custom_resource_definition(name=data['metadata']['name'])
+            retry(api.read_custom_resource_definition, name=data['metadata']['name'])
             logger.info(f"crd already exist: {data['metadata']['name']}")
         except ApiException as e:
-            if e.reason == "Conflict":
+            if is_conflict(e):
                 logger.info("%s\n" % e.body)
             else:
-                api.create_custom_resource_definition(body=data)
+                retry(api.create_custom_resource_definition, body=data)
                 logger.info(f"CRD created: {data['metadata']['name']}")
 
     return {'crd_status': True}
 
 
+'''
+限流器状态，通过 kopf 的 liveness 端点暴露（含读写队列深度）
+'''
+
+
+@kopf.on.probe(id='api_rate_limiter')
+def rate_limiter_stats(**kwargs):
+    return limiter.stats()
+
+
+@kopf.on.cleanup()
+def release_ha(logger, **kwargs):
+    orphan_sweeper.stop(logger)
+    if membership is not None:
+        membership.stop(logger)
+    if elector is not None:
+        elector.stop(logger)
+    if gc_elector is not None:
+        gc_elector.stop(logger)
+
+
+'''
+多副本归属：所有副本缓存全部 LensUser；分片模式只处理哈希环上属于自己的对象，热备模式只有主副本处理
+'''
+
+
+@kopf.on.event('lensuser', group=CRD_GROUP, version=CRD_VERSION, labels=LENSUSER_LABELS)
+def cache_lu(event, body, name, namespace, logger, **kwargs):
+    lensuser_cache.apply(event.get('type'), body)
+    if event.get('type') == 'DELETED':
+        roles_debouncer.forget((namespace, name))
+    else:
+        roles_debouncer.observe((namespace, name), body.get('spec', {}).get('roles'))
+    if membership is None or event.get('type') == 'DELETED' or not membership.owns(name, namespace):
+        return
+    # 归属本副本的对象上残留已离开副本（或未分片时）的 finalizer，接管之
+    if any(membership.is_stale_finalizer(f) for f in body['metadata'].get('finalizers', [])):
+        _hand_off(body, logger)
+
+
+def _responsible_for_body(body):
+    """当前副本是否负责该对象，决定是否写入 kopf 的 diffbase 与进度"""
+    metadata = body['metadata']
+    return is_responsible(metadata['name'], metadata.get('namespace'))
+
+
+def is_responsible(name, namespace, **kwargs):
+    """当前副本是否负责处理该 LensUser"""
+    if elector is not None:
+        return elector.is_leader
+    return membership is None or membership.owns(name, namespace)
+
+
+def _take_over_leadership(finalizer, settings, logger):
+    """
+    成为主副本：切换到共享 finalizer，并只为仍有未完成工作的对象触发一次事件。
+    已处理完的对象不会重跑 handler，避免切换后重新创建所有资源。
+    """
+    settings.persistence.finalizer = finalizer
+
+    def touch_pending():
+        # 回调在 is_leader 置位之前执行；等置位后再触发事件，保证这些事件的处理结果会被写入
+        deadline = time.monotonic() + 5
+        while not elector.is_leader and time.monotonic() < deadline:
+            time.sleep(0.05)
+        bodies = [body for _, body in lensuser_cache.items() if is_pending(body, settings)]
+        if bodies:
+            logger.info(f"Resuming {len(bodies)} pending LensUsers after leader failover")
+        for body in bodies:
+            handoff(CRD_GROUP, CRD_VERSION, 'lensuser', HANDOFF_ANNOTATION, body,
+                    finalizer, lambda f: False, logger)
+
+    threading.Thread(target=touch_pending, name='leader-takeover', daemon=True).start()
+
+
+def _take_over_shard(old_ring, new_ring, settings, logger):
+    """成员变化后接管新划入本副本的对象：转移 finalizer，并为仍有未完成工作的对象触发一次事件"""
+    bodies = []
+    for (namespace, name), body in lensuser_cache.items():
+        key = membership.shard_key(name, namespace)
+        if new_ring.owner(key) != membership.identity or old_ring.owner(key) == membership.identity:
+            continue
+        if membership.finalizer not in body['metadata'].get('finalizers', []) or is_pending(body, settings):
+            bodies.append(body)
+    if bodies:
+        logger.info(f"Taking over {len(bodies)} LensUsers after shard rebalance")
+    for body in bodies:
+        _hand_off(body, logger)
+
+
+def _hand_off(body, logger):
+    handoff(CRD_GROUP, CRD_VERSION, 'lensuser', HANDOFF_ANNOTATION, body,
+            membership.finalizer, membership.is_stale_finalizer, logger)
+
+
 '''
 创建账号信息，并绑定
 '''
 
 
-@kopf.on.create('lensuser', group=CRD_GROUP, version=CRD_VERSION)
-def create_lu(spec, name, namespace, logger, **kwargs):
+@kopf.on.create('lensuser', group=CRD_GROUP, version=CRD_VERSION, labels=LENSUSER_LABELS, when=is_responsible)
+def create_lu(spec, name, namespace, logger, patch, status, **kwargs):
+    return _reporting(patch, status, lambda ready: _create_lu(spec, name, namespace, logger, ready))
+
+
+def _reporting(patch, status, handler):
+    """执行 handler 并把各子状态及失败原因随 handler 结果写入同一次 status patch"""
+    ready = {}
+    try:
+        result = handler(ready)
+    except Exception as e:
+        set_conditions(patch, status, ready, error=e)
+        raise
+    set_conditions(patch, status, ready)
+    return result
+
+
+def _create_lu(spec, name, namespace, logger, ready):
+    ready['RoleBindingsReady'] = ready['TokenReady'] = False
     roles = spec.get('roles')
     if not roles:
         raise kopf.PermanentError(f"roles must be set. Got {roles!r}.")
@@ -62,120 +329,56 @@ def create_lu(spec, name, namespace, logger, **kwargs):
     path = os.path.join(os.path.dirname(__file__), 'template/sa.yaml')
     tmpl = open(path, 'rt').read()
     text = tmpl.format(name=name)
-    data = yaml.safe_load(text)
+    data = owner_labels.apply(yaml.safe_load(text), name, namespace)
     kopf.adopt(data)
-    api = kubernetes.client.CoreV1Api()
+    api = kubernetes.client.CoreV1Api(api_client())
+    retry = Retrier(logger)
 
     try:
-        api.create_namespaced_service_account(
+        retry(
+            api.create_namespaced_service_account,
             namespace=namespace,
             body=data,
         )
         logger.info(f"ServiceAccount '{name}' created successfully in namespace '{namespace}'")
     except ApiException as e:
-        if e.reason == "Conflict":
+        if is_conflict(e):
             logger.info(f"ServiceAccount '{name}' already exists, continuing...")
         else:
             logger.error(f"Failed to create ServiceAccount: {e.reason} - {e.body}")
             raise kopf.PermanentError(f"ServiceAccount create failed: {e.reason} - {e.body}")
 
-    api = kubernetes.client.RbacAuthorizationV1Api()
+    api = kubernetes.client.RbacAuthorizationV1Api(api_client())
+    if aggregated_bindings is not None:
+        _sync_aggregated_bindings(name, namespace, roles, [], logger)
+        roles = []
     for role in roles:
         path = os.path.join(os.path.dirname(__file__), 'template/rolebinding.yaml')
         tmpl = open(path, 'rt').read()
         text = tmpl.format(sa_name=name, sa_namespace=namespace, role_name=role.get('name'))
-        data = yaml.safe_load(text)
+        data = owner_labels.apply(yaml.safe_load(text), name, namespace)
 
         try:
-            api.create_namespaced_role_binding(
+            retry(
+                api.create_namespaced_role_binding,
                 namespace=role.get('namespace'),
                 body=data,
             )
             logger.info(f"RoleBinding '{name}' created in namespace '{role.get('namespace')}' for role '{role.get('name')}'")
         except ApiException as e:
-            if e.reason == "Conflict":
+            if is_conflict(e):
                 logger.info(f"RoleBinding '{name}' already exists in namespace '{role.get('namespace')}', continuing...")
             else:
                 logger.error(f"Failed to create RoleBinding: {e.reason} - {e.body}")
                 raise kopf.PermanentError(f"RoleBinding create failed for role '{role.get('name')}': {e.reason} - {e.body}")
+    ready['RoleBindingsReady'] = True
 
-    api = kubernetes.client.CoreV1Api()
-    api_client = kubernetes.client.ApiClient()
-    
-    # 检查是否有自动生成的 secret
-    sa = api.read_namespaced_service_account(name=name, namespace=namespace)
-    if not sa.secrets:
-        # 1.24+ 版本，手动创建永久 token secret
-        try:
-            # 使用 template 创建 Secret
-            path = os.path.join(os.path.dirname(__file__), 'template/secret.yaml')
-            tmpl = open(path, 'rt').read()
-            text = tmpl.format(name=name, namespace=namespace)
-            data = yaml.safe_load(text)
-            kopf.adopt(data)
-            
-            # 创建 Secret
-            secret = api.create_namespaced_secret(
-                namespace=namespace,
-                body=data
-            )
-            
-            # 将 Secret 绑定到 ServiceAccount 的 secrets 字段
-            try:
-                # 直接更新 ServiceAccount，添加 secret 引用
-                secret_ref = kubernetes.client.V1ObjectReference(
-                    name=f"{name}-token",
-                    namespace=namespace
-                )
-                
-                # 使用 patch 操作添加 secret 引用
-                patch_body = {
-                    "secrets": [secret_ref]
-                }
-                
-                api.patch_namespaced_service_account(
-                    name=name,
-                    namespace=namespace,
-                    body=patch_body
-                )
-                
-                sa_secret_name = f"{name}-token"
-                
-                logger.info(f"Successfully bound secret {name}-token to ServiceAccount {name}")
-                
-            except Exception as e:
-                logger.error(f"Failed to bind secret to ServiceAccount: {e}")
-            
-        except Exception as e:
-            logger.error(f"Failed to create token secret: {e}")
-            raise kopf.PermanentError(f"Token secret creation failed: {e}")
+    if CREDENTIAL_MODE == 'tokenrequest':
+        # TokenRequest 模式：不创建 Secret、不轮询 token，令牌在获取 kubeconfig 时按需签发
+        ca, token = _cluster_ca(), ''
     else:
-        # 兼容旧版本，使用自动生成的 secret
-        # sa.secrets 是 V1ObjectReference 对象列表，需要用 .name 属性访问
-        sa_secret_name = sa.secrets[-1].name
+        ca, token = _issue_secret_token(name, namespace, logger, retry)
 
-    # 等待 Secret 的 token 数据生成（最多等待30秒）
-    import time
-    max_wait = 30
-    waited = 0
-    secret_info = None
-    
-    while waited < max_wait:
-        secret = api.read_namespaced_secret(name=sa_secret_name, namespace=namespace)
-        secret_info = api_client.sanitize_for_serialization(secret.data)
-        
-        if secret_info and secret_info.get('token'):
-            logger.info(f"Secret '{sa_secret_name}' token generated after {waited} seconds")
-            break
-        
-        logger.info(f"Waiting for Secret '{sa_secret_name}' token to be generated... ({waited}/{max_wait}s)")
-        time.sleep(2)
-        waited += 2
-    
-    if not secret_info or not secret_info.get('token'):
-        logger.error(f"Secret '{sa_secret_name}' token not generated after {max_wait} seconds")
-        raise kopf.PermanentError(f"Secret token not generated for '{sa_secret_name}' after {max_wait}s. Check token-controller logs.")
-    
     path = os.path.join(os.path.dirname(__file__), 'template/kube-config.yaml')
     tmpl = open(path, 'rt').read()
     kube_config = tmpl.format(
@@ -185,17 +388,18 @@ def create_lu(spec, name, namespace, logger, **kwargs):
         namespace=namespace,
         cluster_name=os.getenv('cluster_name'),
         api_url=os.getenv('kube_api_url'),
-        ca=secret_info.get('ca.crt', 'NULL'),
-        token=base64.b64decode(secret_info.get('token', 'NULL').encode('utf-8')).decode('utf-8'))
+        ca=ca,
+        token=token)
 
     logger.info(f"sa info:\n{kube_config}")
 
-    crd_api = kubernetes.client.CustomObjectsApi()
+    crd_api = kubernetes.client.CustomObjectsApi(api_client())
 
     # 检查 LuConfig 是否已存在，如果存在则更新，否则创建
     try:
         # 尝试读取现有的 LuConfig
-        existing_luconfig = crd_api.get_namespaced_custom_object(
+        existing_luconfig = retry(
+            crd_api.get_namespaced_custom_object,
             group=CRD_GROUP,
             version=CRD_VERSION,
             namespace=namespace,
@@ -209,10 +413,13 @@ def create_lu(spec, name, namespace, logger, **kwargs):
         new_config = yaml.safe_load(kube_config)
         # 保留现有的 metadata（包括 resourceVersion）
         new_config['metadata'] = existing_luconfig['metadata']
+        new_config['metadata'].setdefault('annotations', {})[CREDENTIAL_MODE_ANNOTATION] = CREDENTIAL_MODE
+        owner_labels.apply(new_config, name, namespace)
         # 更新 spec
         new_config['spec'] = yaml.safe_load(kube_config)['spec']
         
-        crd_api.replace_namespaced_custom_object(
+        retry(
+            crd_api.replace_namespaced_custom_object,
             group=CRD_GROUP,
             version=CRD_VERSION,
             namespace=namespace,
@@ -222,88 +429,285 @@ def create_lu(spec, name, namespace, logger, **kwargs):
         )
         logger.info(f"LuConfig '{name}' updated successfully")
     except ApiException as e:
-        if e.status == 404:
+        if is_not_found(e):
             # 不存在，则创建
             logger.info(f"LuConfig '{name}' does not exist, creating...")
-            crd_api.create_namespaced_custom_object(
+            new_config = yaml.safe_load(kube_config)
+            new_config['metadata']['annotations'] = {CREDENTIAL_MODE_ANNOTATION: CREDENTIAL_MODE}
+            owner_labels.apply(new_config, name, namespace)
+            retry(
+                crd_api.create_namespaced_custom_object,
                 group=CRD_GROUP,
                 version=CRD_VERSION,
                 namespace=namespace,
                 plural='luconfig',
-                body=yaml.safe_load(kube_config)
+                body=new_config
             )
             logger.info(f"LuConfig '{name}' created successfully")
         else:
             logger.error(f"Failed to manage LuConfig: {e.reason} - {e.body}")
             raise kopf.PermanentError(f"LuConfig management failed: {e.reason}")
+    ready['TokenReady'] = True
 
     return {'sa-name': name}
 
 
+'''
+重启后校验已有用户，只修复存在偏差的对象
+'''
+
+
+@kopf.on.resume('lensuser', group=CRD_GROUP, version=CRD_VERSION, labels=LENSUSER_LABELS, when=is_responsible)
+def verify_lu(spec, name, namespace, body, logger, patch, status, settings, **kwargs):
+    # 旧版本写入的 diffbase 注解迁移到 status
+    if settings.persistence.diffbase_storage.migrate(body=body, patch=patch):
+        logger.info("Migrated kopf state from annotations to status")
+    roles = spec.get('roles')
+    if not roles:
+        return
+    drift = resume_verifier.drift(name, namespace, roles, logger)
+    if not drift:
+        return
+    logger.info("Drift detected, reconciling: " + ", ".join(
+        f"{kind} {ns}/{obj} {reason}" for kind, ns, obj, reason in drift))
+
+    if aggregated_bindings is None:
+        # RoleBinding 的 roleRef 不可修改，不一致的先删除再由创建流程重建
+        api = kubernetes.client.RbacAuthorizationV1Api(api_client())
+        retry = Retrier(logger)
+        for kind, ns, obj, reason in drift:
+            if kind != 'RoleBinding' or reason != 'mismatch':
+                continue
+            try:
+                retry(api.delete_namespaced_role_binding, name=obj, namespace=ns)
+            except ApiException as e:
+                if not is_not_found(e):
+                    raise kopf.PermanentError(f"RoleBinding delete failed: {e.reason}")
+    return _reporting(patch, status, lambda ready: _create_lu(spec, name, namespace, logger, ready))
+
+
+def _sync_aggregated_bindings(name, namespace, added, removed, logger):
+    """在聚合 RoleBinding 中加入/移除该用户，等待所在批次写入完成"""
+    futures = [aggregated_bindings.add(r.get('namespace'), r.get('name'), name, namespace, logger) for r in added]
+    futures += [aggregated_bindings.remove(r.get('namespace'), r.get('name'), name, namespace, logger) for r in removed]
+    for future in futures:
+        try:
+            future.result()
+        except ApiException as e:
+            logger.error(f"Failed to update aggregated RoleBinding: {e.reason} - {e.body}")
+            raise kopf.PermanentError(f"Aggregated RoleBinding update failed: {e.reason}")
+
+
+'''
+凭据签发
+'''
+
+
+def _cluster_ca():
+    """读取集群 CA（base64），TokenRequest 模式下不再依赖 Token Secret 中的 ca.crt"""
+    with open(SA_CA_PATH, 'rb') as f:
+        return base64.b64encode(f.read()).decode('utf-8')
+
+
+def _issue_secret_token(name, namespace, logger, retry):
+    """确保 ServiceAccount 拥有长期 Token Secret，返回 (ca, token)"""
+    api = kubernetes.client.CoreV1Api(api_client())
+    
+    # 检查是否有自动生成的 secret
+    sa = retry(api.read_namespaced_service_account, name=name, namespace=namespace)
+    # sa.secrets 是 V1ObjectReference 对象列表，优先使用本 operator 创建的 Secret，
+    # 否则兼容旧版本自动生成的 secret
+    referenced = [s.name for s in sa.secrets or []]
+    sa_secret_name = f"{name}-token" if f"{name}-token" in referenced else (referenced[-1] if referenced else None)
+    secret = None
+    if sa_secret_name:
+        try:
+            secret = retry(api.read_namespaced_secret, name=sa_secret_name, namespace=namespace)
+        except ApiException as e:
+            if not is_not_found(e):
+                raise
+            # Secret 被手工删除后 ServiceAccount 中仍残留引用，按新建流程重建
+            logger.info(f"Secret '{sa_secret_name}' referenced by ServiceAccount '{name}' is missing, recreating...")
+    if secret is None:
+        # 1.24+ 版本，手动创建永久 token secret
+        sa_secret_name = _create_token_secret(api, name, namespace, logger, retry)
+
+    # 等待 Secret 的 token 数据生成（最多等待30秒）
+    max_wait = 30
+    waited = 0
+    secret_info = None
+    
+    while waited < max_wait:
+        if secret is None:
+            secret = retry(api.read_namespaced_secret, name=sa_secret_name, namespace=namespace)
+        secret_info = api_client().sanitize_for_serialization(secret.data)
+        
+        if secret_info and secret_info.get('token'):
+            logger.info(f"Secret '{sa_secret_name}' token generated after {waited} seconds")
+            break
+        
+        logger.info(f"Waiting for Secret '{sa_secret_name}' token to be generated... ({waited}/{max_wait}s)")
+        time.sleep(2)
+        waited += 2
+        secret = None
+    
+    if not secret_info or not secret_info.get('token'):
+        logger.error(f"Secret '{sa_secret_name}' token not generated after {max_wait} seconds")
+        raise kopf.PermanentError(f"Secret token not generated for '{sa_secret_name}' after {max_wait}s. Check token-controller logs.")
+
+    return (secret_info.get('ca.crt', 'NULL'),
+            base64.b64decode(secret_info.get('token', 'NULL').encode('utf-8')).decode('utf-8'))
+
+
+def _create_token_secret(api, name, namespace, logger, retry):
+    """使用 template 创建 {name}-token Secret 并写入 ServiceAccount 的 secrets 字段，返回 Secret 名称"""
+    try:
+        # 使用 template 创建 Secret
+        path = os.path.join(os.path.dirname(__file__), 'template/secret.yaml')
+        tmpl = open(path, 'rt').read()
+        text = tmpl.format(name=name, namespace=namespace)
+        data = owner_labels.apply(yaml.safe_load(text), name, namespace)
+        kopf.adopt(data)
+        
+        # 创建 Secret（handler 重试时可能已存在）
+        try:
+            retry(
+                api.create_namespaced_secret,
+                namespace=namespace,
+                body=data
+            )
+        except ApiException as e:
+            if not is_conflict(e):
+                raise
+            logger.info(f"Secret '{name}-token' already exists, continuing...")
+        
+        # 将 Secret 绑定到 ServiceAccount 的 secrets 字段
+        try:
+            # 直接更新 ServiceAccount，添加 secret 引用
+            secret_ref = kubernetes.client.V1ObjectReference(
+                name=f"{name}-token",
+                namespace=namespace
+            )
+            
+            # 使用 patch 操作添加 secret 引用
+            patch_body = {
+                "secrets": [secret_ref]
+            }
+            
+            retry(
+                api.patch_namespaced_service_account,
+                name=name,
+                namespace=namespace,
+                body=patch_body
+            )
+            
+            logger.info(f"Successfully bound secret {name}-token to ServiceAccount {name}")
+            
+        except kopf.TemporaryError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to bind secret to ServiceAccount: {e}")
+        
+    except kopf.TemporaryError:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to create token secret: {e}")
+        raise kopf.PermanentError(f"Token secret creation failed: {e}")
+    return f"{name}-token"
+
+
 '''
 更新权限信息
 '''
 
 
-@kopf.on.field('lensuser', group=CRD_GROUP, version=CRD_VERSION, field='spec.roles')
-def update_lu(diff, name, namespace, logger, **kwargs):
+@kopf.on.field('lensuser', group=CRD_GROUP, version=CRD_VERSION, labels=LENSUSER_LABELS, field='spec.roles', when=is_responsible)
+def update_lu(diff, name, namespace, logger, patch, status, runtime, **kwargs):
+    delay = roles_debouncer.delay((namespace, name), runtime.total_seconds())
+    if delay > 0:
+        # 重试时 kopf 会基于最新对象重新计算 diff，期间的多次修改合并为一次处理
+        raise kopf.TemporaryError(f"spec.roles is still changing, reconciling in {delay:.1f}s", delay=delay)
+    return _reporting(patch, status, lambda ready: _update_lu(diff, name, namespace, logger, ready))
+
+
+def _update_lu(diff, name, namespace, logger, ready):
+    ready['RoleBindingsReady'] = False
+    if aggregated_bindings is not None:
+        # 聚合模式下同一命名空间可以有多个角色，按 (namespace, role) 集合求差
+        for op, field, old, new in diff:
+            old_keys = {(r.get('namespace'), r.get('name')) for r in old or []}
+            new_keys = {(r.get('namespace'), r.get('name')) for r in new or []}
+            _sync_aggregated_bindings(
+                name, namespace,
+                [r for r in new or [] if (r.get('namespace'), r.get('name')) not in old_keys],
+                [r for r in old or [] if (r.get('namespace'), r.get('name')) not in new_keys],
+                logger)
+        ready['RoleBindingsReady'] = True
+        return {'sa-name': name}
+
+    api = kubernetes.client.RbacAuthorizationV1Api(api_client())
+    retry = Retrier(logger)
     for op, field, old, new in diff:
         if op != "change":
+            # 字段整体新增/删除时不做处理，也不改变已有的就绪状态
+            ready.clear()
             return True
 
         if len(new) > len(old):
             for n in new:
                 if n not in old:
-                    api = kubernetes.client.RbacAuthorizationV1Api()
                     path = os.path.join(os.path.dirname(__file__), 'template/rolebinding.yaml')
                     tmpl = open(path, 'rt').read()
                     text = tmpl.format(sa_name=name, sa_namespace=namespace, role_name=n.get('name'))
-                    data = yaml.safe_load(text)
+                    data = owner_labels.apply(yaml.safe_load(text), name, namespace)
                     try:
-                        api.create_namespaced_role_binding(
+                        retry(
+                            api.create_namespaced_role_binding,
                             namespace=n.get('namespace'),
                             body=data,
                         )
                     except ApiException as e:
-                        if e.reason == "Conflict":
+                        if is_conflict(e):
                             logger.info("%s\n" % e.body)
                         else:
                             raise kopf.PermanentError(f"service account create failed. name {n!r}.")
         elif len(new) < len(old):
             for o in old:
                 if o not in new:
-                    api = kubernetes.client.RbacAuthorizationV1Api()
                     try:
-                        api.delete_namespaced_role_binding(
+                        retry(
+                            api.delete_namespaced_role_binding,
                             name=name,
                             namespace=o.get('namespace')
                         )
                     except ApiException as e:
                         logger.info("%s\n" % e.body)
-                        raise kopf.PermanentError(f"service account delete failed. name {o!r}.")
+                        if not is_not_found(e):
+                            raise kopf.PermanentError(f"service account delete failed. name {o!r}.")
         elif len(new) == len(old):
             for n in new:
                 if n not in old:
-                    api = kubernetes.client.RbacAuthorizationV1Api()
                     path = os.path.join(os.path.dirname(__file__), 'template/rolebinding.yaml')
                     tmpl = open(path, 'rt').read()
                     text = tmpl.format(sa_name=name, sa_namespace=namespace, role_name=n.get('name'))
-                    data = yaml.safe_load(text)
+                    data = owner_labels.apply(yaml.safe_load(text), name, namespace)
                     try:
                         try:
-                            api.delete_namespaced_role_binding(
+                            retry(
+                                api.delete_namespaced_role_binding,
                                 name=name,
                                 namespace=n.get('namespace')
                             )
                         except ApiException as e:
-                            if e.reason == "NotFound":
+                            if is_not_found(e):
                                 logger.info("%s\n" % e.body)
-                        api.create_namespaced_role_binding(
+                        retry(
+                            api.create_namespaced_role_binding,
                             namespace=n.get('namespace'),
                             body=data,
                         )
                     except ApiException as e:
-                        if e.reason == "Conflict":
+                        if is_conflict(e):
                             logger.info("%s\n" % e.body)
                         else:
                             raise kopf.PermanentError(f"service account create failed. name {n!r}.")
@@ -311,40 +715,87 @@ def update_lu(diff, name, namespace, logger, **kwargs):
             old_namespaces_not_in_new = [item for item in old if item['namespace'] not in new_namespaces]
             for del_role_bind in old_namespaces_not_in_new:
                 try:
-                    api.delete_namespaced_role_binding(
-                    name=name,
-                    namespace=del_role_bind.get('namespace')
-                )
+                    retry(
+                        api.delete_namespaced_role_binding,
+                        name=name,
+                        namespace=del_role_bind.get('namespace')
+                    )
                 except ApiException as e:
-                    raise kopf.PermanentError(f"service account create failed. name {n!r}.")
+                    if not is_not_found(e):
+                        raise kopf.PermanentError(f"service account delete failed. name {del_role_bind!r}.")
+    ready['RoleBindingsReady'] = True
 
     return {'sa-name': name}
 
 
-@kopf.on.delete('lensuser', group=CRD_GROUP, version=CRD_VERSION)
+@kopf.on.delete('lensuser', group=CRD_GROUP, version=CRD_VERSION, labels=LENSUSER_LABELS, when=is_responsible)
 def delete_lu(spec, name, namespace, logger, **kwargs):
     roles = spec.get('roles')
     if not roles:
         raise kopf.PermanentError(f"roles must be set. Got {roles!r}.")
 
-    api = kubernetes.client.RbacAuthorizationV1Api()
-    for role in roles:
+    api = kubernetes.client.RbacAuthorizationV1Api(api_client())
+    core_api = kubernetes.client.CoreV1Api(api_client())
+    crd_api = kubernetes.client.CustomObjectsApi(api_client())
+    retry = Retrier(logger)
+    selector = owner_labels.selector(name, namespace)
+
+    def delete_bindings(role_namespace):
+        """按所属用户标签删除该命名空间内的 RoleBinding，未带标签的旧对象按名称删除"""
+        response = retry(api.delete_collection_namespaced_role_binding, role_namespace,
+                         label_selector=selector, _preload_content=False)
+        if not json.loads(response.data).get('items'):
+            try:
+                retry(api.delete_namespaced_role_binding, name=name, namespace=role_namespace)
+            except ApiException as e:
+                if not is_not_found(e):
+                    raise
+
+    def remove_from_aggregated():
         try:
-            api.delete_namespaced_role_binding(
-                namespace=role.get('namespace'),
-                name=name
-            )
+            _sync_aggregated_bindings(name, namespace, [], roles, logger)
+        except kopf.PermanentError as e:
+            logger.info(f"{e}\n")
+
+    def delete_object(fn, **kwargs):
+        try:
+            retry(fn, **kwargs)
         except ApiException as e:
-            logger.info("%s\n" % e.body)
+            if not is_not_found(e):
+                raise
 
-    crd_api = kubernetes.client.CustomObjectsApi()
-    try:
-        crd_api.delete_namespaced_custom_object(
-            group=CRD_GROUP,
-            version=CRD_VERSION,
-            namespace=namespace,
-            plural='luconfig',
-            name=name
-        )
-    except ApiException as e:
-        logger.info("%s\n" % e.body)
+    # 各命名空间的 RoleBinding、LuConfig 与 ServiceAccount 并发删除
+    with ThreadPoolExecutor(max_workers=DELETE_WORKERS) as pool:
+        futures = {}
+        if aggregated_bindings is not None:
+            futures[pool.submit(remove_from_aggregated)] = 'aggregated RoleBindings'
+        else:
+            for role_namespace in {role.get('namespace') for role in roles}:
+                futures[pool.submit(delete_bindings, role_namespace)] = f"RoleBindings in '{role_namespace}'"
+        futures[pool.submit(delete_object, crd_api.delete_namespaced_custom_object, group=CRD_GROUP,
+                            version=CRD_VERSION, namespace=namespace, plural='luconfig', name=name)] = 'LuConfig'
+        futures[pool.submit(delete_object, core_api.delete_namespaced_service_account,
+                            name=name, namespace=namespace)] = 'ServiceAccount'
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except ApiException as e:
+                logger.info(f"Failed to delete {futures[future]}: {e.reason} - {e.body}")
+
+        # 一次带标签的 list 确认没有遗留（包括早先 spec 中已移除、但未清理的命名空间）
+        response = retry(api.list_role_binding_for_all_namespaces, label_selector=selector, _preload_content=False)
+        leftovers = {
+            item['metadata']['namespace'] for item in json.loads(response.data).get('items') or []
+            if not item['metadata'].get('deletionTimestamp')
+        }
+        if leftovers:
+            logger.info(f"Deleting leftover RoleBindings in namespaces: {', '.join(sorted(leftovers))}")
+            futures = [
+                pool.submit(retry, api.delete_collection_namespaced_role_binding, ns, label_selector=selector)
+                for ns in leftovers
+            ]
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except ApiException as e:
+                    logger.info(f"Failed to delete leftover RoleBindings: {e.reason} - {e.body}")
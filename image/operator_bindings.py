@@ -0,0 +1,133 @@
+"""
+聚合 RoleBinding
+
+aggregated 模式下每个 (namespace, ClusterRole) 只维护一个 RoleBinding，
+subjects 中列出所有拥有该角色的 ServiceAccount，对象数量从 用户数 × 命名空间数 降到 命名空间数 × 角色数，
+同一用户在一个命名空间内也可以同时拥有多个角色。
+
+多个 handler 对同一个 RoleBinding 的修改在一个很短的时间窗口内合并，
+一次读取 + 一次带 resourceVersion 的更新完成，发生冲突时重新读取后重放整批修改。
+"""
+import threading
+from concurrent.futures import Future
+
+import kopf
+import kubernetes
+from kubernetes.client.rest import ApiException
+
+from operator_ratelimit import api_client
+from operator_retry import Retrier
+
+MAX_CONFLICT_RETRIES = 10
+
+
+class AggregatedBindings:
+    """按 (namespace, role) 合并 subjects 修改的批处理器"""
+
+    def __init__(self, group, window_seconds=0.1):
+        self.label = f"usermanager.{group}/binding-mode"
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._key_locks = {}
+
+    @staticmethod
+    def binding_name(role):
+        # ServiceAccount 名称中不会出现冒号，不会与 per-user 模式下以 SA 命名的 RoleBinding 冲突
+        return f"kube-user-manage:{role}"
+
+    def add(self, namespace, role, sa_name, sa_namespace, logger):
+        return self._submit(namespace, role, 'add', ('ServiceAccount', sa_name, sa_namespace), logger)
+
+    def remove(self, namespace, role, sa_name, sa_namespace, logger):
+        return self._submit(namespace, role, 'remove', ('ServiceAccount', sa_name, sa_namespace), logger)
+
+    def _submit(self, namespace, role, op, subject, logger):
+        """登记一次修改，返回在所属批次写入后完成的 Future"""
+        future = Future()
+        key = (namespace, role)
+        with self._lock:
+            batch = self._pending.get(key)
+            if batch is None:
+                batch = self._pending[key] = []
+                timer = threading.Timer(self.window_seconds, self._flush, args=(key, logger))
+                timer.daemon = True
+                timer.start()
+            batch.append((op, subject, future))
+        return future
+
+    def _flush(self, key, logger):
+        with self._lock:
+            batch = self._pending.pop(key)
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        # 同一个 RoleBinding 的批次串行写入，减少无谓的冲突
+        with key_lock:
+            try:
+                self._apply(key, batch, logger)
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                return
+        for _, _, future in batch:
+            future.set_result(None)
+
+    def _apply(self, key, batch, logger):
+        namespace, role = key
+        name = self.binding_name(role)
+        api = kubernetes.client.RbacAuthorizationV1Api(api_client())
+        retry = Retrier(logger)
+        for _ in range(MAX_CONFLICT_RETRIES):
+            try:
+                binding = retry(api.read_namespaced_role_binding, name=name, namespace=namespace)
+            except ApiException as e:
+                if e.status != 404:
+                    raise
+                binding = None
+
+            current = [(s.kind, s.name, s.namespace) for s in (binding.subjects or [])] if binding else []
+            subjects = list(current)
+            for op, subject, _ in batch:
+                if op == 'add' and subject not in subjects:
+                    subjects.append(subject)
+                elif op == 'remove' and subject in subjects:
+                    subjects.remove(subject)
+            if subjects == current:
+                return
+
+            try:
+                if binding is None:
+                    retry(api.create_namespaced_role_binding, namespace=namespace,
+                          body=self._build(name, role, subjects))
+                    logger.info(f"RoleBinding '{name}' created in namespace '{namespace}' with {len(subjects)} subjects")
+                elif not subjects:
+                    # 最后一个用户移除后删除 RoleBinding，前置条件保证期间没有新增的 subject
+                    retry(api.delete_namespaced_role_binding, name=name, namespace=namespace,
+                          body=kubernetes.client.V1DeleteOptions(
+                              preconditions=kubernetes.client.V1Preconditions(
+                                  resource_version=binding.metadata.resource_version)))
+                    logger.info(f"RoleBinding '{name}' deleted from namespace '{namespace}'")
+                else:
+                    # 带 resourceVersion 的整体替换，期间被其他写入修改时返回 409
+                    body = self._build(name, role, subjects)
+                    body.metadata = binding.metadata
+                    retry(api.replace_namespaced_role_binding, name=name, namespace=namespace, body=body)
+                    logger.info(f"RoleBinding '{name}' in namespace '{namespace}' now has {len(subjects)} subjects")
+                return
+            except ApiException as e:
+                if e.status not in (404, 409):
+                    raise
+                logger.info(f"RoleBinding '{name}' in namespace '{namespace}' changed concurrently, retrying")
+        raise kopf.TemporaryError(f"RoleBinding '{name}' in namespace '{namespace}' kept conflicting", delay=1)
+
+    def _build(self, name, role, subjects):
+        return kubernetes.client.V1RoleBinding(
+            metadata=kubernetes.client.V1ObjectMeta(name=name, labels={self.label: 'aggregated'}),
+            subjects=[
+                kubernetes.client.RbacV1Subject(
+                    kind=kind, name=subject_name, namespace=subject_namespace,
+                    api_group='' if kind == 'ServiceAccount' else 'rbac.authorization.k8s.io')
+                for kind, subject_name, subject_namespace in subjects
+            ],
+            role_ref=kubernetes.client.V1RoleRef(
+                api_group='rbac.authorization.k8s.io', kind='ClusterRole', name=role),
+        )
@@ -0,0 +1,100 @@
+"""
+Operator 侧 LensUser 本地缓存
+
+所有副本都通过 @kopf.on.event 维护监听范围内全部 LensUser 的最新副本，
+即使当前副本不负责处理这些对象（分片不属于自己、或处于备用状态）。
+当对象的归属转移到本副本时，可以据此直接接管这些对象（转移 finalizer、触发仍有
+未完成工作的对象），而不需要重新 list 或重跑所有 handler。
+
+该事件 handler 与其他 handler 使用同一个 WATCH_LABEL_SELECTOR 过滤（监听的命名空间同理），
+不匹配的对象不会进入缓存：分片重平衡时不会被接管、主副本切换时也不会被 touch_pending 触发，
+与这些对象不会被处理的行为一致。
+"""
+import copy
+import threading
+from datetime import datetime, timezone
+
+import kopf
+import kubernetes
+from kubernetes.client.rest import ApiException
+
+from operator_ratelimit import api_client
+from operator_storage import LEGACY_KEYS
+
+KOPF_PREFIX = 'kopf.zalando.org/'
+
+
+class ObjectCache:
+    """线程安全的 (namespace, name) -> body 缓存"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._objects = {}
+
+    def apply(self, event_type, body):
+        key = (body['metadata'].get('namespace'), body['metadata']['name'])
+        with self._lock:
+            if event_type == 'DELETED':
+                self._objects.pop(key, None)
+            else:
+                self._objects[key] = copy.deepcopy(dict(body))
+
+    def items(self):
+        with self._lock:
+            return list(self._objects.items())
+
+
+def is_pending(body, settings):
+    """对象是否还有 kopf 未完成的工作（未处理的变更、删除或重试中的 handler）"""
+    if body['metadata'].get('deletionTimestamp'):
+        return True
+    status_progress = (body.get('status') or {}).get('kopf', {}).get('progress')
+    if status_progress:
+        return True
+    annotations = body['metadata'].get('annotations') or {}
+    if any(key.startswith(KOPF_PREFIX) and not key.endswith(LEGACY_KEYS) for key in annotations):
+        return True
+    storage = settings.persistence.diffbase_storage
+    view = kopf.Body(body)
+    return storage.fetch(body=view) != storage.build(body=view)
+
+
+def handoff(group, version, plural, annotation, body, finalizer, is_stale, logger):
+    """
+    将对象转交给本副本：移除失效副本的 finalizer、加上本副本的 finalizer，
+    并更新时间戳注解以产生一次 watch 事件，让 kopf 重新评估该对象。
+    """
+    api = kubernetes.client.CustomObjectsApi(api_client())
+    namespace, name = body['metadata'].get('namespace'), body['metadata']['name']
+    for _ in range(3):
+        current = body['metadata'].get('finalizers') or []
+        finalizers = [f for f in current if not is_stale(f)]
+        # 删除进行中的对象不允许再添加新的 finalizer
+        if finalizer not in finalizers and not body['metadata'].get('deletionTimestamp'):
+            finalizers.append(finalizer)
+        patch = {'metadata': {
+            'resourceVersion': body['metadata']['resourceVersion'],
+            'annotations': {annotation: datetime.now(timezone.utc).isoformat()},
+        }}
+        if finalizers != current:
+            patch['metadata']['finalizers'] = finalizers
+        try:
+            api.patch_namespaced_custom_object(
+                group=group,
+                version=version,
+                namespace=namespace,
+                plural=plural,
+                name=name,
+                body=patch,
+            )
+            return
+        except ApiException as e:
+            if e.status != 409:
+                logger.info(f"Failed to hand off {plural} {namespace}/{name}: {e.reason}")
+                return
+        # resourceVersion 过期，重新读取后再试
+        try:
+            body = api.get_namespaced_custom_object(group, version, namespace, plural, name)
+        except ApiException as e:
+            logger.info(f"Failed to hand off {plural} {namespace}/{name}: {e.reason}")
+            return
@@ -0,0 +1,52 @@
+"""
+spec.roles 连续修改的合并
+
+自动化系统可能在几秒内多次改写 spec.roles，每次修改都立即执行 update_lu 会反复创建/删除 RoleBinding。
+所有副本在事件 handler 中记录每个对象 spec.roles 最近一次变化的时间；update_lu 在修改仍在持续时
+抛出 kopf.TemporaryError 推迟执行。kopf 重新调用 handler 时会基于上次处理完成的状态与当前最新对象
+重新计算 diff，因此一串修改只会合并成一次针对最终期望状态的处理。
+自 handler 首次被调用起超过 max_delay 后不再推迟，避免持续修改导致无限延后。
+
+默认关闭，开启前需了解以下限制：
+- 推迟依赖 kopf 的重试机制，每次推迟都会被 kopf 记为一次 handler 临时失败（error 级别日志）
+- 推迟期间负责处理的副本依赖 status 中保存的 diffbase 与进度重新计算 diff，因此其他副本不能写入
+  该对象的 kopf 状态（由 operator_storage 的 gate 保证，分片与热备模式下不负责的副本不写入）
+- 不能在 handler 内等待代替：同一对象的事件由 kopf 串行处理，等待期间观察不到新的修改
+"""
+import threading
+import time
+
+
+class Debouncer:
+    """按对象记录最近一次变化时间，计算还需等待多久"""
+
+    def __init__(self, window_seconds, max_delay_seconds):
+        self.window_seconds = window_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self._lock = threading.Lock()
+        # key -> (最近一次观察到的值, 变化时间)
+        self._changes = {}
+
+    def observe(self, key, value):
+        with self._lock:
+            previous = self._changes.get(key)
+            if previous is None:
+                # 首次看到该对象（启动或接管时的初始 list）不视为一次修改
+                self._changes[key] = (value, 0.0)
+            elif previous[0] != value:
+                self._changes[key] = (value, time.monotonic())
+
+    def forget(self, key):
+        with self._lock:
+            self._changes.pop(key, None)
+
+    def delay(self, key, runtime_seconds):
+        """还需等待的秒数，0 表示可以立即处理；runtime_seconds 为 handler 自首次调用以来的时长"""
+        if self.window_seconds <= 0:
+            return 0.0
+        with self._lock:
+            _, changed = self._changes.get(key, (None, 0.0))
+        quiet_for = time.monotonic() - changed if changed else self.window_seconds
+        wait = self.window_seconds - quiet_for
+        budget = self.max_delay_seconds - runtime_seconds
+        return max(0.0, min(wait, budget))
@@ -0,0 +1,173 @@
+"""
+孤儿资源回收
+
+operator 创建的 RoleBinding（per-user 模式）、ServiceAccount、Token Secret 和 LuConfig
+都带有所属 LensUser 的标签。后台线程定期：
+1. 每种资源用一次标签选择器 list 取得全部受管对象
+2. 再 list 一次 LensUser 得到期望状态（先 list 受管对象，保证其所属用户一定出现在随后的列表中）
+3. 所属用户已不存在、或 RoleBinding 所在命名空间已不在用户 spec.roles 中的对象视为孤儿，
+   按 (命名空间, 所属用户) 分组，每组一次 deletecollection 删除
+
+标签值超过 63 个字符时会被截断并加上哈希，因此另在注解中保存原始的 "namespace/name"，
+分片模式下据此判断对象归属哪个副本。
+"""
+import hashlib
+import re
+import threading
+from collections import defaultdict
+
+import kubernetes
+from kubernetes.client.rest import ApiException
+
+from operator_ratelimit import api_client
+from operator_verify import list_all
+
+# 标签值最长 63 个字符
+LABEL_VALUE_MAX = 63
+# 截断后追加的哈希后缀
+HASHED_SUFFIX = re.compile(r'-[0-9a-f]{10}$')
+
+
+def _label_value(value):
+    if len(value) <= LABEL_VALUE_MAX:
+        return value
+    digest = hashlib.sha1(value.encode('utf-8')).hexdigest()[:10]
+    return f"{value[:LABEL_VALUE_MAX - 11].rstrip('-_.')}-{digest}"
+
+
+class OwnerLabels:
+    """受管对象上标记所属 LensUser 的标签"""
+
+    def __init__(self, group):
+        self.name_label = f"usermanager.{group}/owner-name"
+        self.namespace_label = f"usermanager.{group}/owner-namespace"
+        # 原始的 "namespace/name"，不受标签值长度限制
+        self.annotation = f"usermanager.{group}/owner"
+
+    def of(self, name, namespace):
+        return {self.name_label: _label_value(name), self.namespace_label: _label_value(namespace)}
+
+    def apply(self, data, name, namespace):
+        """给待创建对象（dict）加上所属用户标签及注解"""
+        data['metadata'].setdefault('labels', {}).update(self.of(name, namespace))
+        data['metadata'].setdefault('annotations', {})[self.annotation] = f"{namespace}/{name}"
+        return data
+
+    def selector(self, name, namespace):
+        return ','.join(f"{key}={value}" for key, value in self.of(name, namespace).items())
+
+    def owner_of(self, obj):
+        labels = obj['metadata'].get('labels') or {}
+        return labels.get(self.namespace_label), labels.get(self.name_label)
+
+    def real_owner_of(self, obj, known=None):
+        """
+        所属用户的原始 (namespace, name)：优先取注解，其次查 known（标签值 -> 原始名称），
+        最后使用未被截断的标签值；无法确定时返回 None
+        """
+        annotations = obj['metadata'].get('annotations') or {}
+        if '/' in annotations.get(self.annotation, ''):
+            return tuple(annotations[self.annotation].split('/', 1))
+        owner = self.owner_of(obj)
+        if known and owner in known:
+            return known[owner]
+        if any(value is None or (len(value) >= LABEL_VALUE_MAX - 11 and HASHED_SUFFIX.search(value))
+               for value in owner):
+            return None
+        return owner
+
+
+class OrphanSweeper:
+    """
+    定期回收孤儿对象。
+
+    is_active() 为 False 时跳过本轮（例如热备模式下的备用副本）；
+    owns(name, namespace) 用于分片模式下只回收归属本副本的用户的对象，为空表示回收全部。
+    """
+
+    def __init__(self, group, version, interval_seconds, is_active=None, owns=None):
+        self.group = group
+        self.version = version
+        self.interval_seconds = interval_seconds
+        self.labels = OwnerLabels(group)
+        self.is_active = is_active or (lambda: True)
+        self.owns = owns
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, logger):
+        if self.interval_seconds <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, args=(logger,), name='orphan-sweeper', daemon=True)
+        self._thread.start()
+
+    def stop(self, logger):
+        self._stop.set()
+
+    def _run(self, logger):
+        while not self._stop.wait(self.interval_seconds):
+            if not self.is_active():
+                continue
+            try:
+                self.sweep(logger)
+            except Exception as e:
+                logger.warning(f"Orphan sweep failed: {e}")
+
+    def sweep(self, logger):
+        core = kubernetes.client.CoreV1Api(api_client())
+        rbac = kubernetes.client.RbacAuthorizationV1Api(api_client())
+        crd = kubernetes.client.CustomObjectsApi(api_client())
+        selector = self.labels.name_label
+
+        # 先取受管对象，再取 LensUser
+        owned = {
+            'RoleBinding': list_all(rbac.list_role_binding_for_all_namespaces, label_selector=selector),
+            'ServiceAccount': list_all(core.list_service_account_for_all_namespaces, label_selector=selector),
+            'Secret': list_all(core.list_secret_for_all_namespaces, label_selector=selector),
+            'LuConfig': list_all(crd.list_cluster_custom_object, self.group, self.version, 'luconfig',
+                                 label_selector=selector),
+        }
+        # (所属用户标签) -> spec.roles 中的命名空间，以及 -> 原始 (namespace, name)
+        users, real_names = {}, {}
+        for user in list_all(crd.list_cluster_custom_object, self.group, self.version, 'lensuser'):
+            metadata = user['metadata']
+            owner = (_label_value(metadata['namespace']), _label_value(metadata['name']))
+            users[owner] = {r.get('namespace') for r in (user.get('spec') or {}).get('roles') or []}
+            real_names[owner] = (metadata['namespace'], metadata['name'])
+
+        deletes = {
+            'RoleBinding': lambda namespace, label_selector: rbac.delete_collection_namespaced_role_binding(
+                namespace, label_selector=label_selector),
+            'ServiceAccount': lambda namespace, label_selector: core.delete_collection_namespaced_service_account(
+                namespace, label_selector=label_selector),
+            'Secret': lambda namespace, label_selector: core.delete_collection_namespaced_secret(
+                namespace, label_selector=label_selector),
+            'LuConfig': lambda namespace, label_selector: crd.delete_collection_namespaced_custom_object(
+                self.group, self.version, namespace, 'luconfig', label_selector=label_selector),
+        }
+        for kind, objects in owned.items():
+            # (对象所在命名空间, 所属用户标签) -> 对象数
+            orphans = defaultdict(int)
+            for obj in objects:
+                if obj['metadata'].get('deletionTimestamp'):
+                    continue
+                owner = self.labels.owner_of(obj)
+                if self.owns is not None:
+                    real = self.labels.real_owner_of(obj, real_names)
+                    # 无法确定原始名称时不知道归属哪个副本，保守起见不回收
+                    if real is None or not self.owns(real[1], real[0]):
+                        continue
+                namespace = obj['metadata']['namespace']
+                role_namespaces = users.get(owner)
+                if role_namespaces is not None and (kind != 'RoleBinding' or namespace in role_namespaces):
+                    continue
+                orphans[(namespace, owner)] += 1
+            for (namespace, (owner_namespace, owner_name)), count in orphans.items():
+                label_selector = (f"{self.labels.namespace_label}={owner_namespace},"
+                                  f"{self.labels.name_label}={owner_name}")
+                try:
+                    deletes[kind](namespace, label_selector=label_selector)
+                    logger.info(f"Deleted {count} orphaned {kind}(s) of {owner_namespace}/{owner_name} "
+                                f"in namespace '{namespace}'")
+                except ApiException as e:
+                    logger.warning(f"Failed to delete orphaned {kind}s in '{namespace}': {e.reason}")
@@ -0,0 +1,191 @@
+"""
+Operator 热备选主
+
+所有副本都正常运行 kopf、保持 watch 与本地缓存，但只有持有 Lease 的主副本执行 handler。
+备用副本通过 watch 该 Lease 等待：主副本正常退出时会立即清空 holderIdentity，
+备用副本收到事件后马上抢占，切换在亚秒级完成；主副本异常退出时，
+备用副本在 Lease 过期（leaseDurationSeconds）后接管。
+
+Lease 的更新都带 resourceVersion，并发抢占时只有一个副本能成功。
+"""
+import math
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import kubernetes
+from kubernetes.client.rest import ApiException
+
+from operator_ratelimit import api_client
+from operator_sharding import _own_namespace
+
+
+class LeaderElector:
+    """基于 coordination.k8s.io/v1 Lease 的选主"""
+
+    def __init__(self, lease_name, identity=None, namespace=None,
+                 lease_duration_seconds=2, renew_seconds=0.5, retry_seconds=1):
+        self.lease_name = lease_name
+        self.identity = identity or os.getenv('POD_NAME') or socket.gethostname()
+        self.namespace = namespace or os.getenv('POD_NAMESPACE') or _own_namespace()
+        self.lease_duration_seconds = lease_duration_seconds
+        self.renew_seconds = renew_seconds
+        self.retry_seconds = retry_seconds
+        self.is_leader = False
+        self.on_started_leading = None
+        self.on_stopped_leading = None
+        self._lease = None
+        self._renewed = 0.0
+        self._stop = threading.Event()
+        self._watch = None
+        self._thread = None
+
+    def start(self, logger):
+        # 首次抢占在 kopf 开始处理事件前完成，集群中没有主副本时可以直接开始工作
+        try:
+            self._try_acquire_or_renew(logger)
+        except Exception as e:
+            logger.warning(f"Leader election failed: {e}")
+        self._thread = threading.Thread(target=self._run, args=(logger,), name='leader-election', daemon=True)
+        self._thread.start()
+
+    def stop(self, logger):
+        self._stop.set()
+        if self._watch is not None:
+            self._watch.stop()
+        if not self.is_leader:
+            return
+        self._set_leader(False, logger)
+        # 主动清空持有者，备用副本通过 watch 立即感知
+        lease = self._lease
+        lease.spec.holder_identity = None
+        lease.spec.lease_duration_seconds = 1
+        try:
+            self._api().replace_namespaced_lease(self.lease_name, self.namespace, lease)
+            logger.info(f"Leader lease '{self.lease_name}' released")
+        except ApiException as e:
+            logger.info(f"Failed to release leader lease: {e.reason}")
+
+    def _run(self, logger):
+        while not self._stop.is_set():
+            try:
+                if self._try_acquire_or_renew(logger):
+                    self._stop.wait(self.renew_seconds)
+                else:
+                    self._wait_for_release()
+            except Exception as e:
+                logger.warning(f"Leader election failed: {e}")
+                # 续约失败超过租期时，其他副本可能已经接管，必须立即停止工作
+                if self.is_leader and time.monotonic() - self._renewed > self.lease_duration_seconds:
+                    self._set_leader(False, logger)
+                self._stop.wait(self.retry_seconds)
+
+    def _try_acquire_or_renew(self, logger):
+        api = self._api()
+        now = datetime.now(timezone.utc)
+        lease = self._lease if self.is_leader else None
+        if lease is None:
+            try:
+                lease = api.read_namespaced_lease(self.lease_name, self.namespace)
+            except ApiException as e:
+                if e.status != 404:
+                    raise
+                return self._create(api, now, logger)
+        self._lease = lease
+        spec = lease.spec
+        if spec.holder_identity and spec.holder_identity != self.identity and self._expiry(lease) > now:
+            if self.is_leader:
+                self._set_leader(False, logger)
+            return False
+
+        if spec.holder_identity != self.identity:
+            spec.acquire_time = now
+            spec.lease_transitions = (spec.lease_transitions or 0) + 1
+        spec.holder_identity = self.identity
+        spec.lease_duration_seconds = math.ceil(self.lease_duration_seconds)
+        spec.renew_time = now
+        try:
+            self._lease = api.replace_namespaced_lease(self.lease_name, self.namespace, lease)
+        except ApiException as e:
+            if e.status != 409:
+                raise
+            # 被其他副本抢先更新，下一轮重新读取
+            self._lease = None
+            if self.is_leader:
+                self._set_leader(False, logger)
+            return False
+        self._renewed = time.monotonic()
+        if not self.is_leader:
+            self._set_leader(True, logger)
+        return True
+
+    def _create(self, api, now, logger):
+        body = kubernetes.client.V1Lease(
+            metadata=kubernetes.client.V1ObjectMeta(name=self.lease_name),
+            spec=kubernetes.client.V1LeaseSpec(
+                holder_identity=self.identity,
+                lease_duration_seconds=math.ceil(self.lease_duration_seconds),
+                acquire_time=now,
+                renew_time=now,
+                lease_transitions=0,
+            ),
+        )
+        try:
+            self._lease = api.create_namespaced_lease(self.namespace, body)
+        except ApiException as e:
+            if e.status != 409:
+                raise
+            return False
+        self._renewed = time.monotonic()
+        self._set_leader(True, logger)
+        return True
+
+    def _wait_for_release(self):
+        """watch Lease，直到持有者主动释放或租约到期"""
+        lease = self._lease
+        if lease is None:
+            self._stop.wait(self.retry_seconds)
+            return
+        remaining = (self._expiry(lease) - datetime.now(timezone.utc)).total_seconds()
+        self._watch = kubernetes.watch.Watch()
+        try:
+            for event in self._watch.stream(
+                self._api().list_namespaced_lease,
+                self.namespace,
+                field_selector=f"metadata.name={self.lease_name}",
+                resource_version=lease.metadata.resource_version,
+                timeout_seconds=max(1, math.ceil(remaining)),
+            ):
+                if self._stop.is_set():
+                    break
+                self._lease = event['object']
+                if event['type'] == 'DELETED' or not self._lease.spec.holder_identity:
+                    break
+        except ApiException as e:
+            # resourceVersion 过旧（410）等情况下直接回到抢占流程重新读取
+            if e.status != 410:
+                raise
+        finally:
+            self._watch.stop()
+            self._watch = None
+        self._lease = None
+
+    def _expiry(self, lease):
+        spec = lease.spec
+        renew_time = spec.renew_time or spec.acquire_time or datetime.fromtimestamp(0, timezone.utc)
+        return renew_time + timedelta(seconds=spec.lease_duration_seconds or self.lease_duration_seconds)
+
+    def _set_leader(self, leader, logger):
+        # 成为主副本时先回调再置位，失去主副本时先置位再回调，
+        # 保证 is_leader 为真期间回调中切换的状态（如 finalizer）已经生效
+        if leader and self.on_started_leading:
+            self.on_started_leading()
+        self.is_leader = leader
+        if not leader and self.on_stopped_leading:
+            self.on_stopped_leading()
+        logger.info(f"{'Became' if leader else 'Lost'} leader of lease '{self.lease_name}' as '{self.identity}'")
+
+    def _api(self):
+        return kubernetes.client.CoordinationV1Api(api_client())
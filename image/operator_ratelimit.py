@@ -0,0 +1,100 @@
+"""
+Operator 侧 Kubernetes API 客户端限流
+
+所有经 main.py 发出的请求都走同一个 RateLimitedApiClient，
+按 HTTP 方法区分读（GET/HEAD）和写两个令牌桶，分别配置 QPS 与 burst。
+"""
+import os
+import threading
+import time
+
+import kubernetes
+
+READ_METHODS = ('GET', 'HEAD')
+
+
+class TokenBucket:
+    """线程安全的令牌桶，令牌不足时阻塞调用方直到轮到它"""
+
+    def __init__(self, qps, burst):
+        self.qps = qps
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.qps <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.qps)
+            self._updated = now
+            # 先预留令牌，等待时长由欠额决定，保证先到先得
+            self._tokens -= 1
+            wait = -self._tokens / self.qps if self._tokens < 0 else 0
+            if wait:
+                self._waiting += 1
+        if wait:
+            try:
+                time.sleep(wait)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+
+    def stats(self):
+        with self._lock:
+            return {'qps': self.qps, 'burst': self.burst, 'queue_depth': self._waiting}
+
+
+class RateLimiter:
+    """读写分离的限流器"""
+
+    def __init__(self, read_qps, read_burst, write_qps, write_burst):
+        self.read = TokenBucket(read_qps, read_burst)
+        self.write = TokenBucket(write_qps, write_burst)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            read_qps=float(os.getenv('API_READ_QPS', '50')),
+            read_burst=int(os.getenv('API_READ_BURST', '100')),
+            write_qps=float(os.getenv('API_WRITE_QPS', '25')),
+            write_burst=int(os.getenv('API_WRITE_BURST', '50')),
+        )
+
+    def acquire(self, method):
+        bucket = self.read if method.upper() in READ_METHODS else self.write
+        bucket.acquire()
+
+    def stats(self):
+        return {'read': self.read.stats(), 'write': self.write.stats()}
+
+
+class RateLimitedApiClient(kubernetes.client.ApiClient):
+    """在每个 HTTP 请求发出前按读写预算取令牌"""
+
+    def __init__(self, limiter, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limiter = limiter
+
+    def request(self, method, url, *args, **kwargs):
+        self.limiter.acquire(method)
+        return super().request(method, url, *args, **kwargs)
+
+
+limiter = RateLimiter.from_env()
+
+_api_client = None
+_api_client_lock = threading.Lock()
+
+
+def api_client():
+    """返回共享的限流 ApiClient，需在加载集群配置之后调用"""
+    global _api_client
+    if _api_client is None:
+        with _api_client_lock:
+            if _api_client is None:
+                _api_client = RateLimitedApiClient(limiter)
+    return _api_client
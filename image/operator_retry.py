@@ -0,0 +1,95 @@
+"""
+Operator 侧 Kubernetes API 调用的瞬时错误重试
+
+错误分类：
+- 409 Conflict：资源已存在，由调用方按幂等成功处理
+- 429 / 5xx / 连接超时：瞬时错误，按 Retry-After 或带抖动的指数退避重试
+- 其他 4xx：校验类错误，直接抛出，由调用方转为 kopf.PermanentError
+
+每个 handler 调用使用一个 Retrier，共享同一个截止时间；
+截止时间内仍未成功则抛出 kopf.TemporaryError，交给 kopf 稍后重新调度整个 handler。
+"""
+import email.utils
+import os
+import random
+import time
+from datetime import datetime, timezone
+
+import kopf
+import urllib3
+from kubernetes.client.rest import ApiException
+
+RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', '0.5'))
+RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', '30'))
+HANDLER_RETRY_DEADLINE = float(os.getenv('HANDLER_RETRY_DEADLINE', '120'))
+
+
+def is_conflict(e):
+    return isinstance(e, ApiException) and e.status == 409
+
+
+def is_not_found(e):
+    return isinstance(e, ApiException) and e.status == 404
+
+
+def is_transient(e):
+    if isinstance(e, ApiException):
+        # status 为 0 表示请求未拿到 HTTP 响应
+        return e.status in (0, 429) or (e.status or 0) >= 500
+    return isinstance(e, (urllib3.exceptions.HTTPError, ConnectionError, TimeoutError))
+
+
+def retry_after(e):
+    """解析 Retry-After 头（秒数或 HTTP 日期），没有则返回 None"""
+    headers = getattr(e, 'headers', None) or {}
+    value = headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class Retrier:
+    """在 handler 截止时间内重试瞬时错误"""
+
+    def __init__(self, logger, deadline=HANDLER_RETRY_DEADLINE):
+        self.logger = logger
+        self.deadline = time.monotonic() + deadline
+
+    def __call__(self, fn, *args, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if not is_transient(e):
+                    raise
+                delay = retry_after(e)
+                if delay is None:
+                    # full jitter 指数退避
+                    delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+                remaining = self.deadline - time.monotonic()
+                if delay > remaining:
+                    raise kopf.TemporaryError(
+                        f"{fn.__name__} still failing after {attempt + 1} attempts: {_describe(e)}",
+                        delay=max(delay, 1.0),
+                    )
+                self.logger.warning(
+                    f"{fn.__name__} failed transiently ({_describe(e)}), retrying in {delay:.2f}s "
+                    f"(attempt {attempt + 1})"
+                )
+                time.sleep(delay)
+                attempt += 1
+
+
+def _describe(e):
+    if isinstance(e, ApiException):
+        return f"{e.status} {e.reason}"
+    return repr(e)
@@ -0,0 +1,162 @@
+"""
+Operator 多副本分片
+
+每个副本在 Operator 所在命名空间维护一个带标签的 Lease 作为心跳，
+所有存活副本组成一致性哈希环，按 LensUser 的命名空间或 namespace/name 计算归属。
+副本加入或退出（Lease 过期/被删除）时哈希环自动重建，只有少量 key 发生迁移。
+
+kopf 在对象不匹配任何 handler 时会移除自己的 finalizer，
+因此每个副本使用独立的 finalizer，非归属副本不会误删归属副本的 finalizer；
+对象迁移时由新的归属副本移除已离开副本的 finalizer 并加上自己的。
+"""
+import bisect
+import hashlib
+import os
+import socket
+import threading
+from datetime import datetime, timedelta, timezone
+
+import kubernetes
+from kubernetes.client.rest import ApiException
+
+from operator_ratelimit import api_client
+
+SA_NAMESPACE_PATH = '/var/run/secrets/kubernetes.io/serviceaccount/namespace'
+KOPF_DEFAULT_FINALIZER = 'kopf.zalando.org/KopfFinalizerMarker'
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.md5(value.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """带虚拟节点的一致性哈希环，创建后不可变，可无锁读取"""
+
+    def __init__(self, members, vnodes=128):
+        self.members = frozenset(members)
+        points = sorted(
+            (_hash(f"{member}#{i}"), member)
+            for member in self.members
+            for i in range(vnodes)
+        )
+        self._hashes = [h for h, _ in points]
+        self._owners = [m for _, m in points]
+
+    def owner(self, key):
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[index]
+
+
+class ShardMembership:
+    """基于 Lease 心跳的成员管理，维护当前哈希环"""
+
+    def __init__(self, group, identity=None, namespace=None, shard_by='user',
+                 heartbeat_seconds=5, lease_duration_seconds=15, vnodes=128):
+        self.group = group
+        self.identity = identity or os.getenv('POD_NAME') or socket.gethostname()
+        self.namespace = namespace or os.getenv('POD_NAMESPACE') or _own_namespace()
+        self.shard_by = shard_by
+        self.heartbeat_seconds = heartbeat_seconds
+        self.lease_duration_seconds = lease_duration_seconds
+        self.vnodes = vnodes
+        self.label = f"usermanager.{group}/shard-group"
+        self.lease_name = f"kube-user-manage-shard-{self.identity}"
+        self.finalizer_prefix = f"usermanager.{group}/shard-"
+        self.finalizer = self.finalizer_for(self.identity)
+        self.ring = HashRing([self.identity], vnodes)
+        self.on_change = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def shard_key(self, name, namespace):
+        return namespace if self.shard_by == 'namespace' else f"{namespace}/{name}"
+
+    def owns(self, name, namespace):
+        return self.ring.owner(self.shard_key(name, namespace)) == self.identity
+
+    def finalizer_for(self, identity):
+        # finalizer 名称部分不能超过 63 个字符
+        suffix = identity if len(identity) <= 57 else hashlib.md5(identity.encode('utf-8')).hexdigest()
+        return f"{self.finalizer_prefix}{suffix}"
+
+    def is_stale_finalizer(self, finalizer):
+        """已离开副本的 finalizer，以及未启用分片时 kopf 默认的 finalizer"""
+        if finalizer == KOPF_DEFAULT_FINALIZER:
+            return True
+        if not finalizer.startswith(self.finalizer_prefix):
+            return False
+        return finalizer not in {self.finalizer_for(member) for member in self.ring.members}
+
+    def start(self, logger):
+        # 首次同步在 kopf 开始处理事件前完成，避免启动瞬间所有副本都认为自己拥有全部对象
+        self.sync(logger)
+        self._thread = threading.Thread(target=self._run, args=(logger,), name='shard-membership', daemon=True)
+        self._thread.start()
+
+    def stop(self, logger):
+        self._stop.set()
+        try:
+            self._api().delete_namespaced_lease(self.lease_name, self.namespace)
+            logger.info(f"Shard lease '{self.lease_name}' released")
+        except ApiException as e:
+            logger.info(f"Failed to release shard lease: {e.reason}")
+
+    def sync(self, logger):
+        api = self._api()
+        now = datetime.now(timezone.utc)
+        self._renew(api, now)
+        leases = api.list_namespaced_lease(self.namespace, label_selector=f"{self.label}=kube-user-manage")
+        members = {self.identity}
+        for lease in leases.items:
+            spec = lease.spec
+            if not spec or not spec.holder_identity or not spec.renew_time:
+                continue
+            expiry = spec.renew_time + timedelta(seconds=spec.lease_duration_seconds or self.lease_duration_seconds)
+            if expiry > now:
+                members.add(spec.holder_identity)
+        if members != self.ring.members:
+            old_ring, self.ring = self.ring, HashRing(members, self.vnodes)
+            logger.info(f"Shard membership changed: {sorted(old_ring.members)} -> {sorted(members)}")
+            if self.on_change:
+                # 接管对象可能需要较多 API 调用，放到独立线程，避免拖慢心跳
+                threading.Thread(target=self.on_change, args=(old_ring, self.ring),
+                                 name='shard-takeover', daemon=True).start()
+
+    def _run(self, logger):
+        while not self._stop.wait(self.heartbeat_seconds):
+            try:
+                self.sync(logger)
+            except Exception as e:
+                logger.warning(f"Shard heartbeat failed: {e}")
+
+    def _renew(self, api, now):
+        body = kubernetes.client.V1Lease(
+            metadata=kubernetes.client.V1ObjectMeta(
+                name=self.lease_name,
+                labels={self.label: 'kube-user-manage'},
+            ),
+            spec=kubernetes.client.V1LeaseSpec(
+                holder_identity=self.identity,
+                lease_duration_seconds=self.lease_duration_seconds,
+                renew_time=now,
+            ),
+        )
+        try:
+            api.replace_namespaced_lease(self.lease_name, self.namespace, body)
+        except ApiException as e:
+            if e.status != 404:
+                raise
+            api.create_namespaced_lease(self.namespace, body)
+
+    def _api(self):
+        return kubernetes.client.CoordinationV1Api(api_client())
+
+
+def _own_namespace():
+    try:
+        with open(SA_NAMESPACE_PATH) as f:
+            return f.read().strip()
+    except OSError:
+        return 'kube-system'
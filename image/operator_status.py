@@ -0,0 +1,51 @@
+"""
+LensUser 就绪状态
+
+handler 在同一次 status patch 中写入精简的 status.conditions（Ready / RoleBindingsReady / TokenReady）
+和 status.lastError，Web UI 从 LensUser 列表即可得到每个用户的就绪状态，不需要再逐个读取 LuConfig
+或解析 status.kopf.progress。
+"""
+from datetime import datetime, timezone
+
+import kopf
+
+CONDITION_TYPES = ('RoleBindingsReady', 'TokenReady')
+
+
+def set_conditions(patch, status, ready, error=None):
+    """
+    ready 为本次 handler 确认的子状态，例如 {'RoleBindingsReady': True}；
+    未给出的子状态沿用对象上已有的值。状态未变化的 condition 保留原来的 lastTransitionTime。
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    current = {c.get('type'): c for c in (status.get('conditions') or [])}
+    states = {t: current.get(t, {}).get('status') == 'True' for t in CONDITION_TYPES}
+    states.update(ready)
+
+    conditions = [
+        _condition(current.get(t), t, states[t], 'Reconciled' if states[t] else 'Pending', '', now)
+        for t in CONDITION_TYPES
+    ]
+    if error is not None:
+        reason = 'Retrying' if isinstance(error, kopf.TemporaryError) else 'Failed'
+        ready_condition = _condition(current.get('Ready'), 'Ready', False, reason, str(error), now)
+    elif all(states.values()):
+        ready_condition = _condition(current.get('Ready'), 'Ready', True, 'Reconciled', '', now)
+    else:
+        ready_condition = _condition(current.get('Ready'), 'Ready', False, 'Pending', '', now)
+
+    patch.status['conditions'] = [ready_condition] + conditions
+    # merge patch 中的 None 会删除该字段
+    patch.status['lastError'] = {'message': str(error), 'time': now} if error is not None else None
+
+
+def _condition(previous, type_, ok, reason, message, now):
+    status = 'True' if ok else 'False'
+    changed = not previous or previous.get('status') != status
+    return {
+        'type': type_,
+        'status': status,
+        'reason': reason,
+        'message': message,
+        'lastTransitionTime': now if changed else previous.get('lastTransitionTime', now),
+    }
@@ -0,0 +1,109 @@
+"""
+精简的 kopf 状态存储
+
+kopf 默认在注解 kopf.zalando.org/last-handled-configuration 中保存一份 JSON 编码的完整对象副本
+（spec、labels、annotations），并在注解和 status 中各保存一份 handler 进度。这些字节随每次
+list / watch 传输，包括 Web UI 的用户列表。
+
+这里改为只在 status 中存储：
+- diffbase 只保留 spec（handler 只关心 spec.roles，标签与注解的变化无需触发处理）
+- 进度只写 status.kopf.progress
+
+旧对象读取时回退到注解，下次写入时删除对应的旧注解；resume 时由 migrate() 一次性迁移。
+
+多副本时，当前副本不负责的对象不写入任何状态（gate(body) 为 False）。否则没有 handler 匹配的副本
+会由 kopf 把最新 spec 写为 diffbase、并清除负责副本重试中的进度，负责副本的下一轮便看不到变化，
+推迟或重试中的处理就此丢失。
+"""
+import kopf
+
+LEGACY_PREFIX = 'kopf.zalando.org'
+# 旧版 diffbase、防 ping-pong 标记以及 touch 注解，迁移后不再需要
+LEGACY_KEYS = ('last-handled-configuration', 'kopf-managed', 'touch-dummy')
+
+
+def _compact(essence):
+    return {'spec': essence['spec']} if essence and 'spec' in essence else {}
+
+
+def _always(body):
+    return True
+
+
+class CompactDiffBaseStorage(kopf.StatusDiffBaseStorage):
+    """只包含 spec、存放在 status 中的 diffbase；gate(body) 为 False 时不写入"""
+
+    def __init__(self, gate=None):
+        super().__init__()
+        self._legacy = kopf.AnnotationsDiffBaseStorage(prefix=LEGACY_PREFIX)
+        self.gate = gate or _always
+
+    def build(self, *, body, extra_fields=None):
+        return _compact(super().build(body=body, extra_fields=extra_fields))
+
+    def fetch(self, *, body):
+        essence = super().fetch(body=body)
+        if essence is None:
+            legacy = self._legacy.fetch(body=body)
+            return _compact(legacy) if legacy is not None else None
+        return essence
+
+    def store(self, *, body, patch, essence):
+        if not self.gate(body):
+            return
+        super().store(body=body, patch=patch, essence=_compact(essence))
+        _drop_legacy_annotations(body, patch)
+
+    def migrate(self, *, body, patch):
+        """将旧注解中的 diffbase 迁移到 status，没有旧注解时不修改 patch"""
+        if not _legacy_annotations(body):
+            return False
+        if super().fetch(body=body) is None:
+            legacy = self._legacy.fetch(body=body)
+            if legacy is not None:
+                super().store(body=body, patch=patch, essence=_compact(legacy))
+        _drop_legacy_annotations(body, patch)
+        return True
+
+
+class CompactProgressStorage(kopf.StatusProgressStorage):
+    """
+    只写 status 的进度存储，读取时兼容旧注解，写入或清除时一并删除该 handler 的旧注解；
+    gate(body) 为 False 时不写入也不清除
+    """
+
+    def __init__(self, gate=None):
+        super().__init__()
+        self._legacy = kopf.AnnotationsProgressStorage(prefix=LEGACY_PREFIX)
+        self.gate = gate or _always
+
+    def fetch(self, *, key, body):
+        record = super().fetch(key=key, body=body)
+        return record if record is not None else self._legacy.fetch(key=key, body=body)
+
+    def store(self, *, key, record, body, patch):
+        if not self.gate(body):
+            return
+        super().store(key=key, record=record, body=body, patch=patch)
+        self._legacy.purge(key=key, body=body, patch=patch)
+
+    def purge(self, *, key, body, patch):
+        if not self.gate(body):
+            return
+        super().purge(key=key, body=body, patch=patch)
+        self._legacy.purge(key=key, body=body, patch=patch)
+
+    def touch(self, *, body, patch, value):
+        if not self.gate(body):
+            return
+        super().touch(body=body, patch=patch, value=value)
+
+
+def _legacy_annotations(body):
+    annotations = body.get('metadata', {}).get('annotations') or {}
+    return [key for key in annotations if key in {f'{LEGACY_PREFIX}/{k}' for k in LEGACY_KEYS}]
+
+
+def _drop_legacy_annotations(body, patch):
+    for key in _legacy_annotations(body):
+        patch.metadata.annotations[key] = None
@@ -0,0 +1,157 @@
+"""
+重启后的批量一致性校验
+
+operator 停机期间手工删除的 RoleBinding、丢失的 LuConfig 等偏差不会产生 LensUser 事件。
+resume 阶段用少量分页 list 调用取得 ServiceAccount、RoleBinding、Token Secret、LuConfig 的快照，
+在内存中与每个 LensUser 的期望状态比对，只有存在偏差的对象才重新执行创建流程。
+快照在一轮 resume 中共享，过期后下一次校验时重建。
+"""
+import json
+import threading
+import time
+
+import kubernetes
+
+from operator_ratelimit import api_client
+
+LIST_PAGE_SIZE = 500
+TOKEN_SECRET_TYPE = 'kubernetes.io/service-account-token'
+
+
+def list_all(fn, *args, **kwargs):
+    """分页 list，跳过客户端模型反序列化，直接返回原始 JSON 中的 items"""
+    items, token = [], None
+    while True:
+        response = fn(*args, limit=LIST_PAGE_SIZE, _continue=token, _preload_content=False, **kwargs)
+        data = json.loads(response.data)
+        items.extend(data.get('items') or [])
+        token = (data.get('metadata') or {}).get('continue')
+        if not token:
+            return items
+
+
+def _key(obj):
+    return obj['metadata'].get('namespace'), obj['metadata']['name']
+
+
+class ClusterSnapshot:
+    """与 LensUser 相关的集群对象在某一时刻的精简视图"""
+
+    def __init__(self, group, version, logger, namespaces=None):
+        core = kubernetes.client.CoreV1Api(api_client())
+        rbac = kubernetes.client.RbacAuthorizationV1Api(api_client())
+        crd = kubernetes.client.CustomObjectsApi(api_client())
+
+        def list_scoped(cluster_fn, namespaced_fn, *args, **kwargs):
+            """SA、Secret、LuConfig 与 LensUser 同命名空间，限定监听范围时只 list 这些命名空间"""
+            if namespaces is None:
+                return list_all(cluster_fn, *args, **kwargs)
+            items = []
+            for namespace in namespaces:
+                items.extend(list_all(namespaced_fn, *args[:2], namespace, *args[2:], **kwargs))
+            return items
+
+        # (namespace, name) -> ServiceAccount 引用的 Secret 名称
+        self.service_accounts = {
+            _key(sa): {s.get('name') for s in sa.get('secrets') or []}
+            for sa in list_scoped(core.list_service_account_for_all_namespaces,
+                                  core.list_namespaced_service_account)
+        }
+        # 已生成 token 的 Secret
+        self.token_secrets = {
+            _key(secret)
+            for secret in list_scoped(core.list_secret_for_all_namespaces, core.list_namespaced_secret,
+                                      field_selector=f'type={TOKEN_SECRET_TYPE}')
+            if (secret.get('data') or {}).get('token')
+        }
+        # (namespace, name) -> (ClusterRole, subjects)
+        self.role_bindings = {
+            _key(rb): (
+                rb['roleRef']['name'],
+                {(s.get('namespace') or rb['metadata']['namespace'], s.get('name'))
+                 for s in rb.get('subjects') or [] if s.get('kind') == 'ServiceAccount'},
+            )
+            for rb in list_all(rbac.list_role_binding_for_all_namespaces)
+            if rb.get('roleRef', {}).get('kind') == 'ClusterRole'
+        }
+        # (namespace, name) -> LuConfig 注解
+        self.luconfigs = {
+            _key(config): config['metadata'].get('annotations') or {}
+            for config in list_scoped(crd.list_cluster_custom_object, crd.list_namespaced_custom_object,
+                                      group, version, 'luconfig')
+        }
+        logger.info(
+            f"Verification snapshot: {len(self.service_accounts)} ServiceAccounts, "
+            f"{len(self.role_bindings)} RoleBindings, {len(self.token_secrets)} token Secrets, "
+            f"{len(self.luconfigs)} LuConfigs"
+        )
+
+
+class ResumeVerifier:
+    """
+    按需构建并共享 ClusterSnapshot，比对单个 LensUser 的期望状态。
+
+    binding_name(role) 返回某个角色对应的 RoleBinding 名称，为 None 时使用 per-user 模式（与用户同名）。
+    """
+
+    def __init__(self, group, version, credential_mode, credential_annotation, binding_name=None, ttl_seconds=60,
+                 namespaces=None):
+        self.group = group
+        self.version = version
+        self.credential_mode = credential_mode
+        self.credential_annotation = credential_annotation
+        self.binding_name = binding_name
+        self.ttl_seconds = ttl_seconds
+        self.namespaces = namespaces
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._built_at = 0.0
+
+    def snapshot(self, logger):
+        with self._lock:
+            if self._snapshot is None or time.monotonic() - self._built_at > self.ttl_seconds:
+                self._snapshot = ClusterSnapshot(self.group, self.version, logger, self.namespaces)
+                self._built_at = time.monotonic()
+            return self._snapshot
+
+    def drift(self, name, namespace, roles, logger):
+        """
+        返回偏差列表，每项为 (kind, namespace, name, reason)，reason 为 missing 或 mismatch。
+        空列表表示该用户的资源与期望一致。
+        """
+        snapshot = self.snapshot(logger)
+        drift = []
+        secrets = snapshot.service_accounts.get((namespace, name))
+        if secrets is None:
+            drift.append(('ServiceAccount', namespace, name, 'missing'))
+
+        subject = (namespace, name)
+        if self.binding_name is None:
+            # per-user 模式下同一命名空间只有一个与用户同名的 RoleBinding
+            wanted = {}
+            for role in roles:
+                wanted.setdefault(role.get('namespace'), set()).add(role.get('name'))
+            for role_namespace, role_names in wanted.items():
+                binding = snapshot.role_bindings.get((role_namespace, name))
+                if binding is None:
+                    drift.append(('RoleBinding', role_namespace, name, 'missing'))
+                elif binding[0] not in role_names or subject not in binding[1]:
+                    drift.append(('RoleBinding', role_namespace, name, 'mismatch'))
+        else:
+            for role in roles:
+                binding_name = self.binding_name(role.get('name'))
+                binding = snapshot.role_bindings.get((role.get('namespace'), binding_name))
+                if binding is None or subject not in binding[1]:
+                    drift.append(('RoleBinding', role.get('namespace'), binding_name, 'missing'))
+
+        if self.credential_mode != 'tokenrequest':
+            candidates = {f'{name}-token'} | (secrets or set())
+            if not any((namespace, secret) in snapshot.token_secrets for secret in candidates):
+                drift.append(('Secret', namespace, f'{name}-token', 'missing'))
+
+        annotations = snapshot.luconfigs.get((namespace, name))
+        if annotations is None:
+            drift.append(('LuConfig', namespace, name, 'missing'))
+        elif annotations.get(self.credential_annotation, 'secret') != self.credential_mode:
+            drift.append(('LuConfig', namespace, name, 'mismatch'))
+        return drift
@@ -1,7 +1,6 @@
 """
 统一启动脚本 - 同时运行 Operator 和 Web UI
 """
-import asyncio
 import multiprocessing
 import subprocess
 import sys
@@ -12,9 +11,14 @@ import uvicorn
 def run_operator():
     """运行 Kopf Operator"""
     print("🚀 启动 Kopf Operator...")
+    # WATCH_NAMESPACES 为逗号分隔的命名空间列表（支持 kopf 的通配符），为空时监听所有命名空间
+    namespaces = [ns.strip() for ns in os.getenv('WATCH_NAMESPACES', '').split(',') if ns.strip()]
+    scope = [f"--namespace={ns}" for ns in namespaces] or ["--all-namespaces"]
     subprocess.run([
         "kopf", "run",
-        "--all-namespaces",
+        *scope,
+        # 探针端点同时暴露 API 限流器的队列深度等指标
+        f"--liveness={os.getenv('OPERATOR_LIVENESS_ENDPOINT', 'http://0.0.0.0:8081/healthz')}",
         "main.py",
         "--verbose"
     ])
@@ -1,23 +1,37 @@
 """
 Web UI 应用 - 集成到 Operator 中
 """
-from datetime import timedelta
-from typing import List
-from fastapi import FastAPI, Depends, HTTPException, status
+import asyncio
+import copy
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, constr, validator
 import os
 
 from webui_auth import Token, User, authenticate_user, create_access_token, get_current_user
+from webui_assets import INDEX, Assets
+from webui_audit import audit_log
+from webui_events import event_hub
+from webui_index import permission_index
+from webui_informer import clusterrole_informer, lensuser_informer, start_informers
+from webui_rbac import rbac_evaluator, rule_diff
 from webui_k8s import k8s_client
+from webui_projection import (
+    LENSUSER_FIELDS, FastJSONResponse, Projection, clusterrole_text, filter_page, lensuser_text, search_terms
+)
+from webui_tokens import token_cache
+from webui_wait import lensuser_waiter, luconfig_waiter
 from webui_config import settings
 
 app = FastAPI(
     title="Kube User Manager",
     description="Kubernetes 用户权限管理系统",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=FastJSONResponse
 )
 
 # CORS 配置
@@ -30,6 +44,14 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+async def startup():
+    """启动 informer，权限索引等本地缓存随 watch 事件增量更新"""
+    start_informers()
+    audit_log.start()
+    token_cache.start()
+
+
 # ==================== 数据模型 ====================
 
 class LoginRequest(BaseModel):
@@ -85,6 +107,29 @@ class ClusterRoleUpdate(BaseModel):
     rules: List[PolicyRule]
 
 
+class AccessCheck(BaseModel):
+    verb: NonEmptyStr
+    resource: NonEmptyStr  # 子资源写作 "pods/log"
+    apiGroup: str = ""
+    namespace: NonEmptyStr
+    name: Optional[str] = None
+
+
+class AccessCheckRequest(BaseModel):
+    checks: List[AccessCheck]
+
+
+class ResourceRef(BaseModel):
+    resource: NonEmptyStr
+    apiGroup: str = ""
+
+
+class AccessMatrixRequest(BaseModel):
+    namespace: NonEmptyStr
+    resources: List[ResourceRef]
+    verbs: List[str] = ["get", "list", "watch", "create", "update", "patch", "delete"]
+
+
 # ==================== 认证接口 ====================
 
 @app.post("/api/login", response_model=Token, tags=["认证"])
@@ -116,12 +161,41 @@ async def read_users_me(current_user: User = Depends(get_current_user)):
 @app.get("/api/lensusers", tags=["用户管理"])
 async def list_lensusers(
     namespace: str = "kube-system",
+    fields: Optional[str] = None,
+    search: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
     current_user: User = Depends(get_current_user)
 ):
-    """列出所有用户"""
+    """
+    列出用户（按名称排序），默认只返回列表页需要的字段，fields 为逗号分隔的字段路径（如 metadata.name,spec.roles）。
+    search 按用户名、角色名、命名空间过滤；offset / limit 分页，total 为过滤后的总数。
+    informer 就绪后直接读本地缓存，不再每页请求 API Server。
+    """
     try:
-        users = k8s_client.list_lensusers(namespace)
-        return {"success": True, "data": users}
+        if lensuser_informer.wait_ready(0):
+            users = lensuser_informer.list(namespace)
+        else:
+            users = k8s_client.list_lensusers(namespace)
+        total, page = filter_page(users, search_terms(search), lensuser_text,
+                                  lambda user: user["metadata"]["name"], offset, limit)
+        projection = Projection.parse(fields, LENSUSER_FIELDS)
+        data = [projection.apply(user) for user in page]
+        # 直接返回响应对象，跳过 FastAPI 对大列表逐项的 jsonable_encoder 转换
+        return FastJSONResponse({"success": True, "data": data, "total": total, "offset": offset})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/lensusers/names", tags=["用户管理"])
+async def list_lensuser_names(
+    namespace: str = "kube-system",
+    current_user: User = Depends(get_current_user)
+):
+    """只列出用户名称（仅请求 metadata，供下拉框等名称视图使用）"""
+    try:
+        names = k8s_client.list_lensuser_names(namespace)
+        return {"success": True, "data": names}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -157,10 +231,14 @@ async def create_lensuser(
         
         roles = [{"name": role.name, "namespace": role.namespace} for role in request.roles]
         result = k8s_client.create_lensuser(request.name, roles, request.namespace)
+        audit_log.record(current_user.username, "create", "LensUser", request.name, request.namespace,
+                         detail={"roles": roles})
         return {"success": True, "data": result, "message": "用户创建成功"}
     except HTTPException:
         raise
     except Exception as e:
+        audit_log.record(current_user.username, "create", "LensUser", request.name, request.namespace,
+                         success=False, detail={"error": str(e)})
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -179,10 +257,14 @@ async def update_lensuser(
         
         roles = [{"name": role.name, "namespace": role.namespace} for role in request.roles]
         result = k8s_client.update_lensuser(name, roles, namespace)
+        audit_log.record(current_user.username, "update", "LensUser", name, namespace,
+                         detail={"roles": roles, "previousRoles": existing.get("spec", {}).get("roles")})
         return {"success": True, "data": result, "message": "用户更新成功"}
     except HTTPException:
         raise
     except Exception as e:
+        audit_log.record(current_user.username, "update", "LensUser", name, namespace,
+                         success=False, detail={"error": str(e)})
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -195,46 +277,98 @@ async def delete_lensuser(
     """删除用户"""
     try:
         result = k8s_client.delete_lensuser(name, namespace)
+        token_cache.invalidate(name, namespace)
+        audit_log.record(current_user.username, "delete", "LensUser", name, namespace)
         return {"success": True, "data": result, "message": "用户删除成功"}
     except Exception as e:
+        audit_log.record(current_user.username, "delete", "LensUser", name, namespace,
+                         success=False, detail={"error": str(e)})
         raise HTTPException(status_code=500, detail=str(e))
 
 
+KUBECONFIG_PENDING = "Kubeconfig 配置尚未生成，请稍后再试。如果长时间未生成，请检查 Operator 日志。"
+
+
+def _kubeconfig_blocker(user: dict) -> Optional[HTTPException]:
+    """根据用户状态判断 kubeconfig 是否可用：创建失败返回 500，尚未生成返回 404，可用返回 None"""
+    # 优先使用 Operator 写入的 status.conditions
+    status = user.get("status", {})
+    conditions = {c.get("type"): c for c in status.get("conditions") or []}
+    ready = conditions.get("Ready")
+    if ready:
+        if ready.get("status") != "True" and ready.get("reason") == "Failed":
+            return HTTPException(
+                status_code=500,
+                detail=f"用户创建失败: {ready.get('message') or '创建失败'}。请检查 Operator 权限配置或联系管理员。"
+            )
+        if conditions.get("TokenReady", {}).get("status") != "True":
+            return HTTPException(status_code=404, detail=KUBECONFIG_PENDING)
+        return None
+    # 兼容旧版本 Operator 创建的对象：检查是否有创建失败的记录
+    progress = status.get("kopf", {}).get("progress", {})
+    for key, value in progress.items():
+        if isinstance(value, dict) and value.get("failure"):
+            error_msg = value.get("message", "创建失败")
+            return HTTPException(
+                status_code=500, 
+                detail=f"用户创建失败: {error_msg}。请检查 Operator 权限配置或联系管理员。"
+            )
+    return None
+
+
+def _is_pending(user: dict) -> bool:
+    blocker = _kubeconfig_blocker(user)
+    return blocker is not None and blocker.status_code == 404
+
+
 @app.get("/api/lensusers/{name}/kubeconfig", tags=["用户管理"])
 async def get_user_kubeconfig(
     name: str,
     namespace: str = "kube-system",
+    wait: float = Query(0, ge=0),
     current_user: User = Depends(get_current_user)
 ):
-    """获取用户的 kubeconfig"""
+    """
+    获取用户的 kubeconfig。
+
+    wait 大于 0 时（最多 KUBECONFIG_MAX_WAIT 秒），配置尚未生成则保持请求，
+    由 watch 事件唤醒，生成后立即返回；超时仍未生成时返回 404。
+    """
     try:
         # 首先检查用户是否存在
         user = k8s_client.get_lensuser(name, namespace)
         if not user:
             raise HTTPException(status_code=404, detail="用户不存在")
         
-        # 检查用户状态
-        status = user.get("status", {})
-        kopf_status = status.get("kopf", {})
-        progress = kopf_status.get("progress", {})
-        
-        # 检查是否有创建失败的记录
-        for key, value in progress.items():
-            if isinstance(value, dict) and value.get("failure"):
-                error_msg = value.get("message", "创建失败")
-                raise HTTPException(
-                    status_code=500, 
-                    detail=f"用户创建失败: {error_msg}。请检查 Operator 权限配置或联系管理员。"
-                )
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + min(wait, settings.KUBECONFIG_MAX_WAIT)
+        if wait > 0 and _is_pending(user):
+            user = await lensuser_waiter.wait(
+                namespace, name, deadline - loop.time(), lambda obj: not _is_pending(obj)
+            ) or user
+        blocker = _kubeconfig_blocker(user)
+        if blocker is not None:
+            raise blocker
         
         # 获取配置
         luconfig = k8s_client.get_luconfig(name, namespace)
+        if not luconfig and wait > 0 and deadline > loop.time():
+            # 缓存中的对象为共享数据，复制后再填充令牌
+            luconfig = copy.deepcopy(await luconfig_waiter.wait(namespace, name, deadline - loop.time()))
         if not luconfig:
-            raise HTTPException(
-                status_code=404, 
-                detail="Kubeconfig 配置尚未生成，请稍后再试。如果长时间未生成，请检查 Operator 日志。"
-            )
-        return {"success": True, "data": luconfig.get("spec", {})}
+            raise HTTPException(status_code=404, detail=KUBECONFIG_PENDING)
+        kubeconfig = luconfig.get("spec", {})
+        annotations = luconfig.get("metadata", {}).get("annotations") or {}
+        if annotations.get(settings.CREDENTIAL_MODE_ANNOTATION) == "tokenrequest":
+            # TokenRequest 模式：LuConfig 不保存令牌，按需从缓存签发
+            # 签发可能阻塞在 TokenRequest 调用或签发锁上，放到线程池中执行
+            token, expires_at = await run_in_threadpool(token_cache.get, name, namespace)
+            for item in kubeconfig.get("users", []):
+                item.setdefault("user", {})["token"] = token
+            # 下载后的令牌不会轮换，返回过期时间由前端提示用户
+            expiration = datetime.fromtimestamp(expires_at, timezone.utc).isoformat()
+            return {"success": True, "data": kubeconfig, "expirationTimestamp": expiration}
+        return {"success": True, "data": kubeconfig}
     except HTTPException:
         raise
     except Exception as e:
@@ -244,11 +378,18 @@ async def get_user_kubeconfig(
 # ==================== ClusterRole 管理接口 ====================
 
 @app.get("/api/clusterroles", tags=["角色管理"])
-async def list_clusterroles(current_user: User = Depends(get_current_user)):
-    """列出所有带 UserManager 标签的 ClusterRole"""
+async def list_clusterroles(
+    search: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    current_user: User = Depends(get_current_user)
+):
+    """列出所有带 UserManager 标签的 ClusterRole（系统内置角色排在最后），search 按角色名、描述过滤，offset / limit 分页"""
     try:
         roles = k8s_client.list_managed_clusterroles()
-        return {"success": True, "data": roles}
+        total, page = filter_page(roles, search_terms(search), clusterrole_text,
+                                  lambda role: (not role.get("managed"), role["name"]), offset, limit)
+        return {"success": True, "data": page, "total": total, "offset": offset}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -283,11 +424,15 @@ async def create_clusterrole(
         
         rules = [rule.dict() for rule in request.rules]
         result = k8s_client.create_clusterrole(request.name, rules, request.description)
+        audit_log.record(current_user.username, "create", "ClusterRole", request.name,
+                         detail={"description": request.description, "rules": rules})
         return {"success": True, "data": result, "message": "角色创建成功"}
     except HTTPException:
         raise
     except Exception as e:
         error_msg = str(e)
+        audit_log.record(current_user.username, "create", "ClusterRole", request.name,
+                         success=False, detail={"error": error_msg})
         if "is forbidden" in error_msg and "attempting to grant RBAC permissions" in error_msg:
             raise HTTPException(
                 status_code=500, 
@@ -310,11 +455,16 @@ async def update_clusterrole(
         
         rules = [rule.dict() for rule in request.rules]
         result = k8s_client.update_clusterrole(name, rules, request.description)
+        audit_log.record(current_user.username, "update", "ClusterRole", name,
+                         detail={"description": request.description, "rules": rules,
+                                 "previousRules": existing.get("rules")})
         return {"success": True, "data": result, "message": "角色更新成功"}
     except HTTPException:
         raise
     except Exception as e:
         error_msg = str(e)
+        audit_log.record(current_user.username, "update", "ClusterRole", name,
+                         success=False, detail={"error": error_msg})
         if "is forbidden" in error_msg and "attempting to grant RBAC permissions" in error_msg:
             raise HTTPException(
                 status_code=500, 
@@ -323,6 +473,43 @@ async def update_clusterrole(
         raise HTTPException(status_code=500, detail=error_msg)
 
 
+@app.post("/api/clusterroles/{name}/preview", tags=["角色管理"])
+async def preview_clusterrole_update(
+    name: str,
+    request: ClusterRoleUpdate,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    预览 ClusterRole 规则变更：规则差异以及受影响的用户和命名空间（dry-run，不修改集群）。
+
+    clusterWide 为 true 时存在引用该角色的 ClusterRoleBinding，受影响的用户在所有命名空间生效；
+    groups 为通过用户组授予该角色的组，lensusers 已包含其中的 LensUser。
+    """
+    try:
+        cached = clusterrole_informer.get(None, name)
+        if cached is not None:
+            current_rules = cached.get("rules") or []
+        else:
+            role = k8s_client.get_clusterrole(name)
+            if not role:
+                raise HTTPException(status_code=404, detail="角色不存在")
+            current_rules = role["rules"]
+
+        diff = rule_diff(current_rules, [rule.dict() for rule in request.rules])
+        # 包括 ClusterRoleBinding（全集群生效）和通过用户组获得该角色的 LensUser
+        lensusers = (f"{user['metadata']['namespace']}/{user['metadata']['name']}" for user in lensuser_informer.list())
+        impact = permission_index.role_impact(name, lensusers)
+        return {"success": True, "data": {
+            **diff,
+            **{key: value for key, value in impact.items() if key != "affected"},
+            "lensusers": impact["affected"],
+        }}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.delete("/api/clusterroles/{name}", tags=["角色管理"])
 async def delete_clusterrole(
     name: str,
@@ -331,11 +518,90 @@ async def delete_clusterrole(
     """删除 ClusterRole"""
     try:
         k8s_client.delete_clusterrole(name)
+        audit_log.record(current_user.username, "delete", "ClusterRole", name)
         return {"success": True, "message": "角色删除成功"}
     except Exception as e:
+        audit_log.record(current_user.username, "delete", "ClusterRole", name,
+                         success=False, detail={"error": str(e)})
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ==================== 权限索引接口 ====================
+
+@app.get("/api/permissions/namespaces/{namespace}", tags=["权限查询"])
+async def get_namespace_permissions(
+    namespace: str,
+    current_user: User = Depends(get_current_user)
+):
+    """查询命名空间内每个角色授予了哪些用户"""
+    return {"success": True, "data": permission_index.namespace_roles(namespace)}
+
+
+@app.get("/api/permissions/users/{name}", tags=["权限查询"])
+async def get_user_permissions(
+    name: str,
+    namespace: str = "kube-system",
+    current_user: User = Depends(get_current_user)
+):
+    """查询用户在各命名空间拥有的角色（declared: LensUser 中声明，bound: RoleBinding 已生效）"""
+    return {"success": True, "data": permission_index.user_bindings(f"{namespace}/{name}")}
+
+
+@app.post("/api/permissions/users/{name}/check", tags=["权限查询"])
+async def check_user_access(
+    name: str,
+    request: AccessCheckRequest,
+    namespace: str = "kube-system",
+    current_user: User = Depends(get_current_user)
+):
+    """批量检查用户能否对资源执行操作，基于缓存的 RoleBinding / ClusterRoleBinding 与 ClusterRole / Role 规则本地计算，不访问 API Server"""
+    checks = [check.dict() for check in request.checks]
+    return {"success": True, "data": rbac_evaluator.check(f"{namespace}/{name}", checks)}
+
+
+@app.post("/api/permissions/users/{name}/matrix", tags=["权限查询"])
+async def get_user_access_matrix(
+    name: str,
+    request: AccessMatrixRequest,
+    namespace: str = "kube-system",
+    current_user: User = Depends(get_current_user)
+):
+    """用户在指定命名空间内的 资源 × 操作 权限矩阵"""
+    resources = [resource.dict() for resource in request.resources]
+    matrix = rbac_evaluator.matrix(f"{namespace}/{name}", request.namespace, resources, request.verbs)
+    return {"success": True, "data": matrix}
+
+
+# ==================== 审计日志接口 ====================
+
+@app.get("/api/audit", tags=["审计"])
+async def query_audit_log(
+    actor: Optional[str] = None,
+    kind: Optional[str] = None,
+    name: Optional[str] = None,
+    namespace: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    limit: int = 100,
+    current_user: User = Depends(get_current_user)
+):
+    """按操作者、资源（kind/name/namespace）和时间范围（Unix 时间戳）查询审计记录"""
+    try:
+        # SQLite 查询为阻塞调用，放到线程池中执行，不阻塞事件循环
+        entries = await run_in_threadpool(
+            audit_log.query, actor, kind, name, namespace, since, until, min(max(limit, 1), 1000)
+        )
+        return {"success": True, "data": entries, "dropped": audit_log.dropped}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/audit/status", tags=["审计"])
+async def get_audit_status(current_user: User = Depends(get_current_user)):
+    """审计写入线程状态：是否运行、最近一次写入失败原因、缓冲区积压与丢弃的记录数"""
+    return {"success": True, "data": audit_log.status()}
+
+
 # ==================== 命名空间接口 ====================
 
 @app.get("/api/namespaces", tags=["系统"])
@@ -348,20 +614,48 @@ async def list_namespaces(current_user: User = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ==================== 事件推送接口 ====================
+
+@app.get("/api/events", tags=["系统"])
+async def stream_events(current_user: User = Depends(get_current_user)):
+    """
+    Server-Sent Events：推送 LensUser（lensuser）、LuConfig（luconfig）、ClusterRole（clusterrole）的
+    ADDED / MODIFIED / DELETED 事件，data 为 {"type": 事件类型, "object": 对象}。
+    收到 resync 事件时客户端应重新加载列表。所有连接共享同一组 informer watch。
+    """
+    return StreamingResponse(
+        event_hub.stream(),
+        media_type="text/event-stream",
+        # 禁止代理缓冲，事件到达即转发
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # ==================== 静态文件服务 ====================
 
 frontend_path = os.path.join(os.path.dirname(__file__), "frontend")
 if os.path.exists(frontend_path):
-    # 先挂载根路径的 index.html
+    # index.html 与带内容哈希的 app.js / style.css 常驻内存，并附带预压缩版本
+    assets = Assets()
+
+    def _serve_asset(name: str, request: Request) -> Response:
+        result = assets.response(name, request.headers.get("accept-encoding", ""),
+                                 request.headers.get("if-none-match"))
+        if result is None:
+            raise HTTPException(status_code=404, detail="Not Found")
+        status_code, content, headers = result
+        return Response(content=content, status_code=status_code, headers=headers)
+
     @app.get("/")
-    async def serve_frontend():
+    async def serve_frontend(request: Request):
         """服务前端页面"""
-        return FileResponse(os.path.join(frontend_path, "index.html"))
-    
-    # 然后挂载静态文件目录
-    app.mount("/assets", StaticFiles(directory=frontend_path), name="static")
+        return _serve_asset(INDEX, request)
+
+    @app.get("/assets/{name}")
+    async def serve_asset(name: str, request: Request):
+        """服务前端静态资源"""
+        return _serve_asset(name, request)
 else:
     @app.get("/")
     async def serve_error():
         return {"error": "Frontend files not found", "path": frontend_path}
-
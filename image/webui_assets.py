@@ -0,0 +1,149 @@
+"""
+前端静态资源
+
+- app.js、style.css 以内容哈希命名（app.<hash>.js），响应带 immutable 长缓存，内容变化即换名
+- index.html 中的引用替换为哈希文件名，常驻内存，以 ETag 协商缓存
+- 所有文件预先生成 gzip（以及安装了 brotli 时的 br）压缩版本，按 Accept-Encoding 选择
+
+镜像构建时执行 `python webui_assets.py` 将结果写入 frontend/dist，运行时直接加载；
+没有 dist 目录（本地开发）时启动时在内存中生成。
+"""
+import gzip
+import hashlib
+import json
+import os
+import sys
+from typing import Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+FRONTEND_PATH = os.path.join(os.path.dirname(__file__), "frontend")
+DIST_PATH = os.path.join(FRONTEND_PATH, "dist")
+MANIFEST = "manifest.json"
+INDEX = "index.html"
+# 需要指纹化的资源（index.html 中以 /assets/<name> 引用）
+FINGERPRINTED = ("app.js", "style.css")
+
+CONTENT_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".js": "application/javascript; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+}
+# 按优先级排列的压缩编码及对应文件后缀
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _fingerprint(name: str, content: bytes) -> str:
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+
+
+def _compress(content: bytes) -> Dict[str, bytes]:
+    variants = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(content, quality=11)
+    return variants
+
+
+def build(src: str = FRONTEND_PATH) -> Tuple[Dict[str, Dict[str, bytes]], Dict[str, str]]:
+    """
+    生成所有文件及其压缩版本，返回 ({文件名: {编码: 内容}}, {原文件名: 哈希文件名})，
+    编码 "identity" 为未压缩内容。
+    """
+    files, manifest = {}, {}
+    for name in FINGERPRINTED:
+        with open(os.path.join(src, name), "rb") as f:
+            content = f.read()
+        manifest[name] = _fingerprint(name, content)
+        files[manifest[name]] = {"identity": content, **_compress(content)}
+
+    with open(os.path.join(src, INDEX), "rb") as f:
+        html = f.read().decode("utf-8")
+    for name, hashed in manifest.items():
+        html = html.replace(f"/assets/{name}", f"/assets/{hashed}")
+    content = html.encode("utf-8")
+    files[INDEX] = {"identity": content, **_compress(content)}
+    return files, manifest
+
+
+def write(files: Dict[str, Dict[str, bytes]], manifest: Dict[str, str], dst: str = DIST_PATH) -> None:
+    os.makedirs(dst, exist_ok=True)
+    for name, variants in files.items():
+        for encoding, content in variants.items():
+            suffix = dict(ENCODINGS).get(encoding, "")
+            with open(os.path.join(dst, name + suffix), "wb") as f:
+                f.write(content)
+    with open(os.path.join(dst, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def load(dst: str = DIST_PATH) -> Tuple[Dict[str, Dict[str, bytes]], Dict[str, str]]:
+    """读取构建好的文件，不存在时在内存中生成"""
+    manifest_path = os.path.join(dst, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return build()
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    files = {}
+    for name in [INDEX, *manifest.values()]:
+        variants = {}
+        for encoding, suffix in (("identity", ""), *ENCODINGS):
+            path = os.path.join(dst, name + suffix)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    variants[encoding] = f.read()
+        files[name] = variants
+    return files, manifest
+
+
+class Assets:
+    """内存中的前端资源，按文件名与 Accept-Encoding 返回响应内容和响应头"""
+
+    def __init__(self):
+        self.files, self.manifest = load()
+        self.hashed = set(self.manifest.values())
+        self.etags = {
+            # 各压缩版本共用同一个弱 ETag
+            name: 'W/"%s"' % hashlib.sha256(variants["identity"]).hexdigest()[:16]
+            for name, variants in self.files.items()
+        }
+
+    def resolve(self, name: str) -> Optional[str]:
+        """哈希文件名原样返回；未哈希的旧文件名映射到当前版本"""
+        if name in self.files:
+            return name
+        return self.manifest.get(name)
+
+    def response(self, name: str, accept_encoding: str, if_none_match: Optional[str]) -> Optional[Tuple[int, bytes, Dict[str, str]]]:
+        """返回 (状态码, 内容, 响应头)，文件不存在时返回 None"""
+        resolved = self.resolve(name)
+        if resolved is None:
+            return None
+        etag = self.etags[resolved]
+        headers = {
+            "Content-Type": CONTENT_TYPES.get(os.path.splitext(resolved)[1], "application/octet-stream"),
+            "ETag": etag,
+            "Vary": "Accept-Encoding",
+            # 哈希文件名内容不会变化，永久缓存；index.html 及旧文件名每次协商
+            "Cache-Control": "public, max-age=31536000, immutable" if name in self.hashed else "no-cache",
+        }
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return 304, b"", headers
+
+        variants = self.files[resolved]
+        accepted = {token.split(";")[0].strip() for token in (accept_encoding or "").split(",")}
+        for encoding, _ in ENCODINGS:
+            if encoding in accepted and encoding in variants:
+                headers["Content-Encoding"] = encoding
+                return 200, variants[encoding], headers
+        return 200, variants["identity"], headers
+
+
+if __name__ == "__main__":
+    # 镜像构建时预先生成：python webui_assets.py [输出目录]
+    built, names = build()
+    write(built, names, sys.argv[1] if len(sys.argv) > 1 else DIST_PATH)
+    print("\n".join(f"{name} -> {hashed}" for name, hashed in names.items()))
@@ -0,0 +1,209 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+from webui_config import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS audit (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    actor TEXT NOT NULL,
+    action TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    namespace TEXT,
+    name TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS audit_ts ON audit (ts);
+CREATE INDEX IF NOT EXISTS audit_actor_ts ON audit (actor, ts);
+CREATE INDEX IF NOT EXISTS audit_resource_ts ON audit (kind, name, ts);
+"""
+
+COLUMNS = ("ts", "actor", "action", "kind", "namespace", "name", "success", "detail")
+
+
+class AuditLog:
+    """
+    异步批量写入的审计日志
+
+    请求线程只把记录追加到内存环形缓冲区（deque.append，无锁、无 I/O），
+    后台线程按批次写入本地 SQLite（WAL 模式，单个事务 executemany），并定期清理过期记录。
+    缓冲区写满时丢弃最旧的记录并计数，避免写入变慢时反压到接口。
+    查询使用单独的一个只读连接（首次查询时打开，不执行建表语句），不与写入线程争用写锁；
+    query() 是阻塞调用，接口中应放到线程池执行。
+    打开数据库或写入失败时写入线程记录日志并在下个周期重试，status() 返回写入线程的健康状态。
+    """
+
+    def __init__(self, path: str, buffer_size: int, batch_size: int, flush_interval: float, retention_days: int):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self.dropped = 0
+        self._buffer: deque = deque(maxlen=buffer_size)
+        self._wakeup = threading.Event()
+        # 已从缓冲区取出、正在写入的批次，查询时一并返回
+        self._inflight: List[tuple] = []
+        self._thread: Optional[threading.Thread] = None
+        self._reader: Optional[sqlite3.Connection] = None
+        self._reader_lock = threading.Lock()
+        # 写入线程移动批次与查询读取内存记录互斥，record() 不受影响
+        self._snapshot_lock = threading.Lock()
+        # 写入线程状态：最近一次成功写入的时间与最近一次失败原因（成功后清空）
+        self.last_flush: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def record(self, actor: str, action: str, kind: str, name: str, namespace: Optional[str] = None,
+               success: bool = True, detail: Optional[Dict] = None) -> None:
+        """记录一次变更，只做内存追加"""
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append((time.time(), actor, action, kind, namespace, name, int(success),
+                             json.dumps(detail, ensure_ascii=False) if detail is not None else None))
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    def status(self) -> Dict:
+        """写入线程的健康状态"""
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "healthy": self.last_error is None,
+            "lastError": self.last_error,
+            "lastFlush": self.last_flush,
+            "buffered": len(self._buffer) + len(self._inflight),
+            "dropped": self.dropped,
+        }
+
+    def query(self, actor: Optional[str] = None, kind: Optional[str] = None, name: Optional[str] = None,
+              namespace: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+              limit: int = 100) -> List[Dict]:
+        """按操作者、资源、时间范围查询，结果按时间倒序，包含尚未落盘的记录"""
+        conditions, params = [], []
+        for column, value in (("actor", actor), ("kind", kind), ("name", name), ("namespace", namespace)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            conditions.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("ts < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        def matches(row):
+            values = dict(zip(COLUMNS, row))
+            return all(value is None or values[column] == value
+                       for column, value in (("actor", actor), ("kind", kind), ("name", name), ("namespace", namespace))) \
+                and (since is None or values["ts"] >= since) and (until is None or values["ts"] < until)
+
+        with self._snapshot_lock:
+            pending = list(self._inflight) + list(self._buffer)
+        rows = [row for row in pending if matches(row)]
+        # 同一连接不能被多个线程同时使用
+        with self._reader_lock:
+            conn = self._read_connection()
+            if conn is not None:
+                rows += conn.execute(
+                    f"SELECT {', '.join(COLUMNS)} FROM audit {where} ORDER BY ts DESC LIMIT ?", (*params, limit)
+                ).fetchall()
+        # 批次写入与查询并发时同一条记录可能同时出现在内存和数据库中
+        rows = sorted(dict.fromkeys(rows), key=lambda row: row[0], reverse=True)
+        return [self._to_dict(row) for row in rows[:limit]]
+
+    def _run(self) -> None:
+        conn: Optional[sqlite3.Connection] = None
+        last_cleanup = 0.0
+        reported_dropped = 0
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                if conn is None:
+                    # 数据库目录不可写、WAL 或建表失败时下个周期重试，期间记录留在缓冲区
+                    conn = self._connect()
+                self._flush(conn)
+                if time.time() - last_cleanup > 3600:
+                    self._cleanup(conn)
+                    last_cleanup = time.time()
+                self.last_flush = time.time()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.exception("Audit writer failed")
+            if self.dropped > reported_dropped:
+                logger.warning(f"Audit buffer full, {self.dropped - reported_dropped} records dropped")
+                reported_dropped = self.dropped
+
+    def _flush(self, conn: sqlite3.Connection) -> None:
+        while self._buffer or self._inflight:
+            # 上次写入失败的批次保留在 _inflight 中，下次优先重试
+            if not self._inflight:
+                # 与查询的快照互斥，记录从缓冲区直接移入 _inflight，查询时不会两处都不在
+                with self._snapshot_lock:
+                    while self._buffer and len(self._inflight) < self.batch_size:
+                        self._inflight.append(self._buffer.popleft())
+            with conn:
+                conn.executemany(
+                    f"INSERT INTO audit ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                    self._inflight,
+                )
+            self._inflight = []
+
+    def _cleanup(self, conn: sqlite3.Connection) -> None:
+        """按保留天数删除过期记录"""
+        with conn:
+            conn.execute("DELETE FROM audit WHERE ts < ?", (time.time() - self.retention_days * 86400,))
+
+    def _read_connection(self) -> Optional[sqlite3.Connection]:
+        """只读连接，数据库尚未由写入线程创建时返回 None（此时只有内存中的记录）"""
+        if self._reader is None:
+            if not os.path.exists(self.path):
+                return None
+            try:
+                conn = sqlite3.connect(f"file:{quote(self.path)}?mode=ro", uri=True, timeout=10, check_same_thread=False)
+                # 数据库文件已创建但建表事务尚未提交
+                conn.execute("SELECT 1 FROM audit LIMIT 1")
+            except sqlite3.OperationalError:
+                return None
+            self._reader = conn
+        return self._reader
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    @staticmethod
+    def _to_dict(row) -> Dict:
+        entry = dict(zip(COLUMNS, row))
+        entry["success"] = bool(entry["success"])
+        entry["detail"] = json.loads(entry["detail"]) if entry["detail"] else None
+        return entry
+
+
+# 全局审计日志实例
+audit_log = AuditLog(
+    path=settings.AUDIT_DB_PATH,
+    buffer_size=settings.AUDIT_BUFFER_SIZE,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_interval=settings.AUDIT_FLUSH_INTERVAL,
+    retention_days=settings.AUDIT_RETENTION_DAYS,
+)
@@ -19,6 +19,31 @@ class Settings(BaseSettings):
     CLUSTER_NAME: str = os.getenv("cluster_name", "kubernetes")
     KUBE_API_URL: str = os.getenv("kube_api_url", "https://kubernetes.default.svc")
     
+    # TokenRequest 凭据模式下按需签发的令牌配置
+    TOKEN_EXPIRATION_SECONDS: int = int(os.getenv("TOKEN_EXPIRATION_SECONDS", "86400"))
+    TOKEN_REFRESH_RATIO: float = float(os.getenv("TOKEN_REFRESH_RATIO", "0.2"))  # 剩余有效期低于该比例时提前刷新
+    TOKEN_CACHE_MAX_ENTRIES: int = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+    
+    # Informer 单次 watch 请求的超时时间（秒），超时后从最后的 resourceVersion 续上
+    INFORMER_WATCH_TIMEOUT: int = int(os.getenv("INFORMER_WATCH_TIMEOUT", "300"))
+    
+    # 仅 metadata 的分页 list（命名空间、用户名称列表）每页对象数
+    METADATA_LIST_PAGE_SIZE: int = int(os.getenv("METADATA_LIST_PAGE_SIZE", "500"))
+    
+    # /api/events 事件推送：心跳间隔（秒），每个浏览器连接最多积压的事件数（超出后推送 resync 让前端重新加载）
+    EVENTS_HEARTBEAT_INTERVAL: float = float(os.getenv("EVENTS_HEARTBEAT_INTERVAL", "15"))
+    EVENTS_QUEUE_SIZE: int = int(os.getenv("EVENTS_QUEUE_SIZE", "1000"))
+    
+    # GET /api/lensusers/{name}/kubeconfig?wait= 的最长等待时间（秒）
+    KUBECONFIG_MAX_WAIT: float = float(os.getenv("KUBECONFIG_MAX_WAIT", "60"))
+    
+    # 审计日志：内存环形缓冲 + 后台批量写入 SQLite
+    AUDIT_DB_PATH: str = os.getenv("AUDIT_DB_PATH", "/tmp/kube-user-manager/audit.db")
+    AUDIT_BUFFER_SIZE: int = int(os.getenv("AUDIT_BUFFER_SIZE", "10000"))
+    AUDIT_BATCH_SIZE: int = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+    AUDIT_FLUSH_INTERVAL: float = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1"))
+    AUDIT_RETENTION_DAYS: int = int(os.getenv("AUDIT_RETENTION_DAYS", "90"))
+    
     # CRD 组名配置（可自定义）
     CRD_GROUP: str = os.getenv("CRD_GROUP", "osip.cc")
     CRD_VERSION: str = os.getenv("CRD_VERSION", "v1")
@@ -30,6 +55,10 @@ class Settings(BaseSettings):
     
     USER_MANAGER_LABEL_VALUE: str = "true"
     
+    @property
+    def CREDENTIAL_MODE_ANNOTATION(self) -> str:
+        return f"usermanager.{self.CRD_GROUP}/credential-mode"
+    
     # CORS 配置
     CORS_ORIGINS: List[str] = ["*"]
     
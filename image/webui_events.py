@@ -0,0 +1,165 @@
+"""
+Web UI 事件推送（Server-Sent Events）
+
+LensUser、LuConfig、ClusterRole 各只有一路共享的 informer watch。事件到达时在 informer 线程中
+裁剪、序列化一次，再分发到每个已连接浏览器的队列，N 个浏览器只对应一路上游 watch：
+- LensUser 按列表页字段投影，投影结果没有变化的事件（如 kopf 内部状态更新）不推送
+- ClusterRole 只推送受管角色和系统内置角色，格式与 /api/clusterroles 一致
+- LuConfig 只推送 metadata，不包含 kubeconfig 中的令牌
+浏览器消费过慢导致队列写满时丢弃积压的事件并推送 resync，由前端重新加载列表。
+"""
+import asyncio
+import json
+import threading
+from typing import AsyncIterator, Dict, Optional, Set
+
+from webui_config import settings
+from webui_informer import Informer, clusterrole_informer, lensuser_informer, luconfig_informer
+from webui_k8s import SYSTEM_CLUSTERROLES
+from webui_projection import LENSUSER_FIELDS, Projection
+
+try:
+    import orjson
+
+    def _dumps(data: Dict) -> bytes:
+        return orjson.dumps(data)
+except ImportError:
+    def _dumps(data: Dict) -> bytes:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+# 连接建立时告知 EventSource 断线后的重连间隔（毫秒）
+RETRY = b"retry: 3000\n\n"
+HEARTBEAT = b": heartbeat\n\n"
+RESYNC = b"event: resync\ndata: {}\n\n"
+
+_lensuser_view = Projection(LENSUSER_FIELDS)
+# 判断变化时忽略 resourceVersion，只比较前端可见的字段
+_lensuser_visible = Projection(f for f in LENSUSER_FIELDS if f != "metadata.resourceVersion")
+
+
+def _message(kind: str, event_type: str, obj: Dict) -> bytes:
+    return b"event: " + kind.encode() + b"\ndata: " + _dumps({"type": event_type, "object": obj}) + b"\n\n"
+
+
+def clusterrole_view(obj: Optional[Dict]) -> Optional[Dict]:
+    """ClusterRole 转换为角色列表中的格式，既非受管角色也非系统内置角色时返回 None"""
+    if obj is None:
+        return None
+    metadata = obj["metadata"]
+    labels = metadata.get("labels") or {}
+    name = metadata["name"]
+    if name in SYSTEM_CLUSTERROLES:
+        managed = False
+    elif labels.get(settings.USER_MANAGER_LABEL) == settings.USER_MANAGER_LABEL_VALUE:
+        managed = True
+    else:
+        return None
+    return {
+        "name": name,
+        "labels": labels,
+        "rules": [
+            {
+                "apiGroups": rule.get("apiGroups") or [],
+                "resources": rule.get("resources") or [],
+                "verbs": rule.get("verbs") or [],
+                "resourceNames": rule.get("resourceNames") or [],
+            }
+            for rule in obj.get("rules") or []
+        ],
+        "creationTimestamp": metadata.get("creationTimestamp"),
+        "managed": managed,
+    }
+
+
+class _Subscriber:
+    """单个浏览器连接的事件队列，只在所属事件循环中读写"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, size: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+
+    def put(self, message: bytes) -> None:
+        if self.queue.full():
+            # 积压过多，丢弃全部并让前端重新加载
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            message = RESYNC
+        self.queue.put_nowait(message)
+
+
+class EventHub:
+    """把 informer 事件扇出给所有 SSE 连接"""
+
+    def __init__(self, queue_size: int, heartbeat_seconds: float):
+        self.queue_size = queue_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self._lock = threading.Lock()
+        self._subscribers: Set[_Subscriber] = set()
+
+    def subscribe(self, lensusers: Informer, luconfigs: Informer, clusterroles: Informer) -> None:
+        lensusers.add_handler(self.on_lensuser)
+        luconfigs.add_handler(self.on_luconfig)
+        clusterroles.add_handler(self.on_clusterrole)
+
+    def on_lensuser(self, event_type: str, obj: Dict, old: Optional[Dict]) -> None:
+        if event_type == "MODIFIED" and old is not None and _lensuser_visible.apply(obj) == _lensuser_visible.apply(old):
+            return
+        self._publish(lambda: _message("lensuser", event_type, _lensuser_view.apply(obj)))
+
+    def on_luconfig(self, event_type: str, obj: Dict, old: Optional[Dict]) -> None:
+        # 只关心配置的生成与删除，令牌轮换等修改不推送
+        if event_type == "MODIFIED":
+            return
+        metadata = obj["metadata"]
+        view = {"metadata": {"name": metadata["name"], "namespace": metadata.get("namespace")}}
+        self._publish(lambda: _message("luconfig", event_type, view))
+
+    def on_clusterrole(self, event_type: str, obj: Dict, old: Optional[Dict]) -> None:
+        view, old_view = clusterrole_view(obj), clusterrole_view(old)
+        if event_type == "DELETED":
+            deleted = old_view or view
+        elif view is None:
+            # 去掉了受管标签，对前端而言等同于删除
+            deleted = old_view
+        else:
+            if view != old_view:
+                self._publish(lambda: _message("clusterrole", "ADDED" if old_view is None else "MODIFIED", view))
+            return
+        if deleted is not None:
+            self._publish(lambda: _message("clusterrole", "DELETED", deleted))
+
+    def _publish(self, render) -> None:
+        """没有连接时不做序列化；有连接时只序列化一次"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            return
+        message = render()
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.put, message)
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        """单个 SSE 连接的响应体，连接断开时自动退订"""
+        subscriber = _Subscriber(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        try:
+            yield RETRY
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscriber.queue.get(), self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    # 心跳：保持连接不被代理超时断开
+                    yield HEARTBEAT
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscriber)
+
+
+# 全局事件推送实例
+event_hub = EventHub(settings.EVENTS_QUEUE_SIZE, settings.EVENTS_HEARTBEAT_INTERVAL)
+event_hub.subscribe(lensuser_informer, luconfig_informer, clusterrole_informer)
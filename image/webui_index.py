@@ -0,0 +1,217 @@
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from webui_informer import Informer, clusterrolebinding_informer, lensuser_informer, rolebinding_informer
+
+# (授权命名空间, 角色, 主体)
+# - 授权命名空间为 CLUSTER 时表示 ClusterRoleBinding 授予的全集群权限
+# - 角色为 ClusterRole 名称；RoleBinding 引用命名空间内的 Role 时为 "Role/名称"
+# - 主体为 ServiceAccount 的 "namespace/name"，用户组为 "group:名称"，其他用户为 "user:名称"
+Grant = Tuple[str, str, str]
+
+DECLARED = "declared"  # LensUser spec.roles 中声明的权限
+BOUND = "bound"        # 集群中实际存在的 RoleBinding / ClusterRoleBinding 授予的权限
+
+CLUSTER = "*"
+ROLE_PREFIX = "Role/"
+SERVICEACCOUNT_USER_PREFIX = "system:serviceaccount:"
+
+
+def subject_key(subject: Dict, binding_namespace: Optional[str]) -> Optional[str]:
+    """RoleBinding / ClusterRoleBinding 中的主体转换为索引中的主体键"""
+    kind, name = subject.get("kind"), subject.get("name")
+    if not name:
+        return None
+    if kind == "ServiceAccount":
+        return f"{subject.get('namespace') or binding_namespace}/{name}"
+    if kind == "User":
+        # ServiceAccount 的用户名形如 system:serviceaccount:<namespace>:<name>
+        if name.startswith(SERVICEACCOUNT_USER_PREFIX) and name.count(":") == 3:
+            return "/".join(name[len(SERVICEACCOUNT_USER_PREFIX):].split(":", 1))
+        return f"user:{name}"
+    if kind == "Group":
+        return f"group:{name}"
+    return None
+
+
+def serviceaccount_subjects(user: str) -> List[str]:
+    """ServiceAccount "namespace/name" 在鉴权时对应的全部主体：自身及其所属的内置用户组"""
+    namespace = user.split("/", 1)[0]
+    return [
+        user,
+        "group:system:serviceaccounts",
+        f"group:system:serviceaccounts:{namespace}",
+        "group:system:authenticated",
+    ]
+
+
+class PermissionIndex:
+    """
+    权限倒排索引：namespace → role → users、role → namespace → users 以及 user → (namespace, role)
+
+    每个来源对象（LensUser、RoleBinding 或 ClusterRoleBinding）贡献一组授权，事件到达时只对比该对象新旧两组授权的差集，
+    按 (授权, 来源类型) 引用计数增减索引，更新代价与对象本身的大小成正比，与集群中授权总数无关。
+    同一条授权可能同时来自 LensUser 声明和 RoleBinding（聚合模式下也可能来自多个 RoleBinding），
+    计数归零时才从索引中移除。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 来源对象 -> 其贡献的授权集合
+        self._contributions: Dict[Tuple[str, Optional[str], str], Set[Grant]] = {}
+        # (授权, 来源类型) -> 引用计数
+        self._counts: Counter = Counter()
+        self._by_namespace: Dict[str, Dict[str, Set[str]]] = defaultdict(lambda: defaultdict(set))
+        self._by_role: Dict[str, Dict[str, Set[str]]] = defaultdict(lambda: defaultdict(set))
+        self._by_user: Dict[str, Dict[Tuple[str, str], Set[str]]] = defaultdict(lambda: defaultdict(set))
+
+    def subscribe(self, lensusers: Informer, rolebindings: Informer, clusterrolebindings: Informer) -> None:
+        lensusers.add_handler(self.on_lensuser)
+        rolebindings.add_handler(self.on_rolebinding)
+        clusterrolebindings.add_handler(self.on_clusterrolebinding)
+
+    def on_lensuser(self, event_type: str, obj: Dict, old: Optional[Dict]) -> None:
+        metadata = obj["metadata"]
+        grants = set()
+        if event_type != "DELETED":
+            user = f"{metadata.get('namespace')}/{metadata['name']}"
+            for role in (obj.get("spec") or {}).get("roles") or []:
+                if role.get("namespace") and role.get("name"):
+                    grants.add((role["namespace"], role["name"], user))
+        self._replace(("LensUser", metadata.get("namespace"), metadata["name"]), DECLARED, grants)
+
+    def on_rolebinding(self, event_type: str, obj: Dict, old: Optional[Dict]) -> None:
+        metadata = obj["metadata"]
+        grants = set()
+        role_ref = obj.get("roleRef") or {}
+        if event_type != "DELETED" and role_ref.get("name"):
+            role = role_ref["name"] if role_ref.get("kind") == "ClusterRole" else ROLE_PREFIX + role_ref["name"]
+            grants = self._binding_grants(obj, metadata["namespace"], role, metadata["namespace"])
+        self._replace(("RoleBinding", metadata.get("namespace"), metadata["name"]), BOUND, grants)
+
+    def on_clusterrolebinding(self, event_type: str, obj: Dict, old: Optional[Dict]) -> None:
+        metadata = obj["metadata"]
+        grants = set()
+        role_ref = obj.get("roleRef") or {}
+        if event_type != "DELETED" and role_ref.get("name"):
+            grants = self._binding_grants(obj, CLUSTER, role_ref["name"], None)
+        self._replace(("ClusterRoleBinding", None, metadata["name"]), BOUND, grants)
+
+    def effective_grants(self, user: str) -> List[Tuple[str, str, str]]:
+        """
+        ServiceAccount 实际生效的授权 (授权命名空间, 角色, 来源主体)，
+        包括直接授予的以及通过内置用户组（system:serviceaccounts 等）授予的，不含仅在 LensUser 中声明的
+        """
+        with self._lock:
+            return [
+                (namespace, role, subject)
+                for subject in serviceaccount_subjects(user)
+                for (namespace, role), sources in (self._by_user.get(subject) or {}).items()
+                if BOUND in sources
+            ]
+
+    def namespace_roles(self, namespace: str) -> Dict[str, List[str]]:
+        """某个命名空间内每个角色授予了哪些用户"""
+        with self._lock:
+            roles = self._by_namespace.get(namespace) or {}
+            return {role: sorted(users) for role, users in roles.items()}
+
+    def role_grants(self, role: str) -> Dict[str, List[str]]:
+        """某个角色在哪些命名空间授予了哪些用户"""
+        with self._lock:
+            namespaces = self._by_role.get(role) or {}
+            return {namespace: sorted(users) for namespace, users in namespaces.items()}
+
+    def role_impact(self, role: str, serviceaccounts: Iterable[str]) -> Dict:
+        """
+        修改某个 ClusterRole 会影响到的授权范围。
+
+        serviceaccounts 为需要判断是否受影响的 ServiceAccount（如全部 LensUser），
+        直接授予或通过用户组授予的都计入 affected；clusterWide 表示存在引用该角色的 ClusterRoleBinding，
+        此时受影响的用户在所有命名空间生效。
+        """
+        grants = self.role_grants(role)
+        subjects = {subject for namespace_subjects in grants.values() for subject in namespace_subjects}
+        groups = sorted(subject[len("group:"):] for subject in subjects if subject.startswith("group:"))
+        affected = [
+            user for user in serviceaccounts
+            if any(subject in subjects for subject in serviceaccount_subjects(user))
+        ]
+        return {
+            "namespaces": sorted(namespace for namespace in grants if namespace != CLUSTER),
+            "clusterWide": CLUSTER in grants,
+            "users": sorted(subject for subject in subjects if ":" not in subject),
+            "groups": groups,
+            "otherUsers": sorted(subject[len("user:"):] for subject in subjects if subject.startswith("user:")),
+            "affected": sorted(affected),
+        }
+
+    def user_bindings(self, user: str) -> List[Dict]:
+        """某个用户在哪些命名空间拥有哪些角色，以及权限来源"""
+        with self._lock:
+            bindings = self._by_user.get(user) or {}
+            return [
+                {
+                    "namespace": namespace,
+                    "role": role,
+                    "declared": DECLARED in sources,
+                    "bound": BOUND in sources,
+                }
+                for (namespace, role), sources in sorted(bindings.items())
+            ]
+
+    @staticmethod
+    def _binding_grants(obj: Dict, namespace: str, role: str, binding_namespace: Optional[str]) -> Set[Grant]:
+        subjects = (subject_key(subject, binding_namespace) for subject in obj.get("subjects") or [])
+        return {(namespace, role, subject) for subject in subjects if subject}
+
+    def _replace(self, source: Tuple[str, Optional[str], str], kind: str, grants: Set[Grant]) -> None:
+        with self._lock:
+            previous = self._contributions.pop(source, set())
+            if grants:
+                self._contributions[source] = grants
+            for grant in grants - previous:
+                self._increment(grant, kind)
+            for grant in previous - grants:
+                self._decrement(grant, kind)
+
+    def _increment(self, grant: Grant, kind: str) -> None:
+        self._counts[(grant, kind)] += 1
+        if self._counts[(grant, kind)] == 1:
+            namespace, role, user = grant
+            self._by_namespace[namespace][role].add(user)
+            self._by_role[role][namespace].add(user)
+            self._by_user[user][(namespace, role)].add(kind)
+
+    def _decrement(self, grant: Grant, kind: str) -> None:
+        self._counts[(grant, kind)] -= 1
+        if self._counts[(grant, kind)] > 0:
+            return
+        del self._counts[(grant, kind)]
+        namespace, role, user = grant
+        sources = self._by_user[user][(namespace, role)]
+        sources.discard(kind)
+        if sources:
+            return
+        # 两种来源都不再提供该授权，逐层清理空容器
+        del self._by_user[user][(namespace, role)]
+        if not self._by_user[user]:
+            del self._by_user[user]
+        users = self._by_namespace[namespace][role]
+        users.discard(user)
+        if not users:
+            del self._by_namespace[namespace][role]
+            if not self._by_namespace[namespace]:
+                del self._by_namespace[namespace]
+        users = self._by_role[role][namespace]
+        users.discard(user)
+        if not users:
+            del self._by_role[role][namespace]
+            if not self._by_role[role]:
+                del self._by_role[role]
+
+
+# 全局权限索引实例
+permission_index = PermissionIndex()
+permission_index.subscribe(lensuser_informer, rolebinding_informer, clusterrolebinding_informer)
@@ -0,0 +1,185 @@
+import json
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from kubernetes import watch
+from kubernetes.client.rest import ApiException
+
+from webui_config import settings
+from webui_k8s import k8s_client
+
+logger = logging.getLogger(__name__)
+
+# 事件回调：(事件类型, 新对象, 旧对象)，删除事件的新对象为被删除的对象
+Handler = Callable[[str, Dict, Optional[Dict]], None]
+
+
+class Informer:
+    """
+    List + Watch 维护的本地对象缓存
+
+    启动时全量 list 一次，之后从 list 返回的 resourceVersion 开始 watch，按事件增量更新缓存并通知订阅者。
+    watch 超时后从最后的 resourceVersion 续上；resourceVersion 过期（410）时重新 list，
+    并与缓存比对补发 ADDED / MODIFIED / DELETED 事件，订阅者不会漏掉期间的变化。
+    """
+
+    def __init__(self, name: str, list_fn: Callable, *args, **kwargs):
+        self.name = name
+        self._list_fn = list_fn
+        self._args = args
+        self._kwargs = kwargs
+        self._lock = threading.Lock()
+        self._objects: Dict[Tuple[str, str], Dict] = {}
+        self._handlers: List[Handler] = []
+        # 事件分发与新订阅者的回放串行执行，保证订阅者看到的事件顺序一致
+        self._dispatch_lock = threading.RLock()
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.resource_version: Optional[str] = None
+
+    def add_handler(self, handler: Handler) -> None:
+        """订阅事件，已缓存的对象会先以 ADDED 事件回放给新的订阅者"""
+        with self._dispatch_lock:
+            with self._lock:
+                self._handlers.append(handler)
+                existing = list(self._objects.values())
+            for obj in existing:
+                self._call(handler, "ADDED", obj, None)
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"informer-{self.name}", daemon=True)
+            self._thread.start()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """等待首次 list 完成"""
+        return self._ready.wait(timeout)
+
+    def get(self, namespace: Optional[str], name: str) -> Optional[Dict]:
+        with self._lock:
+            return self._objects.get((namespace, name))
+
+    def list(self, namespace: Optional[str] = None) -> List[Dict]:
+        with self._lock:
+            objects = list(self._objects.values())
+        if namespace is None:
+            return objects
+        return [obj for obj in objects if obj["metadata"].get("namespace") == namespace]
+
+    def _run(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                self._relist()
+                backoff = 1.0
+                while True:
+                    self._watch()
+            except ApiException as e:
+                if e.status == 410:
+                    logger.info(f"Informer {self.name}: resourceVersion expired, relisting")
+                    continue
+                logger.warning(f"Informer {self.name} failed: {e.status} {e.reason}")
+            except Exception as e:
+                logger.warning(f"Informer {self.name} failed: {e!r}")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    def _relist(self) -> None:
+        response = self._list_fn(*self._args, _preload_content=False, **self._kwargs)
+        data = json.loads(response.data)
+        objects = {_key(obj): obj for obj in data.get("items", [])}
+        with self._lock:
+            old_objects, self._objects = self._objects, objects
+            self.resource_version = data["metadata"]["resourceVersion"]
+        for key, obj in objects.items():
+            old = old_objects.get(key)
+            if old is None:
+                self._dispatch("ADDED", obj, None)
+            elif old["metadata"].get("resourceVersion") != obj["metadata"].get("resourceVersion"):
+                self._dispatch("MODIFIED", obj, old)
+        for key, old in old_objects.items():
+            if key not in objects:
+                self._dispatch("DELETED", old, old)
+        self._ready.set()
+
+    def _watch(self) -> None:
+        stream = watch.Watch().stream(
+            self._list_fn,
+            *self._args,
+            resource_version=self.resource_version,
+            timeout_seconds=settings.INFORMER_WATCH_TIMEOUT,
+            allow_watch_bookmarks=True,
+            **self._kwargs,
+        )
+        for event in stream:
+            obj = event["raw_object"]
+            event_type = event["type"]
+            with self._lock:
+                self.resource_version = obj["metadata"]["resourceVersion"]
+                if event_type == "BOOKMARK":
+                    continue
+                key = _key(obj)
+                old = self._objects.get(key)
+                if event_type == "DELETED":
+                    self._objects.pop(key, None)
+                else:
+                    self._objects[key] = obj
+            self._dispatch(event_type, obj, old)
+
+    def _dispatch(self, event_type: str, obj: Dict, old: Optional[Dict]) -> None:
+        with self._dispatch_lock:
+            for handler in list(self._handlers):
+                self._call(handler, event_type, obj, old)
+
+    def _call(self, handler: Handler, event_type: str, obj: Dict, old: Optional[Dict]) -> None:
+        try:
+            handler(event_type, obj, old)
+        except Exception:
+            logger.exception(f"Informer {self.name}: handler failed on {event_type} {_key(obj)}")
+
+
+def _key(obj: Dict) -> Tuple[Optional[str], str]:
+    metadata = obj["metadata"]
+    return metadata.get("namespace"), metadata["name"]
+
+
+# 全局 informer 实例，由 Web UI 启动时统一启动
+lensuser_informer = Informer(
+    "lensuser",
+    k8s_client.custom_api.list_cluster_custom_object,
+    settings.CRD_GROUP,
+    settings.CRD_VERSION,
+    "lensuser",
+)
+rolebinding_informer = Informer(
+    "rolebinding",
+    k8s_client.rbac_v1.list_role_binding_for_all_namespaces,
+)
+clusterrolebinding_informer = Informer(
+    "clusterrolebinding",
+    k8s_client.rbac_v1.list_cluster_role_binding,
+)
+role_informer = Informer(
+    "role",
+    k8s_client.rbac_v1.list_role_for_all_namespaces,
+)
+
+clusterrole_informer = Informer(
+    "clusterrole",
+    k8s_client.rbac_v1.list_cluster_role,
+)
+luconfig_informer = Informer(
+    "luconfig",
+    k8s_client.custom_api.list_cluster_custom_object,
+    settings.CRD_GROUP,
+    settings.CRD_VERSION,
+    "luconfig",
+)
+
+
+def start_informers() -> None:
+    for informer in (lensuser_informer, rolebinding_informer, clusterrolebinding_informer, clusterrole_informer,
+                     role_informer, luconfig_informer):
+        informer.start()
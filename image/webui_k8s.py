@@ -1,10 +1,18 @@
-from typing import List, Dict, Optional
+import json
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
 from kubernetes import client, config
 from kubernetes.client.rest import ApiException
-import yaml
 from webui_config import settings
 
 
+# 优先请求仅包含 metadata 的列表，API Server 不支持时退回完整 JSON
+METADATA_LIST_ACCEPT = "application/json;as=PartialObjectMetadataList;v=v1;g=meta.k8s.io,application/json"
+
+# 系统内置角色（只包含 Kubernetes 原生的系统角色），在角色列表中展示但不可编辑删除
+SYSTEM_CLUSTERROLES = ['admin', 'edit', 'view', 'cluster-admin']
+
+
 class K8sClient:
     """Kubernetes 客户端封装"""
     
@@ -19,9 +27,10 @@ class K8sClient:
             except:
                 raise Exception("无法加载 Kubernetes 配置")
         
-        self.core_v1 = client.CoreV1Api()
-        self.rbac_v1 = client.RbacAuthorizationV1Api()
-        self.custom_api = client.CustomObjectsApi()
+        self.api_client = client.ApiClient()
+        self.core_v1 = client.CoreV1Api(self.api_client)
+        self.rbac_v1 = client.RbacAuthorizationV1Api(self.api_client)
+        self.custom_api = client.CustomObjectsApi(self.api_client)
     
     # ==================== LensUser 管理 ====================
     
@@ -125,9 +134,7 @@ class K8sClient:
     def list_managed_clusterroles(self) -> List[Dict]:
         """列出所有 ClusterRole（包括系统内置角色）"""
         try:
-            # 定义系统内置角色列表（不可编辑删除）
-            # 只包含 Kubernetes 原生的系统角色
-            system_roles = ['admin', 'edit', 'view', 'cluster-admin']
+            system_roles = SYSTEM_CLUSTERROLES
             
             # 获取带标签的（用户创建的）
             label_selector = f"{settings.USER_MANAGER_LABEL}={settings.USER_MANAGER_LABEL_VALUE}"
@@ -241,8 +248,45 @@ class K8sClient:
     
     def list_namespaces(self) -> List[str]:
         """列出所有命名空间"""
-        result = self.core_v1.list_namespace()
-        return [item.metadata.name for item in result.items]
+        return [item["name"] for item in self.list_metadata("/api/v1/namespaces")]
+    
+    # ==================== 元数据列表 ====================
+    
+    def list_metadata(self, path: str, label_selector: Optional[str] = None) -> List[Dict]:
+        """
+        以 PartialObjectMetadataList 形式分页 list 资源，只返回每个对象的 metadata。
+        API Server 不返回 spec/status，也跳过客户端模型反序列化，适合只需要名称、标签的调用方。
+        """
+        items, token = [], None
+        while True:
+            query = [("limit", settings.METADATA_LIST_PAGE_SIZE)]
+            if label_selector:
+                query.append(("labelSelector", label_selector))
+            if token:
+                query.append(("continue", token))
+            response = self.api_client.call_api(
+                path, "GET",
+                query_params=query,
+                header_params={"Accept": METADATA_LIST_ACCEPT},
+                auth_settings=["BearerToken"],
+                _return_http_data_only=True,
+                _preload_content=False,
+            )
+            data = json.loads(response.data)
+            items.extend(item.get("metadata") or {} for item in data.get("items") or [])
+            token = (data.get("metadata") or {}).get("continue")
+            if not token:
+                return items
+    
+    def list_lensuser_names(self, namespace: str = "kube-system") -> List[str]:
+        """只列出 LensUser 名称"""
+        path = f"/apis/{settings.CRD_GROUP}/{settings.CRD_VERSION}/namespaces/{namespace}/lensuser"
+        try:
+            return [item["name"] for item in self.list_metadata(path)]
+        except ApiException as e:
+            if e.status == 404:
+                return []
+            raise e
     
     # ==================== LuConfig 管理 ====================
     
@@ -261,6 +305,19 @@ class K8sClient:
                 return None
             raise e
     
+    # ==================== ServiceAccount 令牌 ====================
+    
+    def create_serviceaccount_token(self, name: str, namespace: str, expiration_seconds: int) -> Tuple[str, datetime]:
+        """通过 TokenRequest API 为 ServiceAccount 签发绑定令牌，返回 (token, 过期时间)"""
+        body = client.AuthenticationV1TokenRequest(
+            spec=client.V1TokenRequestSpec(
+                audiences=[],
+                expiration_seconds=expiration_seconds
+            )
+        )
+        result = self.core_v1.create_namespaced_service_account_token(name, namespace, body)
+        return result.status.token, result.status.expiration_timestamp
+    
     # ==================== 辅助方法 ====================
     
     def _rule_to_dict(self, rule) -> Dict:
@@ -0,0 +1,102 @@
+"""
+API 响应裁剪与序列化
+
+LensUser 原始对象包含 managedFields、kopf 状态等前端用不到的字段。列表接口按字段路径投影，
+只返回前端需要的部分；调用方可以通过 fields= 参数（逗号分隔的点路径）指定其他字段。
+列表接口支持 search= 过滤与 offset= / limit= 分页，前端按页增量加载。
+安装了 orjson 时使用 ORJSONResponse 作为默认响应类。
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+try:
+    import orjson  # noqa: F401
+    FastJSONResponse = ORJSONResponse
+except ImportError:
+    FastJSONResponse = JSONResponse
+
+# 用户列表页用到的字段
+LENSUSER_FIELDS = (
+    "metadata.name",
+    "metadata.namespace",
+    "metadata.resourceVersion",
+    "metadata.creationTimestamp",
+    "spec.roles",
+    "status.conditions",
+    "status.lastError",
+)
+
+
+class Projection:
+    """预编译的字段投影，路径编译为嵌套字典，投影时只访问需要的键"""
+
+    def __init__(self, paths: Iterable[str]):
+        self.tree: Dict = {}
+        for path in paths:
+            node = self.tree
+            parts = [p for p in path.strip().split(".") if p]
+            for i, part in enumerate(parts):
+                if i == len(parts) - 1:
+                    node[part] = None
+                elif node.get(part, {}) is None:
+                    # 已选取了整个父字段
+                    break
+                else:
+                    node = node.setdefault(part, {})
+
+    @classmethod
+    def parse(cls, fields: Optional[str], default: Iterable[str]) -> "Projection":
+        if fields:
+            return cls(f for f in fields.split(",") if f.strip())
+        return cls(default)
+
+    def apply(self, obj: Dict) -> Dict:
+        return _project(obj, self.tree)
+
+
+def _project(obj: Dict, tree: Dict) -> Dict:
+    result = {}
+    for key, children in tree.items():
+        if key not in obj:
+            continue
+        value = obj[key]
+        if children is None:
+            result[key] = value
+        elif isinstance(value, dict):
+            result[key] = _project(value, children)
+    return result
+
+
+def search_terms(search: Optional[str]) -> List[str]:
+    """搜索词按空白拆分、不区分大小写，对象需包含全部搜索词（与前端本地过滤规则一致）"""
+    return (search or "").lower().split()
+
+
+def lensuser_text(user: Dict) -> str:
+    """用户的可搜索文本：用户名及各权限条目的角色名、命名空间"""
+    roles = (user.get("spec") or {}).get("roles") or []
+    parts = [user["metadata"]["name"]]
+    parts.extend(f"{role.get('name', '')} {role.get('namespace', '')}" for role in roles)
+    return " ".join(parts).lower()
+
+
+def clusterrole_text(role: Dict) -> str:
+    """角色的可搜索文本：角色名及描述"""
+    return f"{role.get('name', '')} {(role.get('labels') or {}).get('description', '')}".lower()
+
+
+def filter_page(
+    items: Iterable[Dict],
+    terms: List[str],
+    text: Callable[[Dict], str],
+    sort_key: Callable[[Dict], Any],
+    offset: int = 0,
+    limit: Optional[int] = None,
+) -> Tuple[int, List[Dict]]:
+    """过滤、排序后截取一页，返回 (过滤后总数, 当前页)；limit 为空时返回 offset 之后的全部"""
+    if terms:
+        items = [item for item in items if all(term in text(item) for term in terms)]
+    items = sorted(items, key=sort_key)
+    end = None if limit is None else offset + limit
+    return len(items), items[offset:end]
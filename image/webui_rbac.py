@@ -0,0 +1,163 @@
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from webui_index import CLUSTER, ROLE_PREFIX, PermissionIndex, permission_index
+from webui_informer import Informer, clusterrole_informer, role_informer
+
+ALL = "*"
+
+
+class CompiledRole:
+    """
+    预编译的 ClusterRole 规则
+
+    规则展开为 (apiGroup, resource) -> verbs 的查找表，"*" 原样作为键保存，
+    查询时只需检查少数几个组合（精确值 / 通配 / "*/子资源"），与规则条数无关。
+    带 resourceNames 的规则单独保存，只对指定名称的请求生效。
+    """
+
+    def __init__(self, rules: Iterable[Dict]):
+        self._verbs: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+        self._named: Dict[Tuple[str, str, str], Set[str]] = defaultdict(set)
+        for rule in rules:
+            if rule.get("nonResourceURLs"):
+                continue
+            names = rule.get("resourceNames") or []
+            for group in rule.get("apiGroups") or []:
+                for resource in rule.get("resources") or []:
+                    for verb in rule.get("verbs") or []:
+                        if names:
+                            self._named[(group, resource, verb)].update(names)
+                        else:
+                            self._verbs[(group, resource)].add(verb)
+
+    def allows(self, verb: str, group: str, resource: str, name: Optional[str] = None) -> bool:
+        for key_group in (group, ALL):
+            for key_resource in _resource_keys(resource):
+                verbs = self._verbs.get((key_group, key_resource))
+                if verbs and (verb in verbs or ALL in verbs):
+                    return True
+                if name is None:
+                    continue
+                for key_verb in (verb, ALL):
+                    if name in self._named.get((key_group, key_resource, key_verb), ()):
+                        return True
+        return False
+
+
+def _resource_keys(resource: str) -> Tuple[str, ...]:
+    """规则中可能匹配该资源的写法：精确值、"*"，以及子资源的 "*/子资源" """
+    if "/" in resource:
+        return resource, ALL, "*/" + resource.split("/", 1)[1]
+    return resource, ALL
+
+
+def _expand(rules: Iterable[Dict]) -> Set[Tuple[str, str, str, str]]:
+    """将规则展开为 (apiGroup, resource, verb, resourceName) 原子权限，resourceName 为空表示不限名称"""
+    permissions = set()
+    for rule in rules:
+        names = rule.get("resourceNames") or [""]
+        for group in rule.get("apiGroups") or []:
+            for resource in rule.get("resources") or []:
+                for verb in rule.get("verbs") or []:
+                    permissions.update((group, resource, verb, name) for name in names)
+    return permissions
+
+
+def rule_diff(old_rules: Iterable[Dict], new_rules: Iterable[Dict]) -> Dict[str, List[Dict]]:
+    """规则级别的差异：新增与移除的原子权限"""
+    old, new = _expand(old_rules), _expand(new_rules)
+
+    def to_dicts(permissions):
+        return [
+            {"apiGroup": group, "resource": resource, "verb": verb, "resourceName": name}
+            for group, resource, verb, name in sorted(permissions)
+        ]
+
+    return {"added": to_dicts(new - old), "removed": to_dicts(old - new)}
+
+
+class RbacEvaluator:
+    """
+    基于缓存的 ClusterRole / Role 与权限索引在本地回答 "用户能否对某资源执行某操作"
+
+    授权来源与 API Server 的 RBAC 鉴权一致：RoleBinding（引用 ClusterRole 或同命名空间的 Role）、
+    ClusterRoleBinding，主体包括 ServiceAccount 本身及其所属的内置用户组
+    （system:serviceaccounts、system:serviceaccounts:<namespace>、system:authenticated）。
+    不包含 RBAC 之外的鉴权方式（如 Webhook 鉴权）。
+    """
+
+    def __init__(self, index: PermissionIndex):
+        self._index = index
+        self._lock = threading.Lock()
+        # (None, ClusterRole 名称) 或 (命名空间, "Role/名称") -> 编译后的规则
+        self._roles: Dict[Tuple[Optional[str], str], CompiledRole] = {}
+
+    def subscribe(self, clusterroles: Informer, roles: Informer) -> None:
+        clusterroles.add_handler(self.on_clusterrole)
+        roles.add_handler(self.on_role)
+
+    def on_clusterrole(self, event_type: str, obj: Dict, old: Optional[Dict]) -> None:
+        self._compile((None, obj["metadata"]["name"]), event_type, obj)
+
+    def on_role(self, event_type: str, obj: Dict, old: Optional[Dict]) -> None:
+        metadata = obj["metadata"]
+        self._compile((metadata["namespace"], ROLE_PREFIX + metadata["name"]), event_type, obj)
+
+    def _compile(self, key: Tuple[Optional[str], str], event_type: str, obj: Dict) -> None:
+        # 只重新编译发生变化的角色
+        compiled = CompiledRole(obj.get("rules") or []) if event_type != "DELETED" else None
+        with self._lock:
+            if compiled is None:
+                self._roles.pop(key, None)
+            else:
+                self._roles[key] = compiled
+
+    def check(self, user: str, checks: List[Dict]) -> List[Dict]:
+        """
+        批量检查，每项包含 verb、resource（子资源写作 "pods/log"）、namespace，可选 apiGroup、name。
+        只统计已经由 RoleBinding / ClusterRoleBinding 生效的授权，返回每项是否允许，
+        以及授予该权限的角色和来源（授权命名空间为 "*" 表示 ClusterRoleBinding，主体为用户自身或用户组）。
+        """
+        grants_by_namespace: Dict[str, List[Tuple[str, str, str]]] = defaultdict(list)
+        for grant in self._index.effective_grants(user):
+            grants_by_namespace[grant[0]].append(grant)
+        with self._lock:
+            roles = dict(self._roles)
+
+        results = []
+        for item in checks:
+            matched = []
+            candidates = grants_by_namespace.get(item["namespace"], []) + grants_by_namespace.get(CLUSTER, [])
+            for namespace, role, subject in candidates:
+                # Role 只在所属命名空间内有效，引用的 ClusterRole 按名称查找
+                compiled = roles.get((namespace, role) if role.startswith(ROLE_PREFIX) else (None, role))
+                if compiled is not None and compiled.allows(
+                        item["verb"], item.get("apiGroup", ""), item["resource"], item.get("name")):
+                    matched.append({"role": role, "namespace": namespace, "subject": subject})
+            results.append({
+                **item,
+                "allowed": bool(matched),
+                "roles": sorted({grant["role"] for grant in matched}),
+                "grants": matched,
+            })
+        return results
+
+    def matrix(self, user: str, namespace: str, resources: List[Dict], verbs: List[str]) -> Dict[str, Dict[str, bool]]:
+        """用户在某命名空间内的 资源 × 操作 权限矩阵，resources 每项包含 resource 及可选 apiGroup"""
+        checks = [
+            {"verb": verb, "resource": r["resource"], "apiGroup": r.get("apiGroup", ""), "namespace": namespace}
+            for r in resources
+            for verb in verbs
+        ]
+        matrix: Dict[str, Dict[str, bool]] = defaultdict(dict)
+        for result in self.check(user, checks):
+            resource = result["resource"] if not result["apiGroup"] else f"{result['resource']}.{result['apiGroup']}"
+            matrix[resource][result["verb"]] = result["allowed"]
+        return dict(matrix)
+
+
+# 全局 RBAC 评估器实例
+rbac_evaluator = RbacEvaluator(permission_index)
+rbac_evaluator.subscribe(clusterrole_informer, role_informer)
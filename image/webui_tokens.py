@@ -0,0 +1,173 @@
+import heapq
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from webui_config import settings
+from webui_k8s import k8s_client
+
+logger = logging.getLogger(__name__)
+
+
+class TokenCache:
+    """
+    TokenRequest 令牌的进程内缓存：按过期时间淘汰，并在过期前提前刷新。
+
+    后台线程每 refresh_interval 秒检查一次，签发后被请求过的令牌进入刷新窗口
+    （剩余有效期低于 refresh_ratio）时重新签发，请求路径上通常不需要等待签发；
+    签发后无人请求的令牌不再刷新，到期后淘汰。
+    下载的 kubeconfig 中的令牌不会随缓存轮换，get 同时返回过期时间，由调用方告知用户。
+    """
+
+    def __init__(
+        self,
+        issue: Callable[[str, str, int], Tuple[str, datetime]],
+        expiration_seconds: int,
+        refresh_ratio: float,
+        max_entries: int,
+        refresh_interval: float = 60.0,
+    ):
+        self._issue = issue
+        self._expiration_seconds = expiration_seconds
+        self._refresh_ratio = refresh_ratio
+        self._max_entries = max_entries
+        self._refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # (namespace, name) -> (token, 签发时间, 过期时间, 签发后是否被请求过)
+        self._entries: Dict[Tuple[str, str], Tuple[str, float, float, bool]] = {}
+        # (过期时间, key) 小顶堆，用于按过期顺序淘汰
+        self._expiry_heap: List[Tuple[float, Tuple[str, str]]] = []
+        # 每个 key 一把签发锁及其持有/等待者计数，避免并发请求重复签发；
+        # 计数归零才移除，失效或淘汰令牌时不会让后来的请求拿到另一把锁
+        self._issue_locks: Dict[Tuple[str, str], List] = {}
+
+    def get(self, name: str, namespace: str) -> Tuple[str, float]:
+        """获取有效令牌及其过期时间（UNIX 时间戳），缺失或进入刷新窗口时重新签发"""
+        key = (namespace, name)
+        cached = self._lookup(key)
+        if cached:
+            return cached
+
+        with self._issuing(key):
+            # 等待期间可能已被其他请求签发
+            cached = self._lookup(key)
+            if cached:
+                return cached
+            token, expiration = self._issue(name, namespace, self._expiration_seconds)
+            return token, self._store(key, token, expiration, used=True)
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="token-refresher", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def refresh_due(self) -> int:
+        """重新签发进入刷新窗口、且签发后被请求过的令牌，返回刷新的数量"""
+        now = _now()
+        with self._lock:
+            self._evict_expired(now)
+            due = [key for key, entry in self._entries.items() if entry[3] and self._in_refresh_window(entry, now)]
+        refreshed = 0
+        for key in due:
+            namespace, name = key
+            with self._issuing(key):
+                with self._lock:
+                    entry = self._entries.get(key)
+                # 等待期间可能已被请求路径刷新，或已失效
+                if not entry or not self._in_refresh_window(entry, _now()):
+                    continue
+                try:
+                    token, expiration = self._issue(name, namespace, self._expiration_seconds)
+                except Exception as e:
+                    logger.warning(f"Failed to refresh token for {namespace}/{name}: {e!r}")
+                    continue
+                self._store(key, token, expiration, used=False)
+                refreshed += 1
+        return refreshed
+
+    def invalidate(self, name: str, namespace: str) -> None:
+        """用户删除后丢弃其令牌"""
+        with self._lock:
+            self._entries.pop((namespace, name), None)
+
+    @contextmanager
+    def _issuing(self, key: Tuple[str, str]) -> Iterator[None]:
+        """持有该 key 的签发锁"""
+        with self._lock:
+            holder = self._issue_locks.get(key)
+            if holder is None:
+                holder = self._issue_locks[key] = [threading.Lock(), 0]
+            holder[1] += 1
+        try:
+            with holder[0]:
+                yield
+        finally:
+            with self._lock:
+                holder[1] -= 1
+                if holder[1] == 0:
+                    del self._issue_locks[key]
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._refresh_interval):
+            try:
+                self.refresh_due()
+            except Exception:
+                logger.exception("Token refresher failed")
+
+    def _in_refresh_window(self, entry: Tuple[str, float, float, bool], now: float) -> bool:
+        _, issued_at, expires_at, _ = entry
+        return expires_at - now <= (expires_at - issued_at) * self._refresh_ratio
+
+    def _lookup(self, key: Tuple[str, str]) -> Optional[Tuple[str, float]]:
+        now = _now()
+        with self._lock:
+            self._evict_expired(now)
+            entry = self._entries.get(key)
+            if not entry or self._in_refresh_window(entry, now):
+                return None
+            token, issued_at, expires_at, used = entry
+            if not used:
+                # 标记为仍在使用，后台线程会在进入刷新窗口时刷新
+                self._entries[key] = (token, issued_at, expires_at, True)
+            return token, expires_at
+
+    def _store(self, key: Tuple[str, str], token: str, expiration: Optional[datetime], used: bool) -> float:
+        now = _now()
+        expires_at = expiration.timestamp() if expiration else now + self._expiration_seconds
+        with self._lock:
+            self._entries[key] = (token, now, expires_at, used)
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+            while len(self._entries) > self._max_entries and self._expiry_heap:
+                self._pop_expiry()
+        return expires_at
+
+    def _evict_expired(self, now: float) -> None:
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            self._pop_expiry()
+
+    def _pop_expiry(self) -> None:
+        expires_at, key = heapq.heappop(self._expiry_heap)
+        entry = self._entries.get(key)
+        # 堆中可能残留已被刷新替换的旧记录
+        if entry and entry[2] <= expires_at:
+            del self._entries[key]
+
+
+def _now() -> float:
+    return datetime.now(timezone.utc).timestamp()
+
+
+# 全局令牌缓存实例
+token_cache = TokenCache(
+    issue=k8s_client.create_serviceaccount_token,
+    expiration_seconds=settings.TOKEN_EXPIRATION_SECONDS,
+    refresh_ratio=settings.TOKEN_REFRESH_RATIO,
+    max_entries=settings.TOKEN_CACHE_MAX_ENTRIES,
+)
@@ -0,0 +1,78 @@
+"""
+等待对象达到指定状态（长轮询）
+
+请求方登记一个 Future，informer 收到该对象的 ADDED / MODIFIED 事件且满足条件时唤醒，
+不轮询 API Server。登记后再检查一次本地缓存，避免错过登记前已经到达的事件。
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from webui_informer import Informer, lensuser_informer, luconfig_informer
+
+Predicate = Callable[[Dict], bool]
+
+
+class _Waiter:
+    def __init__(self, predicate: Optional[Predicate]):
+        self.loop = asyncio.get_running_loop()
+        self.future: asyncio.Future = self.loop.create_future()
+        self.predicate = predicate
+
+    def matches(self, obj: Dict) -> bool:
+        return self.predicate is None or self.predicate(obj)
+
+    def resolve(self, obj: Dict) -> None:
+        if not self.future.done():
+            self.future.set_result(obj)
+
+
+class ObjectWaiter:
+    """按 (namespace, name) 等待 informer 中的对象出现或满足条件"""
+
+    def __init__(self, informer: Informer):
+        self.informer = informer
+        self._lock = threading.Lock()
+        self._waiters: Dict[Tuple[Optional[str], str], List[_Waiter]] = defaultdict(list)
+        informer.add_handler(self.on_event)
+
+    def on_event(self, event_type: str, obj: Dict, old: Optional[Dict]) -> None:
+        if event_type == "DELETED":
+            return
+        metadata = obj["metadata"]
+        key = (metadata.get("namespace"), metadata["name"])
+        with self._lock:
+            waiters = list(self._waiters.get(key, ()))
+        for waiter in waiters:
+            if waiter.matches(obj):
+                try:
+                    waiter.loop.call_soon_threadsafe(waiter.resolve, obj)
+                except RuntimeError:
+                    # 事件循环已关闭
+                    pass
+
+    async def wait(self, namespace: Optional[str], name: str, timeout: float,
+                   predicate: Optional[Predicate] = None) -> Optional[Dict]:
+        """返回满足条件（predicate 为空时只要求存在）的对象，超时返回 None"""
+        key = (namespace, name)
+        waiter = _Waiter(predicate)
+        with self._lock:
+            self._waiters[key].append(waiter)
+        try:
+            cached = self.informer.get(namespace, name)
+            if cached is not None and waiter.matches(cached):
+                return cached
+            return await asyncio.wait_for(waiter.future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            with self._lock:
+                self._waiters[key].remove(waiter)
+                if not self._waiters[key]:
+                    del self._waiters[key]
+
+
+# 全局实例
+lensuser_waiter = ObjectWaiter(lensuser_informer)
+luconfig_waiter = ObjectWaiter(luconfig_informer)
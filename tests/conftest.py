@@ -0,0 +1,19 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "image"))
+
+# webui 模块在导入时创建 K8sClient，测试不访问集群，只需一份可加载的 kubeconfig
+if "KUBECONFIG" not in os.environ:
+    _kubeconfig = tempfile.NamedTemporaryFile("w", suffix=".yaml", delete=False)
+    _kubeconfig.write(
+        "apiVersion: v1\n"
+        "kind: Config\n"
+        "clusters: [{name: test, cluster: {server: 'https://127.0.0.1:6443'}}]\n"
+        "users: [{name: test, user: {token: test}}]\n"
+        "contexts: [{name: test, context: {cluster: test, user: test}}]\n"
+        "current-context: test\n"
+    )
+    _kubeconfig.close()
+    os.environ["KUBECONFIG"] = _kubeconfig.name
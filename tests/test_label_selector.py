@@ -0,0 +1,18 @@
+"""WATCH_LABEL_SELECTOR 解析"""
+import kopf
+import pytest
+
+from main import parse_label_selector
+
+
+def test_equality_and_existence_requirements():
+    labels = parse_label_selector("tier=prod, team==payments,env!=dev,managed,!legacy")
+    assert labels["tier"] == "prod" and labels["team"] == "payments"
+    assert labels["managed"] is kopf.PRESENT and labels["legacy"] is kopf.ABSENT
+    assert labels["env"]("prod") and not labels["env"]("dev")
+
+
+@pytest.mark.parametrize("selector", ["env in (prod,staging)", "tier notin (dev)", "tier=prod,env in (a)"])
+def test_set_based_requirements_are_rejected(selector):
+    with pytest.raises(ValueError, match="in / notin"):
+        parse_label_selector(selector)
@@ -0,0 +1,126 @@
+"""聚合 RoleBinding：窗口内的修改合并为一次写入，冲突时重新读取并重放整批修改"""
+import copy
+import logging
+
+import kubernetes
+import pytest
+from kubernetes.client.rest import ApiException
+
+from operator_bindings import AggregatedBindings
+
+LOGGER = logging.getLogger("test")
+NAME = AggregatedBindings.binding_name("edit")
+
+
+class FakeRbacApi:
+    """按 resourceVersion 做乐观并发控制的 RoleBinding 存储"""
+
+    def __init__(self):
+        self.bindings = {}
+        self.writes = []
+        self.before_write = None
+        self._version = 0
+
+    def _save(self, namespace, binding):
+        self._version += 1
+        binding = copy.deepcopy(binding)
+        binding.metadata.resource_version = str(self._version)
+        self.bindings[(namespace, binding.metadata.name)] = binding
+
+    def _check(self, namespace, name, resource_version):
+        if self.before_write is not None:
+            hook, self.before_write = self.before_write, None
+            hook()
+        current = self.bindings.get((namespace, name))
+        if current is None:
+            raise ApiException(status=404, reason="Not Found")
+        if resource_version != current.metadata.resource_version:
+            raise ApiException(status=409, reason="Conflict")
+
+    def read_namespaced_role_binding(self, name, namespace):
+        if (namespace, name) not in self.bindings:
+            raise ApiException(status=404, reason="Not Found")
+        return copy.deepcopy(self.bindings[(namespace, name)])
+
+    def create_namespaced_role_binding(self, namespace, body):
+        self.writes.append("create")
+        if (namespace, body.metadata.name) in self.bindings:
+            raise ApiException(status=409, reason="Conflict")
+        self._save(namespace, body)
+
+    def replace_namespaced_role_binding(self, name, namespace, body):
+        self.writes.append("replace")
+        self._check(namespace, name, body.metadata.resource_version)
+        self._save(namespace, body)
+
+    def delete_namespaced_role_binding(self, name, namespace, body):
+        self.writes.append("delete")
+        self._check(namespace, name, body.preconditions.resource_version)
+        del self.bindings[(namespace, name)]
+
+    def subjects(self, namespace="team-a"):
+        binding = self.bindings.get((namespace, NAME))
+        return None if binding is None else [s.name for s in binding.subjects]
+
+
+@pytest.fixture
+def api(monkeypatch):
+    api = FakeRbacApi()
+    monkeypatch.setattr(kubernetes.client, "RbacAuthorizationV1Api", lambda *args, **kwargs: api)
+    return api
+
+
+def wait(futures):
+    for future in futures:
+        future.result(timeout=5)
+
+
+def test_changes_within_window_are_written_once(api):
+    bindings = AggregatedBindings("osip.cc", window_seconds=0.05)
+    wait([bindings.add("team-a", "edit", name, "kube-system", LOGGER) for name in ("alice", "bob", "carol")])
+    assert api.writes == ["create"]
+    assert api.subjects() == ["alice", "bob", "carol"]
+
+    wait([bindings.remove("team-a", "edit", "bob", "kube-system", LOGGER),
+          bindings.add("team-a", "edit", "dave", "kube-system", LOGGER),
+          # 重复添加已存在的 subject 不产生额外修改
+          bindings.add("team-a", "edit", "alice", "kube-system", LOGGER)])
+    assert api.writes == ["create", "replace"]
+    assert api.subjects() == ["alice", "carol", "dave"]
+
+
+def test_conflict_rereads_and_replays_the_batch(api):
+    bindings = AggregatedBindings("osip.cc", window_seconds=0.01)
+    wait([bindings.add("team-a", "edit", "alice", "kube-system", LOGGER)])
+
+    def concurrent_writer():
+        # 另一个写入者在本批次读取之后、写入之前加入了 bob
+        binding = api.read_namespaced_role_binding(NAME, "team-a")
+        binding.subjects.append(kubernetes.client.RbacV1Subject(kind="ServiceAccount", name="bob",
+                                                                 namespace="kube-system"))
+        api._save("team-a", binding)
+
+    api.before_write = concurrent_writer
+    wait([bindings.add("team-a", "edit", "carol", "kube-system", LOGGER)])
+    assert api.writes == ["create", "replace", "replace"]
+    assert api.subjects() == ["alice", "bob", "carol"]
+
+
+def test_removing_last_subject_deletes_the_binding(api):
+    bindings = AggregatedBindings("osip.cc", window_seconds=0.01)
+    wait([bindings.add("team-a", "edit", "alice", "kube-system", LOGGER)])
+    wait([bindings.remove("team-a", "edit", "alice", "kube-system", LOGGER)])
+    assert api.writes == ["create", "delete"]
+    assert api.subjects() is None
+
+
+def test_failed_batch_fails_every_future(api, monkeypatch):
+    def forbidden(*args, **kwargs):
+        raise ApiException(status=403, reason="Forbidden")
+
+    monkeypatch.setattr(api, "create_namespaced_role_binding", forbidden)
+    bindings = AggregatedBindings("osip.cc", window_seconds=0.01)
+    futures = [bindings.add("team-a", "edit", name, "kube-system", LOGGER) for name in ("alice", "bob")]
+    for future in futures:
+        with pytest.raises(ApiException):
+            future.result(timeout=5)
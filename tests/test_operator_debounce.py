@@ -0,0 +1,69 @@
+"""spec.roles 连续修改的推迟计算"""
+import pytest
+
+import operator_debounce
+from operator_debounce import Debouncer
+
+KEY = ("kube-system", "alice")
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 500.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(operator_debounce, "time", clock)
+    return clock
+
+
+def test_initial_observation_is_not_a_change(clock):
+    debouncer = Debouncer(window_seconds=5, max_delay_seconds=30)
+    debouncer.observe(KEY, [{"name": "view"}])
+    assert debouncer.delay(KEY, runtime_seconds=0) == 0
+
+
+def test_recent_change_is_delayed_until_window_is_quiet(clock):
+    debouncer = Debouncer(window_seconds=5, max_delay_seconds=30)
+    debouncer.observe(KEY, [{"name": "view"}])
+    debouncer.observe(KEY, [{"name": "edit"}])
+    clock.now += 2
+    assert debouncer.delay(KEY, runtime_seconds=2) == pytest.approx(3)
+
+    # 窗口内再次修改，重新计时
+    debouncer.observe(KEY, [{"name": "admin"}])
+    clock.now += 1
+    assert debouncer.delay(KEY, runtime_seconds=3) == pytest.approx(4)
+    # 值未变化的事件（如 status 更新）不重新计时
+    debouncer.observe(KEY, [{"name": "admin"}])
+    clock.now += 4
+    assert debouncer.delay(KEY, runtime_seconds=7) == 0
+
+
+def test_delay_is_capped_by_max_delay(clock):
+    debouncer = Debouncer(window_seconds=5, max_delay_seconds=30)
+    debouncer.observe(KEY, [])
+    debouncer.observe(KEY, [{"name": "edit"}])
+    assert debouncer.delay(KEY, runtime_seconds=28) == pytest.approx(2)
+    assert debouncer.delay(KEY, runtime_seconds=31) == 0
+
+
+def test_disabled_window_and_forgotten_keys(clock):
+    disabled = Debouncer(window_seconds=0, max_delay_seconds=30)
+    disabled.observe(KEY, [])
+    disabled.observe(KEY, [{"name": "edit"}])
+    assert disabled.delay(KEY, runtime_seconds=0) == 0
+
+    debouncer = Debouncer(window_seconds=5, max_delay_seconds=30)
+    debouncer.observe(KEY, [])
+    debouncer.observe(KEY, [{"name": "edit"}])
+    debouncer.forget(KEY)
+    assert debouncer.delay(KEY, runtime_seconds=0) == 0
+    # 删除后重建的对象重新作为首次观察
+    debouncer.observe(KEY, [{"name": "view"}])
+    assert debouncer.delay(KEY, runtime_seconds=0) == 0
@@ -0,0 +1,37 @@
+"""孤儿回收：标签值被截断加哈希时，分片归属按原始名称判断"""
+from operator_gc import LABEL_VALUE_MAX, OwnerLabels
+
+LONG_NAME = "a-very-long-lensuser-name-" + "x" * 60
+
+
+def make_obj(labels, name, namespace, annotate=True):
+    data = {"metadata": {"name": "rb", "namespace": "team-a"}}
+    labels.apply(data, name, namespace)
+    if not annotate:
+        del data["metadata"]["annotations"]
+    return data
+
+
+def test_long_name_label_is_hashed_but_annotation_keeps_original():
+    labels = OwnerLabels("osip.cc")
+    obj = make_obj(labels, LONG_NAME, "kube-system")
+
+    assert len(labels.owner_of(obj)[1]) <= LABEL_VALUE_MAX
+    assert labels.real_owner_of(obj) == ("kube-system", LONG_NAME)
+
+
+def test_legacy_object_resolved_through_known_users():
+    labels = OwnerLabels("osip.cc")
+    obj = make_obj(labels, LONG_NAME, "kube-system", annotate=False)
+    known = {labels.owner_of(obj): ("kube-system", LONG_NAME)}
+
+    assert labels.real_owner_of(obj, known) == ("kube-system", LONG_NAME)
+    # 用户已不存在、标签又被截断时无法确定归属
+    assert labels.real_owner_of(obj) is None
+
+
+def test_short_name_uses_label_value():
+    labels = OwnerLabels("osip.cc")
+    obj = make_obj(labels, "alice", "kube-system", annotate=False)
+
+    assert labels.real_owner_of(obj) == ("kube-system", "alice")
@@ -0,0 +1,78 @@
+"""Operator API 客户端的读写令牌桶"""
+import pytest
+
+import operator_ratelimit
+from operator_ratelimit import RateLimiter, TokenBucket
+
+
+class FakeTime:
+    """sleep 只推进时钟，不真正等待"""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(operator_ratelimit, "time", clock)
+    return clock
+
+
+def test_burst_is_served_without_waiting_then_paced_by_qps(clock):
+    bucket = TokenBucket(qps=10, burst=3)
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.sleeps == []
+
+    bucket.acquire()
+    bucket.acquire()
+    assert clock.sleeps == pytest.approx([0.1, 0.1])
+
+
+def test_tokens_refill_up_to_burst(clock):
+    bucket = TokenBucket(qps=10, burst=2)
+    bucket.acquire()
+    bucket.acquire()
+    clock.now += 60
+    for _ in range(2):
+        bucket.acquire()
+    assert clock.sleeps == []
+    bucket.acquire()
+    assert clock.sleeps == pytest.approx([0.1])
+
+
+def test_reservations_queue_in_arrival_order(clock):
+    bucket = TokenBucket(qps=2, burst=1)
+    bucket.acquire()
+    # 并发到达的请求各自预留令牌，等待时长依次递增
+    clock.sleep = lambda seconds: clock.sleeps.append(seconds)
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.sleeps == pytest.approx([0.5, 1.0, 1.5])
+    assert bucket.stats()["queue_depth"] == 0
+
+
+def test_zero_qps_disables_limiting(clock):
+    bucket = TokenBucket(qps=0, burst=1)
+    for _ in range(100):
+        bucket.acquire()
+    assert clock.sleeps == []
+
+
+def test_reads_and_writes_use_separate_buckets(clock):
+    limiter = RateLimiter(read_qps=10, read_burst=1, write_qps=10, write_burst=1)
+    limiter.acquire("get")
+    limiter.acquire("POST")
+    assert clock.sleeps == []
+    limiter.acquire("HEAD")
+    assert clock.sleeps == pytest.approx([0.1])
+    assert limiter.stats()["write"] == {"qps": 10, "burst": 1, "queue_depth": 0}
@@ -0,0 +1,117 @@
+"""API 调用的瞬时错误分类与重试截止时间"""
+import logging
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import kopf
+import pytest
+import urllib3
+from kubernetes.client.rest import ApiException
+
+import operator_retry
+from operator_retry import Retrier, is_conflict, is_not_found, is_transient, retry_after
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(operator_retry, "time", clock)
+    return clock
+
+
+def api_error(status, headers=None):
+    error = ApiException(status=status, reason="error")
+    error.headers = headers
+    return error
+
+
+class Flaky:
+    """前 len(errors) 次调用依次抛出 errors 中的异常，之后返回 "ok" """
+
+    __name__ = "flaky"
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+@pytest.mark.parametrize("error, transient", [
+    (api_error(0), True),
+    (api_error(429), True),
+    (api_error(500), True),
+    (api_error(503), True),
+    (api_error(400), False),
+    (api_error(403), False),
+    (api_error(404), False),
+    (api_error(409), False),
+    (urllib3.exceptions.ProtocolError("reset"), True),
+    (ConnectionError(), True),
+    (TimeoutError(), True),
+    (ValueError(), False),
+])
+def test_transient_classification(error, transient):
+    assert is_transient(error) is transient
+
+
+def test_conflict_and_not_found_helpers():
+    assert is_conflict(api_error(409)) and not is_conflict(api_error(404))
+    assert is_not_found(api_error(404)) and not is_not_found(ValueError())
+
+
+def test_retry_after_seconds_and_http_date():
+    assert retry_after(api_error(429, {"Retry-After": "3"})) == 3.0
+    when = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 < retry_after(api_error(503, {"Retry-After": format_datetime(when, usegmt=True)})) <= 30
+    assert retry_after(api_error(429, {"Retry-After": "soon"})) is None
+    assert retry_after(api_error(429)) is None
+
+
+def test_transient_errors_are_retried_honouring_retry_after(clock):
+    fn = Flaky(api_error(429, {"Retry-After": "2"}), api_error(503, {"Retry-After": "1"}))
+    assert Retrier(logging.getLogger("test"), deadline=60)(fn) == "ok"
+    assert fn.calls == 3
+    assert clock.sleeps == [2.0, 1.0]
+
+
+def test_backoff_without_retry_after_is_bounded(clock, monkeypatch):
+    monkeypatch.setattr(operator_retry.random, "uniform", lambda low, high: high)
+    fn = Flaky(api_error(500), api_error(500), api_error(500))
+    Retrier(logging.getLogger("test"), deadline=60)(fn)
+    base = operator_retry.RETRY_BASE_DELAY
+    assert clock.sleeps == [base, base * 2, base * 4]
+
+
+def test_non_transient_errors_are_raised_immediately(clock):
+    fn = Flaky(api_error(422))
+    with pytest.raises(ApiException):
+        Retrier(logging.getLogger("test"), deadline=60)(fn)
+    assert fn.calls == 1 and clock.sleeps == []
+
+
+def test_deadline_turns_into_temporary_error(clock):
+    retry = Retrier(logging.getLogger("test"), deadline=5)
+    fn = Flaky(api_error(429, {"Retry-After": "3"}), api_error(429, {"Retry-After": "3"}))
+    with pytest.raises(kopf.TemporaryError) as info:
+        retry(fn)
+    # 第二次等待会超过截止时间，交给 kopf 稍后重新调度整个 handler
+    assert fn.calls == 2 and clock.sleeps == [3.0]
+    assert info.value.delay == 3.0
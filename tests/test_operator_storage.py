@@ -0,0 +1,131 @@
+"""
+多副本下 kopf 状态的写入：不负责该对象的副本走到 kopf 的“无 handler 匹配”分支时，
+不得写入 diffbase、也不得清除负责副本重试中的进度。
+"""
+import asyncio
+import logging
+
+import kopf
+import pytest
+# kopf 内部模块（非公开 API），版本范围固定在 tests/requirements.txt
+from kopf._cogs.structs import bodies, diffs, patches, references
+from kopf._core.actions import lifecycles
+from kopf._core.intents import causes, registries
+from kopf._core.reactor import inventory, processing
+
+from operator_cache import is_pending
+from operator_storage import CompactDiffBaseStorage, CompactProgressStorage
+
+RESOURCE = references.Resource(group="osip.cc", version="v1", plural="lensuser")
+HANDLER_ID = "update_lu/spec.roles"
+
+
+def make_body():
+    """负责副本的 update_lu 正在重试：diffbase 仍是旧 spec，status 中有延迟中的进度"""
+    return {
+        "apiVersion": "osip.cc/v1",
+        "kind": "LensUser",
+        "metadata": {"name": "alice", "namespace": "kube-system", "uid": "uid-1", "resourceVersion": "2"},
+        "spec": {"roles": [{"name": "edit", "namespace": "team-b"}]},
+        "status": {
+            "kopf": {
+                "last-handled-configuration": '{"spec": {"roles": [{"name": "view", "namespace": "team-a"}]}}',
+                "progress": {
+                    HANDLER_ID: {
+                        "started": "2024-05-01T08:00:00.000000",
+                        "delayed": "2099-01-01T00:00:00.000000",
+                        "purpose": "update",
+                        "retries": 1,
+                        "success": False,
+                        "failure": False,
+                        "message": "spec.roles is still changing",
+                    },
+                },
+            },
+        },
+    }
+
+
+def make_settings(gate):
+    settings = kopf.OperatorSettings()
+    settings.persistence.diffbase_storage = CompactDiffBaseStorage(gate=gate)
+    settings.persistence.progress_storage = CompactProgressStorage(gate=gate)
+    return settings
+
+
+def handle_without_matching_handlers(settings, body):
+    """模拟当前副本处理该对象的 update 事件、但没有 handler 匹配（when= 过滤掉）的情形"""
+    storage = settings.persistence.diffbase_storage
+    old, new = storage.fetch(body=body), storage.build(body=body)
+    patch = patches.Patch()
+    cause = causes.ChangingCause(
+        logger=logging.getLogger("test"),
+        indices={},
+        memo=None,
+        resource=RESOURCE,
+        patch=patch,
+        body=body,
+        initial=False,
+        reason=causes.Reason.UPDATE,
+        diff=diffs.diff(old, new),
+        old=old,
+        new=new,
+    )
+    asyncio.run(processing.process_changing_cause(
+        lifecycle=lifecycles.all_at_once,
+        registry=registries.OperatorRegistry(),
+        settings=settings,
+        memory=inventory.ResourceMemory(),
+        cause=cause,
+    ))
+    return patch
+
+
+def test_non_owner_keeps_owner_retry_pending():
+    body = bodies.Body(make_body())
+    settings = make_settings(gate=lambda body: False)
+
+    patch = handle_without_matching_handlers(settings, body)
+
+    assert not patch
+    # 负责副本的下一轮仍能看到 spec 的变化，接管时也能发现未完成的工作
+    storage = settings.persistence.diffbase_storage
+    assert storage.fetch(body=body) != storage.build(body=body)
+    assert is_pending(make_body(), settings)
+
+
+@pytest.mark.parametrize("gate", [None, lambda body: True])
+def test_owner_still_stores_diffbase(gate):
+    body = bodies.Body(make_body())
+    settings = make_settings(gate=gate)
+
+    patch = handle_without_matching_handlers(settings, body)
+
+    assert patch["status"]["kopf"]["last-handled-configuration"] is not None
+
+
+def test_non_owner_does_not_purge_progress():
+    body = bodies.Body(make_body())
+    storage = CompactProgressStorage(gate=lambda body: False)
+    patch = patches.Patch()
+
+    storage.purge(key=HANDLER_ID, body=body, patch=patch)
+    storage.store(key=HANDLER_ID, record={"success": True}, body=body, patch=patch)
+    storage.touch(body=body, patch=patch, value="x")
+
+    assert not patch
+
+
+def test_standby_leaves_work_for_next_leader():
+    leader = {"active": False}
+    settings = make_settings(gate=lambda body: leader["active"])
+    body = bodies.Body(make_body())
+
+    # 备用副本处理事件：不写入任何状态，故障切换时 touch_pending 仍能找到该对象
+    assert not handle_without_matching_handlers(settings, body)
+    assert is_pending(make_body(), settings)
+
+    # 成为主副本后同一对象的处理结果正常写入
+    leader["active"] = True
+    patch = handle_without_matching_handlers(settings, body)
+    assert patch["status"]["kopf"]["last-handled-configuration"] is not None
@@ -0,0 +1,73 @@
+"""精简 kopf 状态：diffbase 只保留 spec 并存放在 status 中，读取旧注解并在写入时删除"""
+import json
+
+import kopf
+
+from operator_storage import CompactDiffBaseStorage, CompactProgressStorage
+
+LEGACY_DIFFBASE = "kopf.zalando.org/last-handled-configuration"
+LEGACY_PROGRESS = "kopf.zalando.org/update_lu.spec.roles"
+HANDLER_ID = kopf.HandlerId("update_lu/spec.roles")
+
+
+def make_body(annotations=None, status=None):
+    return kopf.Body({
+        "metadata": {"name": "alice", "namespace": "kube-system", "labels": {"team": "a"},
+                     "annotations": annotations or {}},
+        "spec": {"roles": [{"name": "edit", "namespace": "team-a"}]},
+        "status": status or {},
+    })
+
+
+def test_diffbase_round_trip_keeps_only_spec():
+    storage = CompactDiffBaseStorage()
+    body = make_body()
+    essence = storage.build(body=body)
+    assert essence == {"spec": {"roles": [{"name": "edit", "namespace": "team-a"}]}}
+
+    patch = kopf.Patch()
+    storage.store(body=body, patch=patch, essence=essence)
+    assert "metadata" not in patch
+    stored = make_body(status=patch["status"])
+    assert storage.fetch(body=stored) == essence
+
+
+def test_diffbase_falls_back_to_legacy_annotation_and_drops_it_on_store():
+    legacy = {"spec": {"roles": []}, "metadata": {"labels": {"team": "a"}}}
+    body = make_body(annotations={LEGACY_DIFFBASE: json.dumps(legacy), "kopf.zalando.org/kopf-managed": "yes"})
+    storage = CompactDiffBaseStorage()
+    assert storage.fetch(body=body) == {"spec": {"roles": []}}
+
+    patch = kopf.Patch()
+    storage.store(body=body, patch=patch, essence=storage.build(body=body))
+    assert patch["metadata"]["annotations"] == {LEGACY_DIFFBASE: None, "kopf.zalando.org/kopf-managed": None}
+    assert "last-handled-configuration" in patch["status"]["kopf"]
+
+
+def test_migrate_moves_legacy_diffbase_once():
+    storage = CompactDiffBaseStorage()
+    body = make_body(annotations={LEGACY_DIFFBASE: json.dumps({"spec": {"roles": []}})})
+    patch = kopf.Patch()
+    assert storage.migrate(body=body, patch=patch)
+    assert json.loads(patch["status"]["kopf"]["last-handled-configuration"]) == {"spec": {"roles": []}}
+    assert patch["metadata"]["annotations"] == {LEGACY_DIFFBASE: None}
+
+    migrated = kopf.Patch()
+    assert not storage.migrate(body=make_body(status=patch["status"]), patch=migrated)
+    assert not migrated
+
+
+def test_progress_reads_legacy_annotation_and_writes_status_only():
+    record = {"started": "2024-05-01T08:00:00.000000", "retries": 1, "success": False, "failure": False}
+    body = make_body(annotations={LEGACY_PROGRESS: json.dumps(record)})
+    storage = CompactProgressStorage()
+    assert storage.fetch(key=HANDLER_ID, body=body)["retries"] == 1
+
+    patch = kopf.Patch()
+    storage.store(key=HANDLER_ID, record={**record, "retries": 2}, body=body, patch=patch)
+    assert patch["status"]["kopf"]["progress"][HANDLER_ID]["retries"] == 2
+    assert patch["metadata"]["annotations"] == {LEGACY_PROGRESS: None}
+
+    purged = kopf.Patch()
+    storage.purge(key=HANDLER_ID, body=make_body(status=patch["status"]), patch=purged)
+    assert purged["status"]["kopf"]["progress"][HANDLER_ID] is None
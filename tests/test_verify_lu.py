@@ -0,0 +1,95 @@
+"""
+resume 校验修复 Token Secret：Secret 被手工删除后 ServiceAccount 中仍残留引用，
+verify_lu 应重建 Secret，而不是反复读取已不存在的 Secret。
+"""
+import base64
+import logging
+
+import kopf
+import kubernetes
+import pytest
+from kubernetes.client.rest import ApiException
+
+import main
+from operator_storage import CompactDiffBaseStorage
+
+NAME, NAMESPACE = "alice", "kube-system"
+SPEC = {"roles": [{"name": "view", "namespace": "team-a"}]}
+
+
+class FakeCluster:
+    """进程内的 ServiceAccount / Secret / RoleBinding / LuConfig，创建 Secret 时模拟 token controller 填充令牌"""
+
+    def __init__(self):
+        self.secret_refs = [f"{NAME}-token"]
+        self.secrets = {}
+        self.luconfigs = {}
+
+    # CoreV1Api
+    def read_namespaced_service_account(self, name, namespace):
+        refs = [kubernetes.client.V1ObjectReference(name=n) for n in self.secret_refs]
+        return kubernetes.client.V1ServiceAccount(metadata=kubernetes.client.V1ObjectMeta(name=name), secrets=refs)
+
+    def create_namespaced_service_account(self, namespace, body):
+        raise ApiException(status=409, reason="Conflict")
+
+    def patch_namespaced_service_account(self, name, namespace, body):
+        for ref in body["secrets"]:
+            if ref.name not in self.secret_refs:
+                self.secret_refs.append(ref.name)
+
+    def read_namespaced_secret(self, name, namespace):
+        if (namespace, name) not in self.secrets:
+            raise ApiException(status=404, reason="Not Found")
+        return self.secrets[(namespace, name)]
+
+    def create_namespaced_secret(self, namespace, body):
+        name = body["metadata"]["name"]
+        token = base64.b64encode(b"new-token").decode()
+        self.secrets[(namespace, name)] = kubernetes.client.V1Secret(
+            metadata=kubernetes.client.V1ObjectMeta(name=name, namespace=namespace),
+            data={"token": token, "ca.crt": "Q0E="},
+        )
+
+    # RbacAuthorizationV1Api
+    def create_namespaced_role_binding(self, namespace, body):
+        raise ApiException(status=409, reason="Conflict")
+
+    # CustomObjectsApi
+    def get_namespaced_custom_object(self, group, version, namespace, plural, name):
+        if (namespace, name) not in self.luconfigs:
+            raise ApiException(status=404, reason="Not Found")
+        return self.luconfigs[(namespace, name)]
+
+    def create_namespaced_custom_object(self, group, version, namespace, plural, body):
+        self.luconfigs[(namespace, body["metadata"]["name"])] = body
+
+
+@pytest.fixture
+def cluster(monkeypatch):
+    fake = FakeCluster()
+    for api in ("CoreV1Api", "RbacAuthorizationV1Api", "CustomObjectsApi"):
+        monkeypatch.setattr(kubernetes.client, api, lambda *args, **kwargs: fake)
+    # handler 上下文之外没有可供 adopt 的所属对象
+    monkeypatch.setattr(kopf, "adopt", lambda *args, **kwargs: None)
+    monkeypatch.setattr(main.resume_verifier, "drift",
+                        lambda *args, **kwargs: [("Secret", NAMESPACE, f"{NAME}-token", "missing")])
+    return fake
+
+
+def test_verify_lu_recreates_deleted_token_secret(cluster):
+    settings = kopf.OperatorSettings()
+    settings.persistence.diffbase_storage = CompactDiffBaseStorage()
+    body = {"metadata": {"name": NAME, "namespace": NAMESPACE}, "spec": SPEC}
+    patch = kopf.Patch()
+
+    result = main.verify_lu(spec=SPEC, name=NAME, namespace=NAMESPACE, body=body, patch=patch, status={},
+                            settings=settings, logger=logging.getLogger("test"))
+
+    assert result == {"sa-name": NAME}
+    assert (NAMESPACE, f"{NAME}-token") in cluster.secrets
+    assert cluster.secret_refs == [f"{NAME}-token"]
+    luconfig = cluster.luconfigs[(NAMESPACE, NAME)]
+    assert luconfig["spec"]["users"][0]["user"]["token"] == "new-token"
+    ready = {c["type"]: c["status"] for c in patch.status["conditions"]}
+    assert ready == {"Ready": "True", "RoleBindingsReady": "True", "TokenReady": "True"}
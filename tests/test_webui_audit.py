@@ -0,0 +1,48 @@
+"""审计日志写入线程：打开数据库失败时重试，查询包含尚未落盘的记录"""
+import os
+import time
+
+from webui_audit import AuditLog
+
+
+def make_log(path):
+    return AuditLog(path, buffer_size=100, batch_size=10, flush_interval=0.02, retention_days=1)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_writer_retries_until_database_can_be_opened(tmp_path):
+    blocker = tmp_path / "audit"
+    # 目录位置被普通文件占用，无法创建数据库
+    blocker.write_text("")
+    log = make_log(str(blocker / "audit.db"))
+    log.record("admin", "create", "LensUser", "alice", "kube-system")
+    log.start()
+
+    wait_for(lambda: not log.status()["healthy"])
+    status = log.status()
+    assert status["running"] and status["buffered"] == 1
+    # 记录仍可从内存中查询
+    assert [entry["name"] for entry in log.query()] == ["alice"]
+
+    os.remove(blocker)
+    wait_for(lambda: log.status()["healthy"] and log.status()["buffered"] == 0)
+    assert [entry["name"] for entry in log.query()] == ["alice"]
+
+
+def test_query_merges_pending_and_written_records(tmp_path):
+    log = make_log(str(tmp_path / "audit.db"))
+    log.start()
+    log.record("admin", "create", "LensUser", "alice", "kube-system")
+    wait_for(lambda: log.status()["lastFlush"] is not None and log.status()["buffered"] == 0)
+    log.record("admin", "delete", "LensUser", "bob", "kube-system", success=False, detail={"error": "x"})
+
+    entries = log.query(actor="admin")
+    assert [entry["name"] for entry in entries] == ["bob", "alice"]
+    assert entries[0]["success"] is False and entries[0]["detail"] == {"error": "x"}
+    assert [entry["name"] for entry in log.query(name="alice")] == ["alice"]
@@ -0,0 +1,106 @@
+"""SSE 事件扇出：过滤无变化的事件、积压时 resync、心跳与退订"""
+import asyncio
+import json
+
+from webui_events import HEARTBEAT, RESYNC, RETRY, EventHub
+
+
+def make_user(name, roles, resource_version="1", status=None):
+    return {
+        "metadata": {"name": name, "namespace": "kube-system", "resourceVersion": resource_version},
+        "spec": {"roles": roles},
+        "status": status or {},
+    }
+
+
+def parse(message):
+    lines = dict(line.split(b": ", 1) for line in message.strip().split(b"\n"))
+    return lines[b"event"].decode(), json.loads(lines[b"data"])
+
+
+async def open_stream(hub):
+    stream = hub.stream()
+    assert await stream.__anext__() == RETRY
+    return stream
+
+
+async def next_message(stream):
+    return await asyncio.wait_for(stream.__anext__(), 1)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_events_are_projected_and_invisible_changes_skipped():
+    async def scenario():
+        hub = EventHub(queue_size=10, heartbeat_seconds=5)
+        stream = await open_stream(hub)
+        old = make_user("alice", [{"name": "edit"}])
+        # 只有 kopf 内部状态与 resourceVersion 变化，前端看不到差别
+        hub.on_lensuser("MODIFIED", make_user("alice", [{"name": "edit"}], "2", {"kopf": {"x": 1}}), old)
+        hub.on_lensuser("MODIFIED", make_user("alice", [{"name": "view"}], "3"), old)
+        hub.on_luconfig("ADDED", {"metadata": {"name": "alice", "namespace": "kube-system"},
+                                  "spec": {"users": [{"user": {"token": "secret"}}]}}, None)
+        # 事件经 call_soon_threadsafe 投递，让出一次事件循环后入队
+        await asyncio.sleep(0)
+        kind, data = parse(await next_message(stream))
+        assert kind == "lensuser" and data["type"] == "MODIFIED"
+        assert data["object"]["spec"]["roles"] == [{"name": "view"}]
+        assert data["object"]["metadata"]["resourceVersion"] == "3"
+        kind, data = parse(await next_message(stream))
+        assert kind == "luconfig"
+        assert data["object"] == {"metadata": {"name": "alice", "namespace": "kube-system"}}
+        await stream.aclose()
+
+    run(scenario())
+
+
+def test_overflow_drops_backlog_and_sends_resync():
+    async def scenario():
+        hub = EventHub(queue_size=2, heartbeat_seconds=5)
+        stream = await open_stream(hub)
+        for i in range(3):
+            hub.on_lensuser("ADDED", make_user(f"user-{i}", []), None)
+        await asyncio.sleep(0)
+        assert await next_message(stream) == RESYNC
+        # 积压已丢弃，之后的事件正常推送
+        hub.on_lensuser("ADDED", make_user("user-3", []), None)
+        await asyncio.sleep(0)
+        assert parse(await next_message(stream))[1]["object"]["metadata"]["name"] == "user-3"
+        await stream.aclose()
+
+    run(scenario())
+
+
+def test_heartbeat_and_unsubscribe():
+    async def scenario():
+        hub = EventHub(queue_size=2, heartbeat_seconds=0.01)
+        stream = await open_stream(hub)
+        assert await next_message(stream) == HEARTBEAT
+        assert len(hub._subscribers) == 1
+        await stream.aclose()
+        assert not hub._subscribers
+
+    run(scenario())
+
+
+def test_clusterrole_label_removal_is_a_deletion():
+    async def scenario():
+        from webui_config import settings
+
+        hub = EventHub(queue_size=10, heartbeat_seconds=5)
+        stream = await open_stream(hub)
+        labels = {settings.USER_MANAGER_LABEL: settings.USER_MANAGER_LABEL_VALUE}
+        managed = {"metadata": {"name": "reader", "labels": labels}, "rules": []}
+        unmanaged = {"metadata": {"name": "reader", "labels": {}}, "rules": []}
+        hub.on_clusterrole("ADDED", managed, None)
+        hub.on_clusterrole("MODIFIED", unmanaged, managed)
+        # 非受管角色的变化不推送
+        hub.on_clusterrole("MODIFIED", unmanaged, unmanaged)
+        await asyncio.sleep(0)
+        assert [parse(await next_message(stream))[1]["type"] for _ in range(2)] == ["ADDED", "DELETED"]
+        assert next(iter(hub._subscribers)).queue.empty()
+        await stream.aclose()
+
+    run(scenario())
@@ -0,0 +1,94 @@
+"""权限倒排索引"""
+from webui_index import PermissionIndex
+
+
+def rolebinding(name, namespace, role, subjects, role_kind="ClusterRole"):
+    return {"metadata": {"name": name, "namespace": namespace},
+            "roleRef": {"kind": role_kind, "name": role}, "subjects": subjects}
+
+
+def clusterrolebinding(name, role, subjects):
+    return {"metadata": {"name": name}, "roleRef": {"kind": "ClusterRole", "name": role}, "subjects": subjects}
+
+
+def sa(namespace, name):
+    return {"kind": "ServiceAccount", "namespace": namespace, "name": name}
+
+
+def test_role_impact_includes_cluster_bindings_and_groups():
+    index = PermissionIndex()
+    index.on_rolebinding("ADDED", rolebinding("rb", "team-a", "edit", [sa("kube-system", "alice")]), None)
+    index.on_clusterrolebinding("ADDED", clusterrolebinding("crb", "edit", [
+        sa("kube-system", "bob"),
+        {"kind": "Group", "name": "system:serviceaccounts:ops"},
+        {"kind": "User", "name": "jane@example.com"},
+    ]), None)
+    lensusers = ["kube-system/alice", "kube-system/bob", "ops/carol", "kube-system/dave"]
+
+    impact = index.role_impact("edit", lensusers)
+
+    assert impact == {
+        "namespaces": ["team-a"],
+        "clusterWide": True,
+        "users": ["kube-system/alice", "kube-system/bob"],
+        "groups": ["system:serviceaccounts:ops"],
+        "otherUsers": ["jane@example.com"],
+        "affected": ["kube-system/alice", "kube-system/bob", "ops/carol"],
+    }
+    # 同名 Role 的授权不计入 ClusterRole 的影响范围
+    index.on_rolebinding("ADDED", rolebinding("rb2", "team-b", "edit", [sa("kube-system", "dave")], "Role"), None)
+    assert index.role_impact("edit", lensusers)["affected"] == impact["affected"]
+
+
+def lensuser(name, namespace, roles):
+    return {"metadata": {"name": name, "namespace": namespace}, "spec": {"roles": roles}}
+
+
+def test_declared_and_bound_sources_are_counted_separately():
+    index = PermissionIndex()
+    user = lensuser("alice", "kube-system", [{"name": "edit", "namespace": "team-a"}])
+    binding = rolebinding("alice", "team-a", "edit", [sa("kube-system", "alice")])
+    index.on_lensuser("ADDED", user, None)
+    index.on_rolebinding("ADDED", binding, None)
+    assert index.user_bindings("kube-system/alice") == [
+        {"namespace": "team-a", "role": "edit", "declared": True, "bound": True}]
+
+    # RoleBinding 被删除，只剩 LensUser 中的声明
+    index.on_rolebinding("DELETED", binding, None)
+    assert index.user_bindings("kube-system/alice") == [
+        {"namespace": "team-a", "role": "edit", "declared": True, "bound": False}]
+    assert index.namespace_roles("team-a") == {"edit": ["kube-system/alice"]}
+
+    index.on_lensuser("DELETED", user, None)
+    assert index.user_bindings("kube-system/alice") == []
+    assert index.namespace_roles("team-a") == {}
+    assert index.role_grants("edit") == {}
+
+
+def test_grant_from_several_bindings_survives_until_last_is_removed():
+    index = PermissionIndex()
+    first = rolebinding("kube-user-manage:edit", "team-a", "edit", [sa("kube-system", "alice")])
+    second = rolebinding("extra", "team-a", "edit", [sa("kube-system", "alice")])
+    index.on_rolebinding("ADDED", first, None)
+    index.on_rolebinding("ADDED", second, None)
+
+    index.on_rolebinding("DELETED", first, None)
+    assert index.role_grants("edit") == {"team-a": ["kube-system/alice"]}
+    index.on_rolebinding("DELETED", second, None)
+    assert index.role_grants("edit") == {}
+    assert index._counts == {}
+
+
+def test_modified_object_only_applies_its_own_difference():
+    index = PermissionIndex()
+    before = rolebinding("agg", "team-a", "view", [sa("kube-system", "alice"), sa("kube-system", "bob")])
+    after = rolebinding("agg", "team-a", "view", [sa("kube-system", "bob"), sa("kube-system", "carol")])
+    index.on_rolebinding("ADDED", before, None)
+    index.on_rolebinding("MODIFIED", after, before)
+
+    assert index.namespace_roles("team-a") == {"view": ["kube-system/bob", "kube-system/carol"]}
+    assert index.user_bindings("kube-system/alice") == []
+    # 重复收到相同内容的事件不改变计数
+    index.on_rolebinding("MODIFIED", after, after)
+    index.on_rolebinding("DELETED", after, None)
+    assert index.namespace_roles("team-a") == {}
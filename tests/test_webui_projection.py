@@ -0,0 +1,57 @@
+"""列表接口的字段投影、搜索与分页"""
+from webui_projection import LENSUSER_FIELDS, Projection, filter_page, lensuser_text, search_terms
+
+
+def make_user(name, roles=()):
+    return {
+        "metadata": {
+            "name": name,
+            "namespace": "kube-system",
+            "resourceVersion": "7",
+            "managedFields": [{"manager": "kopf"}],
+            "annotations": {"kopf.zalando.org/last-handled-configuration": "{}"},
+        },
+        "spec": {"roles": [{"name": role, "namespace": "team-a"} for role in roles]},
+        "status": {"kopf": {"progress": {}}, "conditions": [{"type": "Ready", "status": "True"}]},
+    }
+
+
+def test_lensuser_projection_drops_unused_fields():
+    projected = Projection(LENSUSER_FIELDS).apply(make_user("alice", ["edit"]))
+    assert projected == {
+        "metadata": {"name": "alice", "namespace": "kube-system", "resourceVersion": "7"},
+        "spec": {"roles": [{"name": "edit", "namespace": "team-a"}]},
+        "status": {"conditions": [{"type": "Ready", "status": "True"}]},
+    }
+
+
+def test_parent_path_selects_whole_subtree():
+    user = make_user("alice")
+    assert Projection(["metadata", "metadata.name"]).apply(user) == {"metadata": user["metadata"]}
+    assert Projection(["metadata.name", "metadata"]).apply(user)["metadata"]["name"] == "alice"
+
+
+def test_parse_uses_requested_fields_or_default():
+    user = make_user("alice")
+    assert Projection.parse(" spec.roles , ,metadata.name", LENSUSER_FIELDS).apply(user) == {
+        "metadata": {"name": "alice"}, "spec": {"roles": []}}
+    assert Projection.parse(None, ["metadata.name"]).apply(user) == {"metadata": {"name": "alice"}}
+    # 路径经过非字典字段时忽略
+    assert Projection(["spec.roles.name"]).apply(user) == {"spec": {}}
+
+
+def test_search_requires_every_term_case_insensitively():
+    users = [make_user("alice", ["edit"]), make_user("bob", ["view"]), make_user("carol", ["edit", "view"])]
+    total, page = filter_page(users, search_terms("EDIT  team-a"), lensuser_text,
+                              lambda user: user["metadata"]["name"])
+    assert total == 2
+    assert [user["metadata"]["name"] for user in page] == ["alice", "carol"]
+    assert search_terms(None) == []
+
+
+def test_paging_reports_filtered_total():
+    users = [make_user(f"user-{i:02d}") for i in range(25)]
+    total, page = filter_page(reversed(users), [], lensuser_text, lambda user: user["metadata"]["name"],
+                              offset=20, limit=10)
+    assert total == 25
+    assert [user["metadata"]["name"] for user in page] == [f"user-{i}" for i in range(20, 25)]
@@ -0,0 +1,127 @@
+"""本地 RBAC 评估：规则匹配以及 RoleBinding / ClusterRoleBinding / 用户组 / Role 各授权来源"""
+from webui_index import PermissionIndex
+from webui_rbac import CompiledRole, RbacEvaluator, rule_diff
+
+USER = "kube-system/alice"
+
+
+def rule(verbs, resources, groups=("",), names=None):
+    data = {"apiGroups": list(groups), "resources": list(resources), "verbs": list(verbs)}
+    if names:
+        data["resourceNames"] = list(names)
+    return data
+
+
+def test_exact_and_wildcard_matching():
+    role = CompiledRole([
+        rule(["get", "list"], ["pods"]),
+        rule(["*"], ["deployments"], groups=["apps"]),
+        rule(["watch"], ["*"], groups=["*"]),
+    ])
+    assert role.allows("get", "", "pods")
+    assert not role.allows("delete", "", "pods")
+    # 核心组的规则不匹配其他组中的同名资源
+    assert not role.allows("get", "metrics.k8s.io", "pods")
+    assert role.allows("delete", "apps", "deployments")
+    assert not role.allows("delete", "", "deployments")
+    assert role.allows("watch", "batch", "jobs")
+
+
+def test_subresources_need_explicit_or_wildcard_rules():
+    role = CompiledRole([
+        rule(["get"], ["pods"]),
+        rule(["get"], ["*/scale"], groups=["apps"]),
+    ])
+    assert not role.allows("get", "", "pods/log")
+    assert role.allows("get", "apps", "deployments/scale")
+    assert not role.allows("get", "apps", "deployments/status")
+    assert CompiledRole([rule(["get"], ["*"])]).allows("get", "", "pods/log")
+
+
+def test_resource_names_only_apply_to_named_requests():
+    role = CompiledRole([
+        rule(["get", "update"], ["configmaps"], names=["app-config"]),
+        rule(["*"], ["secrets"], names=["tls"]),
+        {"nonResourceURLs": ["/healthz"], "verbs": ["get"]},
+    ])
+    assert role.allows("update", "", "configmaps", "app-config")
+    assert not role.allows("update", "", "configmaps", "other")
+    # 不带名称的请求（如 list）不被限定名称的规则允许
+    assert not role.allows("get", "", "configmaps")
+    assert role.allows("delete", "", "secrets", "tls")
+
+
+def test_rule_diff_reports_atomic_permissions():
+    diff = rule_diff([rule(["get", "list"], ["pods"])], [rule(["get", "delete"], ["pods"])])
+    assert [(p["verb"], p["resource"]) for p in diff["added"]] == [("delete", "pods")]
+    assert [(p["verb"], p["resource"]) for p in diff["removed"]] == [("list", "pods")]
+
+
+def binding(kind, name, role_kind, role_name, subjects, namespace=None):
+    metadata = {"name": name}
+    if namespace:
+        metadata["namespace"] = namespace
+    return {"kind": kind, "metadata": metadata, "roleRef": {"kind": role_kind, "name": role_name},
+            "subjects": subjects}
+
+
+def make_evaluator():
+    index = PermissionIndex()
+    evaluator = RbacEvaluator(index)
+    evaluator.on_clusterrole("ADDED", {"metadata": {"name": "pod-reader"}, "rules": [rule(["get"], ["pods"])]}, None)
+    evaluator.on_clusterrole("ADDED", {"metadata": {"name": "node-reader"}, "rules": [rule(["list"], ["nodes"])]}, None)
+    evaluator.on_role("ADDED", {"metadata": {"name": "cm-editor", "namespace": "team-a"},
+                                "rules": [rule(["update"], ["configmaps"])]}, None)
+    return index, evaluator
+
+
+def allowed(evaluator, verb, resource, namespace):
+    return evaluator.check(USER, [{"verb": verb, "resource": resource, "namespace": namespace}])[0]
+
+
+def test_rolebinding_to_clusterrole_is_namespace_scoped():
+    index, evaluator = make_evaluator()
+    sa = {"kind": "ServiceAccount", "name": "alice", "namespace": "kube-system"}
+    index.on_rolebinding("ADDED", binding("RoleBinding", "rb", "ClusterRole", "pod-reader", [sa], "team-a"), None)
+
+    result = allowed(evaluator, "get", "pods", "team-a")
+    assert result["allowed"] and result["roles"] == ["pod-reader"]
+    assert not allowed(evaluator, "get", "pods", "team-b")["allowed"]
+
+
+def test_clusterrolebinding_grants_every_namespace():
+    index, evaluator = make_evaluator()
+    user = {"kind": "User", "name": "system:serviceaccount:kube-system:alice"}
+    index.on_clusterrolebinding("ADDED", binding("ClusterRoleBinding", "crb", "ClusterRole", "pod-reader", [user]), None)
+
+    result = allowed(evaluator, "get", "pods", "team-b")
+    assert result["allowed"]
+    assert result["grants"] == [{"role": "pod-reader", "namespace": "*", "subject": USER}]
+
+    index.on_clusterrolebinding("DELETED", binding("ClusterRoleBinding", "crb", "ClusterRole", "pod-reader", [user]), None)
+    assert not allowed(evaluator, "get", "pods", "team-b")["allowed"]
+
+
+def test_group_subjects_apply_to_service_accounts():
+    index, evaluator = make_evaluator()
+    index.on_clusterrolebinding("ADDED", binding("ClusterRoleBinding", "all-sa", "ClusterRole", "node-reader",
+                                                 [{"kind": "Group", "name": "system:serviceaccounts"}]), None)
+    index.on_rolebinding("ADDED", binding("RoleBinding", "ns-sa", "ClusterRole", "pod-reader",
+                                          [{"kind": "Group", "name": "system:serviceaccounts:other"}], "team-a"), None)
+
+    result = allowed(evaluator, "list", "nodes", "team-a")
+    assert result["allowed"] and result["grants"][0]["subject"] == "group:system:serviceaccounts"
+    # 只授予 other 命名空间中的 ServiceAccount
+    assert not allowed(evaluator, "get", "pods", "team-a")["allowed"]
+
+
+def test_rolebinding_to_role_uses_namespaced_rules():
+    index, evaluator = make_evaluator()
+    sa = {"kind": "ServiceAccount", "name": "alice", "namespace": "kube-system"}
+    index.on_rolebinding("ADDED", binding("RoleBinding", "rb", "Role", "cm-editor", [sa], "team-a"), None)
+
+    result = allowed(evaluator, "update", "configmaps", "team-a")
+    assert result["allowed"] and result["roles"] == ["Role/cm-editor"]
+    # 与 ClusterRole 同名的 Role 不会被当作 ClusterRole
+    index.on_rolebinding("ADDED", binding("RoleBinding", "rb2", "Role", "pod-reader", [sa], "team-b"), None)
+    assert not allowed(evaluator, "get", "pods", "team-b")["allowed"]
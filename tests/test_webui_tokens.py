@@ -0,0 +1,160 @@
+"""TokenRequest 令牌缓存：刷新窗口、后台刷新、淘汰与并发签发"""
+import threading
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+import webui_tokens
+from webui_tokens import TokenCache
+
+LIFETIME = 1000
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeIssuer:
+    """按调用顺序签发 token-1、token-2 ……，记录并发签发的最大数量"""
+
+    def __init__(self, clock, block=None):
+        self.clock = clock
+        self.block = block
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, name, namespace, expiration_seconds):
+        with self._lock:
+            self.calls.append((namespace, name))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            token = f"token-{len(self.calls)}"
+        if self.block is not None:
+            self.block.wait(5)
+        with self._lock:
+            self.active -= 1
+        return token, datetime.fromtimestamp(self.clock.now + expiration_seconds, timezone.utc)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(webui_tokens, "_now", clock)
+    return clock
+
+
+def make_cache(issuer, max_entries=100):
+    return TokenCache(issuer, expiration_seconds=LIFETIME, refresh_ratio=0.2, max_entries=max_entries)
+
+
+def test_token_is_cached_until_refresh_window(clock):
+    issuer = FakeIssuer(clock)
+    cache = make_cache(issuer)
+
+    token, expires_at = cache.get("alice", "kube-system")
+    assert (token, expires_at) == ("token-1", clock.now + LIFETIME)
+
+    clock.now += LIFETIME * 0.7
+    assert cache.get("alice", "kube-system")[0] == "token-1"
+
+    # 剩余有效期低于 20%，请求路径上重新签发
+    clock.now += LIFETIME * 0.15
+    assert cache.get("alice", "kube-system")[0] == "token-2"
+    assert len(issuer.calls) == 2
+
+
+def test_background_refresh_only_renews_tokens_still_in_use(clock):
+    issuer = FakeIssuer(clock)
+    cache = make_cache(issuer)
+    cache.get("alice", "kube-system")
+    cache.get("bob", "kube-system")
+
+    clock.now += LIFETIME * 0.85
+    # 请求路径上签发的令牌都在使用中
+    assert cache.refresh_due() == 2
+
+    # 刷新后只有 alice 又被请求过
+    cache.get("alice", "kube-system")
+    clock.now += LIFETIME * 0.85
+    assert cache.refresh_due() == 1
+    assert [call[1] for call in issuer.calls] == ["alice", "bob", "alice", "bob", "alice"]
+
+    # bob 的令牌不再刷新，到期后淘汰
+    clock.now += LIFETIME * 0.2
+    cache.refresh_due()
+    assert set(cache._entries) == {("kube-system", "alice")}
+
+
+def test_refreshed_token_is_served_without_issuing(clock):
+    issuer = FakeIssuer(clock)
+    cache = make_cache(issuer)
+    cache.get("alice", "kube-system")
+    clock.now += LIFETIME * 0.9
+    cache.refresh_due()
+
+    token, expires_at = cache.get("alice", "kube-system")
+    assert (token, expires_at) == ("token-2", clock.now + LIFETIME)
+    assert len(issuer.calls) == 2
+
+
+def test_expired_and_overflowing_entries_are_evicted(clock):
+    issuer = FakeIssuer(clock)
+    cache = make_cache(issuer, max_entries=2)
+    for name in ("a", "b"):
+        cache.get(name, "ns")
+        clock.now += 10
+    cache.get("c", "ns")
+    # 超出容量时淘汰最早过期的 a
+    assert set(cache._entries) == {("ns", "b"), ("ns", "c")}
+
+    clock.now += LIFETIME
+    cache.get("d", "ns")
+    assert set(cache._entries) == {("ns", "d")}
+
+
+def test_concurrent_requests_share_one_issue(clock):
+    release = threading.Event()
+    issuer = FakeIssuer(clock, block=release)
+    cache = make_cache(issuer)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("alice", "kube-system")))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(issuer.calls) == 1
+    assert {token for token, _ in results} == {"token-1"}
+    assert cache._issue_locks == {}
+
+
+def test_invalidate_during_issue_keeps_the_issue_lock(clock):
+    release = threading.Event()
+    issuer = FakeIssuer(clock, block=release)
+    cache = make_cache(issuer)
+    first = threading.Thread(target=cache.get, args=("alice", "kube-system"))
+    first.start()
+    while not issuer.calls:
+        time.sleep(0.01)
+
+    # 用户被删除后重建，签发仍在进行中
+    cache.invalidate("alice", "kube-system")
+    second = threading.Thread(target=cache.get, args=("alice", "kube-system"))
+    second.start()
+    time.sleep(0.1)
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert issuer.max_active == 1
+    assert cache._issue_locks == {}
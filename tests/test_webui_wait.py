@@ -0,0 +1,83 @@
+"""长轮询等待：先登记再检查缓存，登记前后到达的事件都不会错过"""
+import asyncio
+import threading
+
+from webui_wait import ObjectWaiter
+
+
+class FakeInformer:
+    def __init__(self):
+        self.objects = {}
+        self.handler = None
+        self.on_get = None
+
+    def add_handler(self, handler):
+        self.handler = handler
+
+    def get(self, namespace, name):
+        if self.on_get is not None:
+            self.on_get()
+        return self.objects.get((namespace, name))
+
+    def emit(self, event_type, obj):
+        metadata = obj["metadata"]
+        self.objects[(metadata["namespace"], metadata["name"])] = obj
+        self.handler(event_type, obj, None)
+
+
+def make_obj(ready=False):
+    return {"metadata": {"name": "alice", "namespace": "kube-system"}, "status": {"ready": ready}}
+
+
+def test_cached_object_returns_immediately():
+    informer = FakeInformer()
+    waiter = ObjectWaiter(informer)
+    informer.objects[("kube-system", "alice")] = make_obj()
+
+    assert asyncio.run(waiter.wait("kube-system", "alice", 1)) == make_obj()
+    assert not waiter._waiters
+
+
+def test_event_between_registration_and_cache_check_is_not_lost():
+    informer = FakeInformer()
+    waiter = ObjectWaiter(informer)
+    # 对象在登记之后、检查缓存之前到达，但缓存读取仍返回旧结果
+    informer.on_get = lambda: waiter.on_event("ADDED", make_obj(), None)
+
+    assert asyncio.run(waiter.wait("kube-system", "alice", 1)) == make_obj()
+
+
+def test_event_from_informer_thread_wakes_waiter():
+    informer = FakeInformer()
+    waiter = ObjectWaiter(informer)
+
+    async def scenario():
+        task = asyncio.create_task(waiter.wait("kube-system", "alice", 5, lambda obj: obj["status"]["ready"]))
+        await asyncio.sleep(0.01)
+        # 不满足条件的修改不唤醒
+        thread = threading.Thread(target=informer.emit, args=("MODIFIED", make_obj(ready=False)))
+        thread.start()
+        thread.join()
+        await asyncio.sleep(0.01)
+        assert not task.done()
+        thread = threading.Thread(target=informer.emit, args=("MODIFIED", make_obj(ready=True)))
+        thread.start()
+        thread.join()
+        return await task
+
+    assert asyncio.run(scenario()) == make_obj(ready=True)
+    assert not waiter._waiters
+
+
+def test_timeout_and_deletion_return_none():
+    informer = FakeInformer()
+    waiter = ObjectWaiter(informer)
+
+    async def scenario():
+        task = asyncio.create_task(waiter.wait("kube-system", "alice", 0.05))
+        await asyncio.sleep(0.01)
+        waiter.on_event("DELETED", make_obj(), None)
+        return await task
+
+    assert asyncio.run(scenario()) is None
+    assert not waiter._waiters